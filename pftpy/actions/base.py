@@ -14,18 +14,23 @@ TODO-List:
 * DONE Printers as Actions
 * STRT unit tests
 * DONE stats: add possibility to compute stats outside run (to not affect timing)
-* DONE get_stat_keys should be static I guess? -> NOPE
-* TODO refactor subprocess IO into actions/util.py
+* DONE get_stat_keys should be static I guess? -> stat_keys / stat_schema
+* DONE refactor subprocess IO into actions/util.py (+ graph_actions/solver_io.py)
 * TODO fix: run-all only produces one action even if multiple results for
        retrieve_action are available
-* TODO error handling / timeout handling
+* STRT error handling / timeout handling -> deadlines (actions/deadline.py)
 ** TODO allowed exceptions vs disallowed ones
 * DONE more abstractions around _stats: forbid adding undefined keys
 """
 
 from abc import ABC, abstractmethod
-import itertools
-import datetime
+from contextlib import contextmanager
+import copy
+import hashlib
+import threading
+import time
+
+from actions.deadline import Deadline
 
 
 class ActionContext(ABC):
@@ -37,8 +42,32 @@ class ActionContext(ABC):
         self._filters = []
         self._actions = {}
         """dict: str -> Action"""
+        self._filter_index = {}
+        """dict: action name -> list of (compiled path, filter)"""
+        self._choice_index = {}
+        """dict: choice action name -> list of (compiled path, filter)"""
+        self._resolved = {}
+        """dict: memoized results of filter resolution"""
 
         self._use_defaults = use_defaults  # todo should this be a mutable property?
+        self.prefix_cache = None
+        """PrefixCache or None: shares steps of consecutive variants"""
+        self.tracer = None
+        """actions.trace.Tracer or None: records a span per action call"""
+        self.variant_timeout = -1
+        """float: time budget (seconds) of the root action of a variant"""
+        self._local = threading.local()
+        self.deadline = None
+
+    @property
+    def deadline(self):
+        """Deadline or None: deadline of the action running in this thread
+        (actions may be called concurrently, see actions.util.gather_calls)"""
+        return getattr(self._local, 'deadline', None)
+
+    @deadline.setter
+    def deadline(self, value):
+        self._local.deadline = value
 
 # ?
 #    @property
@@ -63,6 +92,16 @@ class ActionContext(ABC):
     def register_filters(self, *filters):
         """TODO"""
         self._filters += filters
+        for filter in filters:
+            path = self._compile_filter(filter)
+            self._filter_index.setdefault(path[0], []).append((path, filter))
+
+            truncated = ":".join(filter.split(":")[:-1])
+            if len(truncated) > 0:
+                choice_path = self._compile_filter(truncated)
+                self._choice_index.setdefault(choice_path[0], []).append((choice_path, filter))
+        # filters changed, resolutions are no longer valid
+        self._resolved = {}
 
     def register_actions(self, *actions):
         """TODO"""
@@ -72,6 +111,25 @@ class ActionContext(ABC):
             assert name not in self._actions, f"{name} was already registered"
             self._actions[action.name()] = action
 
+    @staticmethod
+    def _compile_filter(filter_str: str) -> 'tuple[str]':
+        """Returns the action names of a filter (without parameters) from the
+        last to the first one, e.g. "a:b:c(p=1)" -> ("c", "b", "a")"""
+        filter_split = filter_str.split(":")
+        filter_split.reverse()
+        if "(" in filter_split[0]:
+            filter_split[0] = filter_split[0].split("(")[0]
+        return tuple(filter_split)
+
+    @staticmethod
+    def _path_specificity(path: 'tuple[str]', reversed_stack: 'list[str]'):
+        num_match = 0
+        for fname, sname in zip(path, reversed_stack):
+            if fname != sname:
+                return 0
+            num_match += 1
+        return num_match
+
     @staticmethod
     def _match_specificity(filter_str: str, call_stack: 'list[str]'):
         """Returns the number of matches between call stack and filter
@@ -84,30 +142,16 @@ class ActionContext(ABC):
         _match_specificity(["c:d"], ["a:b:c:d"]) == 2
         _match_specificity(["a:c:d"], ["a:b:c:d"]) == 0
         """
-        filter_split = filter_str.split(":")
-        filter_split.reverse()
-        if "(" in filter_split[0]:
-            filter_split[0] = filter_split[0].split("(")[0]
-
-        num_match = 0
-        for fname, sname in zip(filter_split, reversed(call_stack)):
-            if fname == sname:
-                num_match += 1
-            else:
-                num_match = 0
-                break
-        return num_match
+        path = ActionContext._compile_filter(filter_str)
+        return ActionContext._path_specificity(path, call_stack[::-1])
 
-    def most_specific_filters(self, parents, action_name):
-        """TODO
-
-        """
-        call_stack = parents + [action_name]
+    def _most_specific(self, candidates, call_stack):
+        reversed_stack = call_stack[::-1]
 
         most_specific = []
         highest_specificity = 1
-        for filter in self._filters:
-            specificity = self._match_specificity(filter, call_stack)
+        for path, filter in candidates:
+            specificity = self._path_specificity(path, reversed_stack)
             # higher specificity: begin new list
             if specificity > highest_specificity:
                 highest_specificity = specificity
@@ -115,28 +159,34 @@ class ActionContext(ABC):
             # high specificity: add to current list
             if specificity == highest_specificity:
                 most_specific.append(filter)
-        # return stuff
         return most_specific
 
+    def _resolve(self, kind, parents, name, compute):
+        """Memoize `compute()` for a kind of resolution of action `name` called
+        from `parents`"""
+        key = (kind, name, *parents)
+        res = self._resolved.get(key)
+        if res is None:
+            res = compute()
+            self._resolved[key] = res
+        return res
+
+    def most_specific_filters(self, parents, action_name):
+        """TODO
+
+        """
+        return self._resolve('filters', parents, action_name, lambda: self._most_specific(
+            self._filter_index.get(action_name, []), parents + [action_name]))
+
     def most_specific_choice(self, parents, choice_action_name):
-        call_stack = parents + [choice_action_name]
+        return self._resolve('choice', parents, choice_action_name, lambda: self._most_specific(
+            self._choice_index.get(choice_action_name, []), parents + [choice_action_name]))
 
-        most_specific = []
-        highest_specificity = 1
-        for filter in self._filters:
-            truncated = filter.split(":")[:-1]
-            truncated = ":".join(truncated)
-            if len(truncated) == 0:
-                continue
-            specificity = self._match_specificity(truncated, call_stack)
-            # higher specificity: begin new list
-            if specificity > highest_specificity:
-                highest_specificity = specificity
-                most_specific = []
-            # high specificity: add to current list
-            if specificity == highest_specificity:
-                most_specific.append(filter)
-        return most_specific
+    def resolve_parameters(self, parents, action_name):
+        """Returns the parsed parameters (list of dicts or [None]) of the most
+        specific filters of `action_name`"""
+        return self._resolve('params', parents, action_name, lambda: Action.parse_parameters(
+            self.most_specific_filters(parents, action_name)))
 
     def construct_action(self, name, parents=None):
         """TODO: write docstring"""
@@ -145,12 +195,49 @@ class ActionContext(ABC):
             parents = []
         return action.construct(self, parents)
 
+    def stat_schema(self, name) -> 'frozenset[str]':
+        """Returns the stat keys of all variants of the action `name`"""
+        return self._actions[name].stat_schema()
+
     def construct_variants(self, name, parents=None):
-        """TODO"""
+        """Returns a list of all variants of the action `name`"""
+        return list(self.iter_variants(name, parents))
+
+    def iter_variants(self, name, parents=None):
+        """Generator over all variants of the action `name`; each variant is
+        constructed only when it is requested."""
         action = self._actions[name]
         if parents is None:
             parents = []
-        return action.construct_all(self, parents)
+        yield from action.construct_all(self, parents)
+
+
+class PrefixCache:
+    """Remembers the outputs and stats of the steps of the last executed
+    (root) SequenceAction, so that the next variant can skip all leading steps
+    with identical signatures.
+
+    Variants produced by `construct_variants` only differ in their last steps
+    when they are consecutive, so keeping a single chain of steps suffices.
+    """
+    def __init__(self):
+        self._chain = []
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, depth, key):
+        """Returns (output, stats) of step `depth` if it was executed with the
+        same key before, otherwise None"""
+        if depth < len(self._chain) and self._chain[depth][0] == key:
+            self.hits += 1
+            _, output, stats = self._chain[depth]
+            return copy.deepcopy(output), dict(stats)
+        self.misses += 1
+        return None
+
+    def store(self, depth, key, output, stats):
+        del self._chain[depth:]
+        self._chain.append((key, copy.deepcopy(output), dict(stats)))
 
 
 class BadStatKeyError(LookupError):
@@ -158,9 +245,12 @@ class BadStatKeyError(LookupError):
 
 
 class Action():
+    # stat keys added by this class to the ones of its base classes
+    stat_keys = ['time', 'error_status']
 
     def __init__(self, context: ActionContext, parents=None, parameters=None):
         self._stats = {}
+        self._stat_key_set = None
         self._context: ActionContext = context
 
         if parents is None:
@@ -171,11 +261,47 @@ class Action():
         if parameters is not None:
             self._params.update(parameters)
 
+        # replaced by the deadline of the call in __call__
+        self.deadline = Deadline.after(self.time_budget())
+
+    def time_budget(self):
+        """Seconds this action may take per call (None for no limit); defaults
+        to the `timeout` parameter (-1 for no timeout)"""
+        timeout = self._params.get('timeout', -1)
+        return None if float(timeout) < 0 else float(timeout)
+
+    def clone(self) -> 'Action':
+        """Returns a copy of this action (including its sub-actions) with its
+        own stats that shares the context, e.g. to call it concurrently"""
+        return copy.deepcopy(self, {id(self._context): self._context})
+
+    @contextmanager
+    def nested_deadline(self, deadline: Deadline):
+        """Within the with block, actions called by this action get at most
+        until `deadline` (e.g. a `split` of this action's deadline)"""
+        context = self._context
+        outer = context.deadline
+        context.deadline = Deadline(min(deadline.expires, self.deadline.expires))
+        try:
+            yield
+        finally:
+            context.deadline = outer
+
     def __call__(self, input):
-        t0 = datetime.datetime.now()
+        context = self._context
+        outer = context.deadline
+        if outer is None:  # root of a variant
+            outer = Deadline.after(float(context.variant_timeout))
+        self.deadline = outer.child(self.time_budget())
+        caller_deadline = context.deadline
+        context.deadline = self.deadline
+
+        tracer = context.tracer
+        span = tracer.begin(self) if tracer is not None else None
+        t0 = time.perf_counter_ns()
         try:
             ret = self.run(input)
-            t1 = datetime.datetime.now()
+            t1 = time.perf_counter_ns()
             if 'error_status' not in self._stats:
                 self.set_stat('error_status', 'none')
             self.compute_stats(input, ret)
@@ -183,11 +309,16 @@ class Action():
             raise(e)
         except Exception as e:
             ret = None
-            t1 = datetime.datetime.now()
+            t1 = time.perf_counter_ns()
             self.set_stat('error_status', f"exception({e})")
         finally:
-            delta = t1 - t0
-            self.set_stat('time', delta.total_seconds())
+            context.deadline = caller_deadline
+            self.set_stat('time', (t1 - t0) / 1e9)
+            if 'remaining_budget' in self.stat_key_set:
+                remaining = self.deadline.remaining() if self.deadline.limited() else -1
+                self.set_stat('remaining_budget', remaining)
+            if span is not None:
+                tracer.end(span, self._stats.get('error_status'))
 
         return ret
 
@@ -212,7 +343,7 @@ class Action():
         return cls.__name__
 
     def set_stat(self, key, value):
-        if key in self.get_stat_keys():
+        if key in self.stat_key_set:
             self._stats[key] = value
         else:
             raise BadStatKeyError(f"{key} not defined as stat key in {self}")
@@ -234,8 +365,57 @@ class Action():
         """
         pass
 
+    @classmethod
+    def declared_stat_keys(cls) -> 'list[str]':
+        """Returns the `stat_keys` declared by this class and its bases."""
+        res = []
+        for klass in reversed(cls.__mro__):
+            for key in klass.__dict__.get('stat_keys', []):
+                if key not in res:
+                    res.append(key)
+        return res
+
+    @classmethod
+    def _compute_stat_schema(cls):
+        return cls.declared_stat_keys()
+
+    @classmethod
+    def stat_schema(cls) -> 'frozenset[str]':
+        """Returns all stat keys that instances of this class (in any variant)
+        can set. Computed once per class."""
+        schema = cls.__dict__.get('_stat_schema')
+        if schema is None:
+            schema = frozenset(cls._compute_stat_schema())
+            cls._stat_schema = schema
+        return schema
+
     def get_stat_keys(self) -> 'list[str]':
-        return ['time', 'error_status']
+        """Returns the stat keys of this instance; defaults to the declared
+        `stat_keys`."""
+        return self.declared_stat_keys()
+
+    @property
+    def stat_key_set(self) -> 'frozenset[str]':
+        """Frozen set of `get_stat_keys()`, computed once per instance"""
+        if self._stat_key_set is None:
+            self._stat_key_set = frozenset(self.get_stat_keys())
+        return self._stat_key_set
+
+    def signature(self) -> tuple:
+        """Returns a hashable description of this action, consisting of its
+        name and resolved parameters. Actions with equal signatures are
+        expected to produce the same output for the same input."""
+        params = tuple(sorted((k, str(v)) for k, v in self._params.items()))
+        return (self.name(), params)
+
+    def signature_digest(self) -> str:
+        """Short hex digest of `signature()` that is stable across runs"""
+        return hashlib.sha256(repr(self.signature()).encode()).hexdigest()[:16]
+
+    def prefix_signature(self):
+        """Returns the signature of the first step that this action shares
+        with other variants, or None if it has no steps."""
+        return None
 
     def retrieve_action(self, action_name: str) -> 'Action':
         """
@@ -282,18 +462,18 @@ class Action():
         """Construct an instance of the current action, adhering to
         specification of parameters or choosen action variants as specified by
         filters."""
-        most_specific = context.most_specific_filters(parents, cls.name())
-        parameters = cls.parse_parameters(most_specific)
+        parameters = context.resolve_parameters(parents, cls.name())
         return cls(context, parents, parameters[0])
 
     @classmethod
     def construct_all(cls, context: ActionContext, parents):
         """Construct all combinations of instances of the current action, that
         adhere to the specification of parameters or choosen action variants as
-        specified by filters."""
-        most_specific = context.most_specific_filters(parents, cls.name())
-        parameters = cls.parse_parameters(most_specific)
-        return [cls(context, parents, param) for param in parameters]
+        specified by filters. Returns a generator, instances are constructed
+        lazily."""
+        parameters = context.resolve_parameters(parents, cls.name())
+        for param in parameters:
+            yield cls(context, parents, param)
 
     def __str__(self):
         return self.__class__.__name__
@@ -308,9 +488,23 @@ class SequenceAction(Action):
         self.actions = actions
 
     def run(self, input):
+        # only root sequences (input None) are shared between variants
+        cache = self._context.prefix_cache if input is None else None
+        prefix_key = (tuple(self._call_stack),)
+
         failed_actions = []
-        for action in self.actions:
-            input = action(input)
+        for depth, action in enumerate(self.actions):
+            cached = None
+            if cache is not None:
+                prefix_key += (action.signature(),)
+                cached = cache.lookup(depth, prefix_key)
+            if cached is not None:
+                input, stats = cached
+                action._stats = stats
+            else:
+                input = action(input)
+                if cache is not None and depth < len(self.actions) - 1:
+                    cache.store(depth, prefix_key, input, action._stats)
             # copy error status
             if action.get_stat('error_status') != 'none':
                 failed_actions.append(action.name())
@@ -322,6 +516,22 @@ class SequenceAction(Action):
             self.set_stat("error_status", f"failed({failed_str})")
         return input
 
+    def signature(self) -> tuple:
+        steps = tuple(action.signature() for action in self.actions)
+        return super().signature() + (steps,)
+
+    def prefix_signature(self):
+        if len(self.actions) == 0:
+            return None
+        return (tuple(self._call_stack), self.actions[0].signature())
+
+    @classmethod
+    def _compute_stat_schema(cls):
+        res = super()._compute_stat_schema()
+        for step in cls.steps:
+            res += [step.name() + "." + key for key in step.stat_schema()]
+        return res
+
     def get_stat_keys(self) -> 'list[str]':
         res = super().get_stat_keys()
         for action in self.actions:
@@ -342,17 +552,23 @@ class SequenceAction(Action):
 
     @classmethod
     def construct_all(cls, context: ActionContext, parents):
-        """ TODO
-
+        """Generator over all combinations of the variants of the steps, in the
+        order of `itertools.product`. The variants of a step are constructed
+        again for every combination of the preceding steps, so only the actions
+        of the current combination are kept alive.
         """
-        actions = []
-        for step in cls.steps:
-            step_actions = step.construct_all(context, parents + [cls.name()])
-            actions.append(step_actions)
-        res = []
-        for combination in itertools.product(*actions):
-            res.append(cls(context, parents, combination))
-        return res
+        stack = parents + [cls.name()]
+
+        def combinations(i):
+            if i == len(cls.steps):
+                yield []
+                return
+            for action in cls.steps[i].construct_all(context, stack):
+                for rest in combinations(i + 1):
+                    yield [action] + rest
+
+        for combination in combinations(0):
+            yield cls(context, parents, combination)
 
     def __str__(self):
         steps_str = ",".join([a.__str__() for a in self.actions])
@@ -365,6 +581,8 @@ class ChoiceAction(Action):
     # Dict with names (strings) as keys and actions (actionclasses) as values
     options = {}
 
+    stat_keys = ['option']
+
     def __init__(self, context, parents, option: Action):
         super().__init__(context, parents)
         self.option = option
@@ -375,10 +593,21 @@ class ChoiceAction(Action):
         self.set_stat('option', self.option.name())
         return res
 
+    def signature(self) -> tuple:
+        return super().signature() + (self.option.signature(),)
+
+    def prefix_signature(self):
+        return self.option.prefix_signature()
+
+    @classmethod
+    def _compute_stat_schema(cls):
+        res = super()._compute_stat_schema()
+        for option in cls.options.values():
+            res += option.stat_schema()
+        return res
+
     def get_stat_keys(self) -> 'list[str]':
-        return super().get_stat_keys() + self.option.get_stat_keys() + [
-            "option",
-        ]
+        return super().get_stat_keys() + self.option.get_stat_keys()
 
     @classmethod
     @abstractmethod
@@ -411,9 +640,7 @@ class ChoiceAction(Action):
 
     @classmethod
     def construct_all(cls, context: ActionContext, parents):
-        """ TODO
-
-        """
+        """Generator over the variants of all chosen options"""
         choice_filters = context.most_specific_choice(parents, cls.name())
 
         choices = []
@@ -428,12 +655,10 @@ class ChoiceAction(Action):
             for f in choice_filters:
                 choices.append(cls._parse_choice(f))
 
-        chosen_classes = [cls.options[c] for c in choices]
-        all_actions = []
-        for Class in chosen_classes:
-            actions = Class.construct_all(context, parents + [cls.name()])
-            all_actions += actions
-        return [cls(context, parents, action) for action in all_actions]
+        for choice in choices:
+            Class = cls.options[choice]
+            for action in Class.construct_all(context, parents + [cls.name()]):
+                yield cls(context, parents, action)
 
     def __str__(self):
         res = self.__class__.__name__ + "(" + self.option.__str__() + ")"
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Deadlines for cooperative cancellation of actions.
+
+Every call of an action gets a `Deadline` (see `Action.__call__`): the earlier
+of the deadline of the calling action and the action's own time budget (its
+`timeout` parameter). Long running actions poll `expired()`, external programs
+started with `ProcessAction.run_process` are killed when it passes.
+"""
+
+import math
+import time
+
+
+class Deadline:
+    """Point in time (of `time.monotonic`) by which an action should be done.
+    A deadline without limit never expires."""
+    __slots__ = ['expires']
+
+    def __init__(self, expires=math.inf):
+        self.expires = expires
+
+    @classmethod
+    def after(cls, seconds=None) -> 'Deadline':
+        """Deadline `seconds` from now; None or a negative value (-1) means no
+        limit"""
+        if seconds is None or seconds < 0:
+            return cls()
+        return cls(time.monotonic() + seconds)
+
+    def child(self, seconds=None) -> 'Deadline':
+        """Deadline of a child with a budget of `seconds` (None or -1 for no
+        own limit), which never ends later than this deadline"""
+        return Deadline(min(self.expires, Deadline.after(seconds).expires))
+
+    def split(self, parts: int) -> 'Deadline':
+        """Deadline for one of `parts` children that share the remaining time
+        equally"""
+        if not self.limited():
+            return Deadline()
+        return Deadline.after(self.remaining() / max(1, parts))
+
+    def limited(self) -> bool:
+        return self.expires != math.inf
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def remaining(self) -> float:
+        """Seconds until the deadline (0 if expired, inf without limit)"""
+        return max(0.0, self.expires - time.monotonic())
+
+    def timeout(self):
+        """Remaining seconds as timeout argument (None without limit)"""
+        if not self.limited():
+            return None
+        return self.remaining()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Executors that run (root) actions of a variant sweep.
+
+An executor is a callable that takes an iterable of actions, calls each of them
+with `None` as input and yields them back in their original order once they
+finished, so that printers can read their stats.
+"""
+
+import itertools
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import signal
+import time
+
+from actions.util import kill_process_groups
+
+# seconds a worker gets after the timeout of a variant to stop cooperatively
+# (see `actions.deadline`) before it is stopped
+KILL_GRACE = 1.0
+
+
+def run_variant(action, tracer=None):
+    """Run a root action, recording its trace if a tracer is given."""
+    if tracer is None:
+        action(None)
+    else:
+        # named by the signature, which (unlike the index) identifies the
+        # variant across shards and resumed runs
+        with tracer.variant(action.signature_digest()):
+            action(None)
+
+
+def run_sequential(actions, tracer=None):
+    """Run all actions one after another in the current process."""
+    for action in actions:
+        run_variant(action, tracer)
+        yield action
+
+
+def _terminate(signum, frame):
+    # external programs run in their own process groups, stop them as well
+    kill_process_groups()
+    os._exit(128 + signum)
+
+
+def _worker(batch, conn, tracer):
+    signal.signal(signal.SIGTERM, _terminate)
+    for index, action in batch:
+        run_variant(action, tracer)
+        conn.send((index, dict(action.stats)))
+    conn.close()
+
+
+class _Job:
+    """A worker process running a batch of (index, action) pairs in order."""
+    def __init__(self, batch, ctx, tracer=None):
+        self.batch = batch
+
+        self.conn, child_conn = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(target=_worker,
+                                   args=(batch, child_conn, tracer),
+                                   daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.closed = False
+        self.start_time = time.monotonic()
+
+    def elapsed(self):
+        """Seconds since the current action of the batch was started"""
+        return time.monotonic() - self.start_time
+
+    def done(self):
+        return len(self.batch) == 0
+
+    def receive(self):
+        """Receive the stats of the current action; raises EOFError if the
+        worker died."""
+        index, stats = self.conn.recv()
+        current_index, action = self.batch.pop(0)
+        assert index == current_index
+        action.stats.clear()
+        action.stats.update(stats)
+        self.start_time = time.monotonic()
+        if self.done():
+            self.close()
+        return index, action
+
+    def abort(self, error_status=None):
+        """Stop the worker and mark the current action as failed. The
+        remaining actions of the batch stay in `self.batch`."""
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(KILL_GRACE)
+            if self.process.is_alive():
+                self.process.kill()
+        self.close()
+        if error_status is None:
+            error_status = f"crashed({self.process.exitcode})"
+        index, action = self.batch.pop(0)
+        action.set_stat('error_status', error_status)
+        action.set_stat('time', self.elapsed())
+        return index, action
+
+    def close(self):
+        self.process.join()
+        self.conn.close()
+        self.closed = True
+
+
+class ProcessPool:
+    """Run the actions in forked worker processes, using at most `jobs`
+    workers at once.
+
+    Results are yielded in the order of the input, as soon as all preceding
+    actions are done. A worker that crashes or exceeds `timeout` seconds (-1 for
+    no timeout) on an action only marks the `error_status` of this action.
+    Actions should stop by themselves at their deadline (which the runner sets
+    to `timeout`), the worker is stopped `KILL_GRACE` seconds later.
+
+    If `group_key` is given, consecutive actions with the same (non-None) key
+    are run one after another by the same worker, so that they can share work
+    (see `PrefixCache`). If `tracer` is given, workers export a trace per
+    action (see `actions.trace`).
+    """
+
+    def __init__(self, jobs, timeout=-1, group_key=None, tracer=None):
+        self.jobs = max(1, int(jobs))
+        self.timeout = float(timeout)
+        self.group_key = group_key
+        self.tracer = tracer
+        self._ctx = multiprocessing.get_context("fork")
+
+    def _batches(self, actions):
+        indexed = enumerate(actions)
+        if self.group_key is None:
+            for pair in indexed:
+                yield [pair]
+            return
+        key = lambda pair: self.group_key(pair[1])
+        for group_key, group in itertools.groupby(indexed, key):
+            if group_key is None:
+                for pair in group:
+                    yield [pair]
+            else:
+                yield list(group)
+
+    def _kill_after(self):
+        return self.timeout + KILL_GRACE
+
+    def _wait_timeout(self, running):
+        if self.timeout < 0:
+            return None
+        remaining = [self._kill_after() - job.elapsed() for job in running]
+        return max(0, min(remaining))
+
+    def __call__(self, actions):
+        batches = self._batches(actions)
+        requeued = []
+        exhausted = False
+        running = []
+        finished = {}
+        next_index = 0
+
+        while True:
+            while len(running) < self.jobs:
+                if len(requeued) > 0:
+                    batch = requeued.pop(0)
+                elif not exhausted:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        continue
+                else:
+                    break
+                running.append(_Job(batch, self._ctx, self.tracer))
+            if len(running) == 0:
+                break
+
+            ready = wait([job.conn for job in running]
+                         + [job.process.sentinel for job in running],
+                         self._wait_timeout(running))
+            for job in list(running):
+                if job.conn in ready or job.process.sentinel in ready:
+                    try:
+                        index, action = job.receive()
+                    except (EOFError, OSError):
+                        index, action = job.abort()
+                elif self.timeout >= 0 and job.elapsed() >= self._kill_after():
+                    index, action = job.abort('timeout')
+                else:
+                    continue
+                finished[index] = action
+                if job.closed:
+                    running.remove(job)
+                    if not job.done():
+                        requeued.append(job.batch)
+
+            while next_index in finished:
+                yield finished.pop(next_index)
+                next_index += 1
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Lazy registration of actions.
+
+A `LazyAction` stands in for an action class that is defined in a module that
+has not been imported yet. It knows the name of the action, so it can be
+registered in an ActionContext (or used as a step or option), and imports the
+module only when the class itself is needed, e.g. when the action is
+constructed.
+"""
+
+import importlib
+
+
+class LazyAction:
+    def __init__(self, module: str, name: str):
+        self._module = module
+        self._name = name
+        self._cls = None
+
+    def name(self) -> 'str':
+        return self._name
+
+    def load(self):
+        """Imports the module (once) and returns the action class"""
+        if self._cls is None:
+            module = importlib.import_module(self._module)
+            self._cls = getattr(module, self._name)
+            assert self._cls.name() == self._name, \
+                f"{self._module}.{self._name} is registered as {self._cls.name()}"
+        return self._cls
+
+    def is_loaded(self) -> bool:
+        return self._cls is not None
+
+    def __getattr__(self, attr):
+        # forward everything else (construct, construct_all, stat_schema, ...)
+        # to the action class
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"LazyAction({self._module!r}, {self._name!r})"
+
+
+def lazy_actions(action_modules: 'dict[str, list[str]]') -> 'list[LazyAction]':
+    """Returns a LazyAction for every name in a mapping of module names to the
+    names of the actions they define"""
+    return [LazyAction(module, name)
+            for module, names in action_modules.items()
+            for name in names]
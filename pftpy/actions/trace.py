@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Hierarchical timing of action invocations.
+
+If an ActionContext has a Tracer, every call of one of its actions records a
+span with wall time (`perf_counter_ns`), process cpu time, the enclosing span
+and the call stack of the action. Spans of one variant can be exported in the
+Chrome trace event format (load in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+
+class Span:
+    __slots__ = ['id', 'parent', 'name', 'stack', 'tid', 'start', 'cpu_start',
+                 'duration', 'cpu_duration', 'error_status']
+
+    def __init__(self, id, parent, name, stack):
+        self.id = id
+        self.parent = parent
+        self.name = name
+        self.stack = stack
+        self.tid = threading.get_ident()
+        self.start = time.perf_counter_ns()
+        self.cpu_start = time.process_time_ns()
+        self.duration = None
+        self.cpu_duration = None
+        self.error_status = None
+
+    def trace_event(self, pid):
+        return {
+            'name': self.name,
+            'cat': 'action',
+            'ph': 'X',
+            'ts': self.start / 1000,
+            'dur': self.duration / 1000,
+            'pid': pid,
+            'tid': self.tid,
+            'args': {
+                'id': self.id,
+                'parent': self.parent,
+                'stack': self.stack,
+                'cpu_ms': self.cpu_duration / 1e6,
+                'error_status': self.error_status,
+            },
+        }
+
+
+class Tracer:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.spans = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def _open(self) -> 'list[Span]':
+        # open spans of the current thread (innermost last)
+        if not hasattr(self._local, 'open'):
+            self._local.open = []
+        return self._local.open
+
+    def reset(self):
+        self.spans = []
+        self._local = threading.local()
+
+    def current(self):
+        """Innermost open span of the current thread (or None)"""
+        return self._open[-1] if len(self._open) > 0 else None
+
+    @contextmanager
+    def within(self, span):
+        """Spans begun in the with block (in another thread than the one of
+        `span`) are children of `span`"""
+        outer = self._open
+        self._local.open = [span] if span is not None else []
+        try:
+            yield
+        finally:
+            self._local.open = outer
+
+    def begin(self, action) -> Span:
+        parent = self.current()
+        stack = ":".join(action._call_stack)
+        with self._lock:
+            span = Span(len(self.spans), parent.id if parent else None,
+                        action.name(), stack)
+            self.spans.append(span)
+        self._open.append(span)
+        return span
+
+    def end(self, span: Span, error_status=None):
+        span.duration = time.perf_counter_ns() - span.start
+        span.cpu_duration = time.process_time_ns() - span.cpu_start
+        span.error_status = error_status
+        # spans are closed in reverse order of opening
+        while len(self._open) > 0 and self._open.pop() is not span:
+            pass
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = [span.trace_event(pid) for span in self.spans
+                  if span.duration is not None]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump(self, path):
+        with open(path, "w") as handle:
+            json.dump(self.chrome_trace(), handle)
+
+    @contextmanager
+    def variant(self, signature):
+        """Record the spans of one variant and write them to
+        `<directory>/variant_<signature>.json`, where `signature` is the
+        signature digest of the variant (the `signature` column of the csv)"""
+        self.reset()
+        try:
+            yield self
+        finally:
+            if self.directory is not None:
+                self.dump(os.path.join(self.directory, f"variant_{signature}.json"))
@@ -1,5 +1,299 @@
 #!/usr/bin/env python3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import functools
+import os
+import resource
+import signal
+import subprocess
+import tempfile
+import threading
+
 from actions.base import Action
 
+# process groups of the running external programs (see `run_process`)
+_process_groups = set()
+# programs of one action may be waited for by several threads
+_usage_lock = threading.Lock()
+
+# files exchanged with external programs are kept in memory if possible
+SHM_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+
+@contextmanager
+def shm_file(data: bytes = None, suffix=""):
+    """Yields the path of a temporary file containing `data` (or an empty
+    one, e.g. for results) for programs that only read or write named files.
+    The file is in /dev/shm if available and removed afterwards."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=SHM_DIR)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            if data is not None:
+                handle.write(data)
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def _feed(pipe, data):
+    # writes the input of a program, which may exit without reading it
+    try:
+        pipe.write(data)
+        pipe.close()
+    except BrokenPipeError:
+        pass
+
+
+def kill_process_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def kill_process_groups():
+    """Kill all external programs started by `run_process` in this process
+    that are still running (e.g. when a worker is stopped)"""
+    for pgid in list(_process_groups):
+        kill_process_group(pgid)
+
+
+class RusagePopen(subprocess.Popen):
+    """Popen that reaps its child using `os.wait4` and keeps the resource usage
+    of the child (including its waited-for descendants) in `rusage`."""
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        try:
+            (pid, sts, rusage) = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # see subprocess.Popen._try_wait
+            return (self.pid, 0)
+        if pid == self.pid:
+            self.rusage = rusage
+        return (pid, sts)
+
+
 class ProcessAction(Action):
-    pass
+    """Base class for actions that run external programs.
+
+    Programs should be started with `run_process` (like `subprocess.run`), which
+    records the user/system cpu time (seconds) and peak resident memory (KiB)
+    of the programs started during the current call as stats, and kills them
+    once the deadline of the call expires. Calls of several instances can run
+    concurrently with `gather_calls` / `run_concurrently`.
+    """
+    stat_keys = [
+        'child_utime',
+        'child_stime',
+        'child_maxrss_kb',
+        'remaining_budget',
+    ]
+
+    def __call__(self, input):
+        self._child_usage = [0.0, 0.0, 0]
+        self._set_usage_stats()
+        return super().__call__(input)
+
+    def _set_usage_stats(self):
+        utime, stime, maxrss = self._child_usage
+        self.set_stat('child_utime', utime)
+        self.set_stat('child_stime', stime)
+        self.set_stat('child_maxrss_kb', maxrss)
+
+    def record_usage(self, proc: RusagePopen, children_before=None):
+        """Add the resource usage of a terminated process to the stats.
+        `children_before` (getrusage(RUSAGE_CHILDREN) before starting the
+        process) is used if wait4 did not provide the usage."""
+        usage = proc.rusage
+        with _usage_lock:
+            if usage is None and children_before is not None:
+                after = resource.getrusage(resource.RUSAGE_CHILDREN)
+                self._child_usage[0] += after.ru_utime - children_before.ru_utime
+                self._child_usage[1] += after.ru_stime - children_before.ru_stime
+            elif usage is not None:
+                self._child_usage[0] += usage.ru_utime
+                self._child_usage[1] += usage.ru_stime
+                self._child_usage[2] = max(self._child_usage[2], usage.ru_maxrss)
+            self._set_usage_stats()
+
+    def _process_timeout(self, args, timeout):
+        # the timeout of a program started now (at most until the deadline)
+        remaining = self.deadline.timeout()
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout = remaining
+        if timeout is not None and timeout <= 0:
+            raise subprocess.TimeoutExpired(args, 0)
+        return timeout
+
+    def run_process(self, args, input=None, capture_output=False, timeout=None,
+                    check=False, **kwargs) -> subprocess.CompletedProcess:
+        """Same as `subprocess.run`, but records the resource usage.
+
+        The program runs in its own process group, which is killed (including
+        all processes the program started) and `subprocess.TimeoutExpired` is
+        raised if `timeout` or the deadline of this action expires.
+        """
+        timeout = self._process_timeout(args, timeout)
+
+        kwargs.setdefault('start_new_session', True)
+        if capture_output:
+            kwargs['stdout'] = subprocess.PIPE
+            kwargs['stderr'] = subprocess.PIPE
+        if input is not None:
+            kwargs['stdin'] = subprocess.PIPE
+
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        with RusagePopen(args, **kwargs) as process:
+            _process_groups.add(process.pid)
+            try:
+                stdout, stderr = process.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired as exc:
+                kill_process_group(process.pid)
+                exc.stdout, exc.stderr = process.communicate()
+                raise
+            except:
+                kill_process_group(process.pid)
+                raise
+            finally:
+                process.wait()
+                _process_groups.discard(process.pid)
+                self.record_usage(process, before)
+            retcode = process.poll()
+            if check and retcode:
+                raise subprocess.CalledProcessError(retcode, process.args,
+                                                    output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(process.args, retcode, stdout, stderr)
+
+    def stream_process(self, args, parse, input=None, timeout=None,
+                       check=False, **kwargs) -> subprocess.CompletedProcess:
+        """Like `run_process`, but `parse` reads the output of the program
+        (stdout as file object, e.g. iterated line by line) while it runs, so
+        that the output is never held in memory as a whole. The result of
+        `parse` is returned as `stdout`; stderr is discarded unless given."""
+        timeout = self._process_timeout(args, timeout)
+
+        kwargs.setdefault('start_new_session', True)
+        kwargs.setdefault('stderr', subprocess.DEVNULL)
+        kwargs['stdout'] = subprocess.PIPE
+        if input is not None:
+            kwargs['stdin'] = subprocess.PIPE
+
+        before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        expired = threading.Event()
+        with RusagePopen(args, **kwargs) as process:
+            _process_groups.add(process.pid)
+
+            def expire():
+                expired.set()
+                kill_process_group(process.pid)
+            # reading blocks, the timer ends the program (and thereby the
+            # output) once the timeout expires
+            timer = threading.Timer(timeout, expire) if timeout is not None else None
+            feeder = threading.Thread(target=_feed, args=(process.stdin, input)) \
+                if input is not None else None
+            try:
+                if timer is not None:
+                    timer.start()
+                if feeder is not None:
+                    feeder.start()
+                try:
+                    result = parse(process.stdout)
+                    # parse may stop before the end of the output
+                    process.stdout.read()
+                except Exception as exc:
+                    if expired.is_set():
+                        raise subprocess.TimeoutExpired(args, timeout) from exc
+                    raise
+                process.wait()
+                if expired.is_set():
+                    raise subprocess.TimeoutExpired(args, timeout)
+            except:
+                kill_process_group(process.pid)
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+                if feeder is not None:
+                    feeder.join()
+                process.wait()
+                _process_groups.discard(process.pid)
+                self.record_usage(process, before)
+            retcode = process.returncode
+            if check and retcode:
+                raise subprocess.CalledProcessError(retcode, process.args)
+        return subprocess.CompletedProcess(process.args, retcode, result, None)
+
+    async def run_process_async(self, args, **kwargs) -> subprocess.CompletedProcess:
+        """`run_process` for coroutines: a thread of the event loop's executor
+        waits for the program, so that several programs of this call can run
+        at once (e.g. with `asyncio.gather`)"""
+        loop = asyncio.get_running_loop()
+        run = functools.partial(self.run_process, args, **kwargs)
+        return await loop.run_in_executor(None, run)
+
+
+def _call(action: Action, input, deadline, span):
+    # runs in a worker thread of gather_calls
+    context = action._context
+    tracer = context.tracer
+    context.deadline = deadline
+    try:
+        with tracer.within(span) if tracer is not None else nullcontext():
+            return action(input)
+    finally:
+        context.deadline = None
+
+
+async def gather_calls(calls, max_processes=None) -> list:
+    """Calls the actions of `calls` (pairs of action and input) concurrently,
+    at most `max_processes` (default: number of cpus) at a time, and returns
+    their outputs in order.
+
+    Every call runs in a thread that mostly waits for the external programs of
+    the action (see `ProcessAction.run_process`). The stats of a call are set
+    in its action as usual, so an action must not occur twice in `calls` (use
+    `Action.clone`). All calls get the deadline of the caller; calls that
+    would start after it expired are not run (their output is None and their
+    action has no stats).
+    """
+    calls = list(calls)
+    if len(calls) == 0:
+        return []
+    if max_processes is None or max_processes < 1:
+        max_processes = os.cpu_count() or 1
+
+    context = calls[0][0]._context
+    deadline = context.deadline
+    span = context.tracer.current() if context.tracer is not None else None
+
+    loop = asyncio.get_running_loop()
+    outputs = [None] * len(calls)
+    workers = min(max_processes, len(calls))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+
+        async def collect(return_when):
+            done, _ = await asyncio.wait(running, return_when=return_when)
+            for future in done:
+                outputs[running.pop(future)] = future.result()
+
+        for index, (action, input) in enumerate(calls):
+            if len(running) == workers:
+                await collect(asyncio.FIRST_COMPLETED)
+            if deadline is not None and deadline.expired():
+                break
+            future = loop.run_in_executor(executor, _call, action, input, deadline, span)
+            running[future] = index
+        if len(running) > 0:
+            await collect(asyncio.ALL_COMPLETED)
+    return outputs
+
+
+def run_concurrently(calls, max_processes=None) -> list:
+    """Synchronous variant of `gather_calls` (for use in `Action.run`)"""
+    return asyncio.run(gather_calls(calls, max_processes))
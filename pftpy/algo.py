@@ -1,40 +1,23 @@
+import os
 from runner import Runner
 from actions import ChoiceAction
-from graph_actions.general_outline import (
-    PFlattenedTreewidth,
-    PartitionTreedec,
-    PartitionOneBag,
-    CalcStats,
-    CalcStats2,
-)
-#from graph_actions import *
-from graph_actions import (
-    blowup, contraction, general_outline, generate_graph, greedy_partition,
-    partition, partition_bags, treewidth, hitting_set, maximal_cliques
-)
-
-
-all_actions = []
-all_actions += blowup.defined_actions
-all_actions += contraction.defined_actions
-all_actions += general_outline.defined_actions
-all_actions += generate_graph.defined_actions
-all_actions += greedy_partition.defined_actions
-all_actions += partition.defined_actions
-all_actions += partition_bags.defined_actions
-all_actions += treewidth.defined_actions
-all_actions += hitting_set.defined_actions
-all_actions += maximal_cliques.defined_actions
+from actions.registry import LazyAction, lazy_actions
+from graph_actions import action_modules
+
+# actions are registered lazily, their modules (and igraph, numpy, ...) are only
+# imported once an action is constructed
+all_actions = lazy_actions(action_modules)
+lazy = {action.name(): action for action in all_actions}
 
 import argh
 
 class Algo(ChoiceAction):
     options = {
-        "pft": PFlattenedTreewidth,
-        "part_treedec": PartitionTreedec,
-        "bag": PartitionOneBag,
-        "stats": CalcStats,
-        "stats2": CalcStats2,
+        "pft": lazy["PFlattenedTreewidth"],
+        "part_treedec": lazy["PartitionTreedec"],
+        "bag": lazy["PartitionOneBag"],
+        "stats": LazyAction("graph_actions.general_outline", "CalcStats"),
+        "stats2": lazy["CalcStats2"],
     }
 
     @staticmethod
@@ -43,11 +26,33 @@ class Algo(ChoiceAction):
 
 all_actions.append(Algo)
 
-runner = Runner("Algo", *all_actions)
+# the stat schema cache lives next to the sources it is derived from, unless
+# PFTPY_SCHEMA_CACHE names another directory
+schema_cache = os.environ.get(
+    "PFTPY_SCHEMA_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "schema"))
+runner = Runner("Algo", *all_actions, schema_cache=schema_cache)
+
+
+def convert(*paths):
+    """Writes the binary CSR copies of graph files (edge lists, .gr), or of
+    all graph files in directories, which are read by ReadEL(cache=true),
+    ReadELBatch(cache=true) and ReadGR(cache=true)"""
+    from graph_actions import csr_cache
+    from graph_actions.generate_graph import ReadELBatch
+    for path in paths:
+        for name in ReadELBatch.list_files(path):
+            csr, hit = csr_cache.convert(name)
+            status = "up to date" if hit else "converted"
+            yield f"{name}: n={csr.vcount()} m={csr.ecount()} ({status})"
+
 
+# flush every row, so that redirected output is written as variants finish
 argh.dispatch_commands([
     runner.run,
     runner.run_all,
+    runner.merge,
     runner.print,
-    runner.print_all
-])
+    runner.print_all,
+    convert,
+], always_flush=True)
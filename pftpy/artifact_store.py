@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk store for artifacts (e.g. tree decompositions)
+that are expensive to compute and shared between experiment processes.
+
+Artifacts are addressed by a hex digest and written atomically (temporary file
++ rename in the same directory), so concurrent writers never expose partially
+written files to readers.
+"""
+import hashlib
+import io
+import os
+import tempfile
+
+import igraph
+import numpy as np
+
+
+def digest(*parts) -> str:
+    """sha256 hex digest of the string representations of `parts`"""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def graph_fingerprint(graph) -> str:
+    """Digest of the (labeled, undirected) edge set and vertex count of an
+    igraph graph, independent of the order of edges."""
+    edges = np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+    edges.sort(axis=1)
+    edges = edges[np.lexsort((edges[:, 1], edges[:, 0]))]
+    h = hashlib.sha256()
+    h.update(f"n={graph.vcount()};".encode())
+    h.update(edges.tobytes())
+    return h.hexdigest()
+
+
+def graph_to_bytes(graph) -> bytes:
+    """Serialize an igraph graph with its (numeric) vertex attributes into an
+    uncompressed .npz archive"""
+    arrays = {
+        'n': np.array(graph.vcount(), dtype=np.int64),
+        'edges': np.array(graph.get_edgelist(), dtype=np.int32).reshape(-1, 2),
+    }
+    for attr in graph.vs.attributes():
+        arrays['vs_' + attr] = np.array(graph.vs[attr])
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def graph_from_bytes(data: bytes):
+    """Inverse of `graph_to_bytes`"""
+    with np.load(io.BytesIO(data)) as arrays:
+        graph = igraph.Graph(int(arrays['n']), arrays['edges'].tolist())
+        for name in arrays.files:
+            if name.startswith('vs_'):
+                graph.vs[name[3:]] = arrays[name].tolist()
+    return graph
+
+
+class ArtifactStore:
+    def __init__(self, root, suffix=""):
+        self.root = root
+        self.suffix = suffix
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + self.suffix)
+
+    def get(self, key: str):
+        """Returns the stored bytes for `key` or None if not present"""
+        try:
+            with open(self.path(key), "rb") as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
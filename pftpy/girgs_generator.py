@@ -10,6 +10,11 @@ from os import path
 from random import randint
 
 import igraph
+import numpy as np
+
+from graph_actions.girg import girg
+from graph_actions.hrg import hrg
+from graph_actions.parsers import read_coordinates, read_edges, read_girgs_graph
 
 
 def polartoxy(dist, theta=None):
@@ -20,10 +25,13 @@ def polartoxy(dist, theta=None):
     return (x,y)
 
 class generator(object):
-    def __init__(self, exec_dir=None):
+    def __init__(self, exec_dir=None, run=subprocess.run):
+        """`run` is used instead of subprocess.run to call the generators"""
         if exec_dir is None:
             exec_dir = "./girgs/build"
 
+        self.run = run
+
         self.exec_dir = exec_dir
         self.hrg_exec = path.join(self.exec_dir, "genhrg")
         self.girg_exec = path.join(self.exec_dir, "gengirg")
@@ -64,7 +72,7 @@ class generator(object):
                 kwargs[k] = v
         for k in kwargs.keys():
             command += [f'-{k}', str(kwargs[k])]
-        p = subprocess.run(command, capture_output=True, check=True, text=True)
+        p = self.run(command, capture_output=True, check=True, text=True)
         if output:
             print(p.stdout)
 
@@ -81,44 +89,67 @@ class generator(object):
                 kwargs[k] = v
         for k in kwargs.keys():
             command += [f'-{k}', str(kwargs[k])]
-        p = subprocess.run(command, capture_output=True, check=True, text=True)
+        p = self.run(command, capture_output=True, check=True, text=True)
         if output:
             print(p.stdout)
     
-    def parse_gargs_graph(self, fname):
-        with open(fname) as handle:
-            n, m = handle.readline().strip().split(" ")
-            handle.readline()
-            lines = [line.strip().split(" ") for line in handle]
-            edges = [(int(line[0]), int(line[1])) for line in lines]
-        graph = igraph.Graph(int(n), edges)
-        return graph
+    def parse_gargs_graph(self, fname, giant=False, **vertex_arrays):
+        """Generated graph (or only its giant component, built without the
+        rest) with the given vertex attributes"""
+        return read_girgs_graph(fname, giant, **vertex_arrays)
 
 
-    def create_girg(self, n, seed=None, **kwargs) -> igraph.Graph:
+    def create_girg(self, n, seed=None, giant=False, **kwargs) -> igraph.Graph:
         txtfile = tempfile.NamedTemporaryFile(suffix=".txt")
         name = txtfile.name[:-4]
 
         self.gengirg(n, name, seed=seed, output=False, **kwargs)
-        return self.parse_gargs_graph(txtfile.name)
+        return self.parse_gargs_graph(txtfile.name, giant)
 
-    def create_hrg(self, n, seed=None, coords=False, **kwargs) -> igraph.Graph:
+    def create_hrg(self, n, seed=None, coords=False, giant=False, **kwargs) -> igraph.Graph:
         txtfile = tempfile.NamedTemporaryFile(suffix=".txt")
         name = txtfile.name[:-4]
 
         self.genhrg(n, name, seed=seed, coords=coords, output=False, **kwargs)
-        graph = self.parse_gargs_graph(txtfile.name)
+        vertex_arrays = {}
         if coords:
-            with open(name + '.hyp') as handle:
-                lines = [line.strip().split(" ") for line in handle]
-                coords = [(float(line[0]), float(line[1])) for line in lines]
-                graph.vs['r'] = [c[0] for c in coords]
-                graph.vs['theta'] = [c[1] for c in coords]
-                coords = [polartoxy(coord) for coord in coords]
-                graph.vs['x'] = [c[0] for c in coords]
-                graph.vs['y'] = [c[1] for c in coords]
+            r, theta = read_coordinates(name + '.hyp').T
+            vertex_arrays = {'r': r, 'theta': theta,
+                             'x': np.cos(theta) * r, 'y': np.sin(theta) * r}
             os.remove(name + '.hyp')
-        return graph
+        return self.parse_gargs_graph(txtfile.name, giant, **vertex_arrays)
+
+    def create_numpy_girg(self, n, seed=None, giant=False, d=1, ple=2.5, alpha='inf',
+                          deg=10, threads=None, **seeds) -> igraph.Graph:
+        """GIRG like create_girg, sampled in this process (see
+        graph_actions.girg) instead of by gengirg; `threads` is ignored"""
+        n = int(n)
+        for k, v in self.gen_girg_seeds(seed):
+            seeds.setdefault(k, v)
+        unknown = seeds.keys() - {'wseed', 'pseed', 'sseed'}
+        if unknown:
+            raise ValueError(f"unknown GIRG options {sorted(unknown)}")
+        seeds = {k: int(v) for k, v in seeds.items()}
+        _, _, edges = girg(n, int(d), float(ple), float(alpha), float(deg), **seeds)
+        return read_edges(n, edges, giant)
+
+    def create_numpy_hrg(self, n, seed=None, coords=False, giant=False, deg=10,
+                         alpha=0.75, t=0, threads=None, **seeds) -> igraph.Graph:
+        """HRG like create_hrg, sampled in this process (see
+        graph_actions.hrg) instead of by genhrg; `threads` is ignored"""
+        n = int(n)
+        for k, v in self.gen_hrg_seeds(seed):
+            seeds.setdefault(k, v)
+        unknown = seeds.keys() - {'rseed', 'aseed', 'sseed'}
+        if unknown:
+            raise ValueError(f"unknown HRG options {sorted(unknown)}")
+        seeds = {k: int(v) for k, v in seeds.items()}
+        r, theta, edges = hrg(n, float(deg), float(alpha), float(t), **seeds)
+        vertex_arrays = {}
+        if str(coords).lower() != 'false':
+            vertex_arrays = {'r': r, 'theta': theta,
+                             'x': np.cos(theta) * r, 'y': np.sin(theta) * r}
+        return read_edges(n, edges, giant, **vertex_arrays)
 
 #gen = generator('/home/marcus/Software/girgs/build/')
 #g = gen.create_hrg(1000)
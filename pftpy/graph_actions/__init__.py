@@ -0,0 +1,33 @@
+# Names of the actions in the `defined_actions` of each module, so that they
+# can be registered without importing the modules (see actions.registry).
+# Keep in sync with the modules (checked by tests/test_registry.py).
+action_modules = {
+    "graph_actions.blowup": ["Blowup"],
+    "graph_actions.contraction": ["Contraction"],
+    "graph_actions.general_outline": [
+        "PFlattenedTreewidth", "PartitionTreedec", "PartitionOneBag", "CalcStats2",
+    ],
+    "graph_actions.generate_graph": [
+        "HRGGen", "NumpyHRGGen", "GirgGen", "NumpyGirgGen", "ReadGR", "ReadEL",
+        "ReadELBatch", "GraphInput",
+    ],
+    "graph_actions.greedy_partition": [
+        "GreedyIS", "MaximalIS", "AssignGreedy", "AssignLargerNeighborhood",
+        "AssignVertices",
+    ],
+    "graph_actions.partition": [
+        "Greedy", "LargestCliqueRepeat", "FastLargestCliqueBad",
+        "FastLargestClique", "MaxRadiusFullNeighborhood", "CliqueAndRadius",
+        "MinHSPartition", "WeightedHSPartition", "BFPartition",
+        "BranchingPartition", "Partition",
+    ],
+    "graph_actions.partition_bags": ["PartitionBags", "PartLargestBag"],
+    "graph_actions.treewidth": [
+        "HTD", "WeightedMindeg", "CliqueGreedy", "IterativeCliqueGreedy",
+        "Treewidth", "BlowupTreewidth", "WeightedTreewidth",
+    ],
+    "graph_actions.hitting_set": ["HSBranchReduce", "GurobiHS", "HittingSet"],
+    "graph_actions.maximal_cliques": [
+        "MaxCliquesIGraph", "QuickCliques", "MaximalCliques",
+    ],
+}
@@ -24,6 +24,7 @@ class Blowup(base.SimpleAction):
 defined_actions = []
 
 class Blowup(Action):
+    stat_keys = ['in_n', 'out_n']
 
     def run(self, g: igraph.Graph):
         sequences = []
@@ -46,7 +47,4 @@ class Blowup(Action):
         self.set_stat('out_n', output.vcount())
         return output
 
-
-    def get_stat_keys(self) -> 'list[str]':
-        return super().get_stat_keys() + ['in_n', 'out_n']
 defined_actions.append(Blowup)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Connected components of graphs given as a stream of edge chunks.
+
+`giant_edges` keeps only a union-find array and the degrees while the edges
+are read, and then collects the (relabeled) edges of the giant component in a
+second pass, so neither the whole graph nor a copy of it is built.
+"""
+
+import numpy as np
+
+
+class UnionFind:
+    """Array-based union-find over the vertices 0..n-1 (growing with the
+    largest vertex seen); the root of a set is its smallest vertex"""
+    def __init__(self, n=0):
+        self.parent = np.arange(n, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def grow(self, n):
+        if n > len(self.parent):
+            size = max(n, 2 * len(self.parent))
+            grown = np.arange(size, dtype=np.int64)
+            grown[:len(self.parent)] = self.parent
+            self.parent = grown
+
+    def find(self, x) -> np.ndarray:
+        """Roots of the vertices x (and compresses their paths)"""
+        roots = self.parent[x]
+        while True:
+            up = self.parent[roots]
+            if np.array_equal(up, roots):
+                break
+            roots = up
+        self.parent[x] = roots
+        return roots
+
+    def union(self, u, v):
+        """Joins the sets of u[i] and v[i] for all i"""
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        while len(u) > 0:
+            ru, rv = self.find(u), self.find(v)
+            apart = ru != rv
+            u, v, ru, rv = u[apart], v[apart], ru[apart], rv[apart]
+            # every larger root is hooked below one of its smaller partners,
+            # so the number of roots decreases in every round
+            hooked = np.unique(np.maximum(ru, rv))
+            np.minimum.at(self.parent, np.maximum(ru, rv), np.minimum(ru, rv))
+            # pointer jumping: chains of hooked roots (as long as the paths of
+            # the input) shrink to depth one in logarithmically many steps
+            while True:
+                up = self.parent[self.parent[hooked]]
+                if np.array_equal(up, self.parent[hooked]):
+                    break
+                self.parent[hooked] = up
+
+    def roots(self) -> np.ndarray:
+        """Root of every vertex"""
+        return self.find(np.arange(len(self.parent)))
+
+
+def giant_edges(chunks, n=None) -> 'tuple[np.ndarray, np.ndarray]':
+    """Giant component of the graph whose edges are the (m_i, 2) arrays
+    yielded by `chunks()` (called twice). The vertices are 0..n-1 (by default
+    0..largest id); ties are broken towards the component with the smallest
+    vertex, like igraph. Returns the ascending original ids of the giant
+    component's vertices and its edges (in input order) as int32 array with
+    the vertices relabeled 0..k-1."""
+    union_find = UnionFind(n or 0)
+    degrees = np.zeros(n or 0, dtype=np.int64)
+    for chunk in chunks():
+        if len(chunk) == 0:
+            continue
+        size = int(chunk.max()) + 1
+        union_find.grow(size)
+        if size > len(degrees):
+            degrees = np.concatenate((degrees, np.zeros(size - len(degrees), dtype=np.int64)))
+        degrees += np.bincount(chunk.ravel(), minlength=len(degrees))
+        union_find.union(chunk[:, 0], chunk[:, 1])
+
+    n = len(degrees) if n is None else n
+    roots = union_find.roots()[:n]
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.int32)
+    in_giant = roots == np.argmax(np.bincount(roots))
+    vertices = np.flatnonzero(in_giant)
+    index = np.full(n, -1, dtype=np.int32)
+    index[vertices] = np.arange(len(vertices), dtype=np.int32)
+
+    edges = np.empty((int(degrees[vertices].sum()) // 2, 2), dtype=np.int32)
+    filled = 0
+    for chunk in chunks():
+        chunk = chunk[in_giant[chunk[:, 0]]]
+        edges[filled:filled + len(chunk)] = index[chunk]
+        filled += len(chunk)
+    assert filled == len(edges), "chunks differ between the passes"
+    return vertices, edges
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Array-backed graphs for the hot paths of the algorithms.
+
+A `CSRGraph` stores an undirected graph in compressed sparse row form: the
+neighbors of vertex v are `neighbors[offsets[v]:offsets[v+1]]`, sorted in
+ascending order, and vertex attributes are numpy columns. Reading neighbors,
+degrees and attributes does not go through igraph's Python-level attribute
+access, and adjacency tests are binary searches.
+
+Conversion from an igraph.Graph copies the edge list once (igraph does not
+expose its internal arrays).
+"""
+
+import igraph
+import numpy as np
+
+from graph_actions.solver_io import edge_array
+
+
+def csr_from_edges(n, edges) -> 'tuple[np.ndarray, np.ndarray]':
+    """CSR arrays (offsets, neighbors) of an undirected graph with vertices
+    0..n-1 and the edges of an array of shape (m, 2); neighbors are sorted"""
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources = np.concatenate((edges[:, 0], edges[:, 1]))
+    targets = np.concatenate((edges[:, 1], edges[:, 0]))
+    # sorting source*n + target orders by source, then target
+    neighbors = np.sort(sources * n + targets) % n
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    dtype = np.int32 if n <= np.iinfo(np.int32).max else np.int64
+    return offsets, neighbors.astype(dtype)
+
+
+def _column(values) -> np.ndarray:
+    # attribute values as numpy column (of objects, e.g. for lists)
+    column = None
+    try:
+        column = np.asarray(values)
+    except ValueError:
+        pass
+    if column is None or column.ndim != 1:
+        column = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            column[i] = value
+    return column
+
+
+class CSRGraph:
+    def __init__(self, offsets, neighbors, attributes=None, vertex_ids=None):
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.vs = {} if attributes is None else dict(attributes)
+        """dict: vertex attribute name -> numpy column"""
+        self.vertex_ids = vertex_ids
+        """np.ndarray or None: vertex of the original graph of each vertex
+        (for induced subgraphs)"""
+
+    @classmethod
+    def from_edges(cls, n, edges, **attributes) -> 'CSRGraph':
+        offsets, neighbors = csr_from_edges(n, edges)
+        return cls(offsets, neighbors,
+                   {name: _column(column) for name, column in attributes.items()})
+
+    @classmethod
+    def from_igraph(cls, graph: igraph.Graph, attributes=None) -> 'CSRGraph':
+        """CSRGraph of an (undirected, simple) igraph.Graph with the given
+        vertex attributes (default: all) as columns"""
+        if attributes is None:
+            attributes = graph.vs.attributes()
+        return cls.from_edges(graph.vcount(), edge_array(graph),
+                              **{attr: graph.vs[attr] for attr in attributes})
+
+    def to_igraph(self) -> igraph.Graph:
+        graph = igraph.Graph(self.vcount(), self.edge_array().tolist())
+        for name, column in self.vs.items():
+            graph.vs[name] = column.tolist()
+        return graph
+
+    def vcount(self) -> int:
+        return len(self.offsets) - 1
+
+    def ecount(self) -> int:
+        return len(self.neighbors) // 2
+
+    def degrees(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def neighbors_of(self, v) -> np.ndarray:
+        """Sorted neighbors of v (a view)"""
+        return self.neighbors[self.offsets[v]:self.offsets[v+1]]
+
+    def sources(self) -> np.ndarray:
+        """Vertex of each entry of `neighbors`"""
+        return np.repeat(np.arange(self.vcount()), self.degrees())
+
+    def has_edge(self, u, v) -> bool:
+        neighs = self.neighbors_of(u)
+        i = np.searchsorted(neighs, v)
+        return i < len(neighs) and neighs[i] == v
+
+    def has_edges(self, us, vs) -> np.ndarray:
+        """Adjacency test for every pair (us[i], vs[i])"""
+        us = np.asarray(us, dtype=np.int64)
+        vs = np.asarray(vs, dtype=np.int64)
+        if len(self.neighbors) == 0:
+            return np.zeros(len(us), dtype=bool)
+        # neighbors are sorted within rows, so row*n + neighbor is sorted
+        n = self.vcount()
+        keys = self.sources() * n + self.neighbors
+        wanted = us * n + vs
+        pos = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        return keys[pos] == wanted
+
+    def is_clique(self) -> bool:
+        n = self.vcount()
+        return self.ecount() == n*(n-1) // 2
+
+    def edge_array(self) -> np.ndarray:
+        """Edges (u, v) with u < v as array of shape (m, 2)"""
+        sources = self.sources()
+        upper = sources < self.neighbors
+        return np.stack((sources[upper], self.neighbors[upper]), axis=1)
+
+    def induced_subgraph(self, vertices) -> 'CSRGraph':
+        """Subgraph induced by `vertices` (in ascending order, like igraph),
+        `vertex_ids` maps its vertices to the ones of this graph"""
+        vertices = np.unique(np.asarray(vertices, dtype=np.int64))
+        index = np.full(self.vcount(), -1, dtype=np.int64)
+        index[vertices] = np.arange(len(vertices))
+
+        lengths = self.degrees()[vertices]
+        rows = np.repeat(np.arange(len(vertices)), lengths)
+        starts = np.repeat(self.offsets[vertices] - np.cumsum(lengths) + lengths, lengths)
+        targets = index[self.neighbors[starts + np.arange(len(rows))]]
+        keep = targets >= 0
+        rows, targets = rows[keep], targets[keep]
+
+        offsets = np.zeros(len(vertices) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(vertices)), out=offsets[1:])
+        attributes = {name: column[vertices] for name, column in self.vs.items()}
+        ids = vertices if self.vertex_ids is None else self.vertex_ids[vertices]
+        return CSRGraph(offsets, targets.astype(self.neighbors.dtype), attributes, ids)
+
+    def adjacency_sets(self) -> 'list[set[int]]':
+        """Neighbors of every vertex as (mutable) set, e.g. to add fill edges"""
+        bounds = self.offsets.tolist()
+        neighbors = self.neighbors.tolist()
+        return [set(neighbors[a:b]) for a, b in zip(bounds, bounds[1:])]
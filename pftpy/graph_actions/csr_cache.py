@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Binary CSR copies of graph files (e.g. the real-world edge lists).
+
+A graph file `dir/name` is converted once into `dir/.name.csr` (hidden, so
+that ReadELBatch and globs over the corpus skip it); later loads map that file
+into memory and build the graph from its arrays instead of parsing text.
+
+Layout (little endian):
+    header     magic, n, m, size and mtime (ns) of the source file and the
+               sha256 digest of its content
+    offsets    int64[n+1] at byte 128
+    neighbors  int32[2m], aligned to 64 bytes; self-loops appear twice
+
+A copy is used as long as size and mtime of its source are unchanged; if only
+the mtime changed (e.g. the corpus was copied without preserving times), the
+sha256 digest of the source decides.
+Converted graphs have their edges in CSR order (by smaller, then larger end).
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+
+import igraph
+import numpy as np
+
+from graph_actions.csr import csr_from_edges
+from graph_actions.parsers import graph_from_edges, read_edge_list, read_pace_gr
+from graph_actions.solver_io import edge_array
+
+MAGIC = b"PFTCSR01"
+_HEADER = struct.Struct("<8sqqqq32s")
+_ALIGN = 64
+_DATA_START = 128
+
+
+def cache_path(path) -> str:
+    directory, name = os.path.split(os.fspath(path))
+    return os.path.join(directory, "." + name + ".csr")
+
+
+def reader_for(path):
+    """Parser of a graph file: PACE for .gr (.gr.gz), edge list otherwise"""
+    name = os.fspath(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return read_pace_gr if name.endswith(".gr") else read_edge_list
+
+
+class CSRFile:
+    """Memory-mapped binary CSR copy of a graph file"""
+    def __init__(self, path):
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(raw) < _DATA_START:
+            raise ValueError(f"{path} is not a CSR file")
+        magic, n, m, self.source_size, self.source_mtime, digest = \
+            _HEADER.unpack(raw[:_HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a CSR file")
+        self.digest = digest.hex()
+        """str: sha256 hex digest of the source file"""
+
+        start = _DATA_START
+        self.offsets = raw[start:start + 8*(n+1)].view(np.int64)
+        start += _ALIGN * (1 + 8*(n+1) // _ALIGN)
+        self.neighbors = raw[start:start + 4*2*m].view(np.int32)
+        if len(self.neighbors) != 2*m:
+            raise ValueError(f"{path} is truncated")
+
+    def vcount(self) -> int:
+        return len(self.offsets) - 1
+
+    def ecount(self) -> int:
+        return len(self.neighbors) // 2
+
+    def fresh(self, source) -> bool:
+        """Whether the copy belongs to the current content of `source`"""
+        stat = os.stat(source)
+        if stat.st_size != self.source_size:
+            return False
+        if stat.st_mtime_ns == self.source_mtime:
+            return True
+        return _file_digest(source).hex() == self.digest
+
+    def edge_array(self) -> np.ndarray:
+        """Edges (u, v) with u <= v as array of shape (m, 2)"""
+        sources = np.repeat(np.arange(self.vcount(), dtype=np.int32),
+                            np.diff(self.offsets))
+        keep = sources < self.neighbors
+        # the two entries of a self-loop are adjacent in its row
+        keep[np.flatnonzero(sources == self.neighbors)[::2]] = True
+        return np.stack((sources[keep], self.neighbors[keep]), axis=1)
+
+    def to_igraph(self) -> igraph.Graph:
+        return graph_from_edges(self.vcount(), self.edge_array())
+
+
+def _file_digest(path) -> bytes:
+    h = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
+def write_csr(source, graph: igraph.Graph) -> str:
+    """Writes the CSR copy of `graph` read from `source` (atomically, so that
+    concurrent readers see either no or the complete file), returns its path"""
+    stat = os.stat(source)
+    digest = _file_digest(source)
+    n = graph.vcount()
+    offsets, neighbors = csr_from_edges(n, edge_array(graph))
+
+    path = cache_path(source)
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            header = _HEADER.pack(MAGIC, n, graph.ecount(), stat.st_size,
+                                  stat.st_mtime_ns, digest)
+            handle.write(header.ljust(_DATA_START, b"\0"))
+            data = offsets.astype("<i8").tobytes()
+            handle.write(data.ljust(_ALIGN * (1 + len(data) // _ALIGN), b"\0"))
+            handle.write(neighbors.astype("<i4").tobytes())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load(source):
+    """The CSRFile of `source`, None if there is none or it is outdated"""
+    try:
+        csr = CSRFile(cache_path(source))
+    except (FileNotFoundError, ValueError):
+        return None
+    return csr if csr.fresh(source) else None
+
+
+def convert(source, reader=None) -> 'tuple[CSRFile, bool]':
+    """The CSRFile of `source`, parsed (with `reader`, see `reader_for`) and
+    written unless an up to date one exists, and whether it existed"""
+    csr = load(source)
+    if csr is not None:
+        return csr, True
+    reader = reader or reader_for(source)
+    write_csr(source, reader(source))
+    return CSRFile(cache_path(source)), False
+
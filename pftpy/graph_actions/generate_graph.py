@@ -1,19 +1,37 @@
 #!/usr/bin/env python3
 from abc import abstractmethod
 from actions import Action, ChoiceAction
+from actions.util import ProcessAction
 import girgs_generator
+from artifact_store import ArtifactStore, digest, graph_from_bytes, graph_to_bytes
+from graph_actions.parsers import giant_component, read_edge_list, read_pace_gr
+import graph_actions.csr_cache as csr_cache
+from glob import glob
+import os
 from os.path import basename
 import igraph
 
 defined_actions = []
-class AbstractGirg(Action):
+class AbstractGirg(ProcessAction):
+    stat_keys = [
+        "girg_options",
+        "n",
+        "n_gen",
+        "m",
+        "graph_cache",
+    ]
+    # seeds of the generator, derived from `seed` unless given explicitly
+    seed_keys = ()
+
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
         self._n = self._params['n']
         self._exec_dir = self._params['exec_dir']
+        self._cache = str(self._params['cache']).lower() != 'false'
+        self._store = ArtifactStore(self._params['cache_dir'], suffix=".npz")
 
-        other_keys = ['n', 'exec_dir']
+        other_keys = ['n', 'exec_dir', 'cache', 'cache_dir']
         girg_keys = self._params.keys() - set(other_keys)
         self._girg_dic = {k: self._params[k] for k in girg_keys}
 
@@ -21,14 +39,41 @@ class AbstractGirg(Action):
     def default_params():
         return {
             'n': '1000',
-            'exec_dir': None
+            'exec_dir': None,
+            # giant components of seeded graphs are stored in cache_dir
+            'cache': True,
+            'cache_dir': './cache/graphs',
         }
 
-    def run(self, _in):
-        gen = girgs_generator.generator(exec_dir=self._exec_dir)
+    def cache_key(self):
+        """Key of the generated graph, None if it is not reproducible, i.e.
+        some seed of the generator is neither given nor derived from `seed`"""
+        seed = self._girg_dic.get('seed')
+        if (seed is None or seed == 'auto') and \
+                not all(key in self._girg_dic for key in self.seed_keys):
+            return None
+        options = sorted((k, str(v)) for k, v in self._girg_dic.items())
+        return digest(self.optionname(), self._n, options)
+
+    def generate(self):
+        gen = girgs_generator.generator(exec_dir=self._exec_dir, run=self.run_process)
         create_fun = self.create_graph(gen)
-        graph = create_fun(self._n, **self._girg_dic)
-        graph = graph.components().giant()
+        return create_fun(self._n, giant=True, **self._girg_dic)
+
+    def run(self, _in):
+        key = self.cache_key() if self._cache else None
+        if key is None:
+            self.set_stat('graph_cache', 'off')
+            graph = self.generate()
+        else:
+            stored = self._store.get(key)
+            if stored is not None:
+                self.set_stat('graph_cache', 'hit')
+                graph = graph_from_bytes(stored)
+            else:
+                self.set_stat('graph_cache', 'miss')
+                graph = self.generate()
+                self._store.put(key, graph_to_bytes(graph))
         self.set_stat('n', graph.vcount())
         self.set_stat('n_gen', self._n)
         self.set_stat('m', graph.ecount())
@@ -40,14 +85,6 @@ class AbstractGirg(Action):
 
         return graph
 
-    def get_stat_keys(self):
-        keys = super().get_stat_keys()
-        keys += ["girg_options"]
-        keys += ["n"]
-        keys += ["n_gen"]
-        keys += ["m"]
-        return keys
-
     @staticmethod
     def optionname():
         pass
@@ -57,6 +94,7 @@ class AbstractGirg(Action):
         pass
 
 class HRGGen(AbstractGirg):
+    seed_keys = ('rseed', 'aseed', 'sseed')
 
     @staticmethod
     def optionname():
@@ -66,7 +104,19 @@ class HRGGen(AbstractGirg):
         return gen.create_hrg
 defined_actions.append(HRGGen)
 
+class NumpyHRGGen(HRGGen):
+    """HRGGen without the genhrg binary, see graph_actions.hrg"""
+
+    @staticmethod
+    def optionname():
+        return "HRG-numpy"
+
+    def create_graph(self, gen):
+        return gen.create_numpy_hrg
+defined_actions.append(NumpyHRGGen)
+
 class GirgGen(AbstractGirg):
+    seed_keys = ('wseed', 'pseed', 'sseed')
 
     @staticmethod
     def optionname():
@@ -76,80 +126,149 @@ class GirgGen(AbstractGirg):
         return gen.create_girg
 defined_actions.append(GirgGen)
 
-class ReadGR(Action):
+class NumpyGirgGen(GirgGen):
+    """GirgGen without the gengirg binary, see graph_actions.girg"""
+
+    @staticmethod
+    def optionname():
+        return "girg-numpy"
+
+    def create_graph(self, gen):
+        return gen.create_numpy_girg
+defined_actions.append(NumpyGirgGen)
+
+class ReadFile(Action):
+    """Reads a graph file with `reader`, or from its binary CSR copy if the
+    parameter `cache` is set (see graph_actions.csr_cache). With `giant`, only
+    the giant component is built."""
+    stat_keys = ["graph_cache"]
+
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
         self._path = self._params['path']
+        self._cache = str(self._params['cache']).lower() != 'false'
+        self._giant = str(self._params['giant']).lower() != 'false'
+
+    @staticmethod
+    @abstractmethod
+    def reader(path, giant=False) -> igraph.Graph:
+        pass
+
+    def read(self) -> igraph.Graph:
+        if not self._cache:
+            self.set_stat('graph_cache', 'off')
+            return self.reader(self._path, self._giant)
+        csr, hit = csr_cache.convert(self._path, self.reader)
+        self.set_stat('graph_cache', 'hit' if hit else 'miss')
+        if self._giant:
+            return giant_component(lambda: [csr.edge_array()], csr.vcount())
+        return csr.to_igraph()
+
+
+class ReadGR(ReadFile):
+    stat_keys = ["n", "m"]
 
     @staticmethod
     def default_params():
         return {
-            'path': 'graph.gr'
+            'path': 'graph.gr',
+            # binary CSR copy next to the file (created on first use)
+            'cache': False,
+            # only the giant component
+            'giant': False,
         }
 
+    @staticmethod
+    def reader(path, giant=False):
+        return read_pace_gr(path, giant)
+
     def run(self, _in):
-        with open(self._path) as handle:
-            lines: "list[str]" = [l.strip() for l in handle.readlines()]
-        n, m = [int(i) for i in lines[0].split(" ")[2:]]
-        edges = []
-        for line in lines[1:]:
-            if line.startswith("c"):
-                continue
-            v, w = [int(i)-1 for i in line.split(" ")]
-            edge = (v, w)
-            edges.append(edge)
-        assert len(edges) == m
-        graph = igraph.Graph(n, edges)
-        self.set_stat('n', n)
-        self.set_stat('m', m)
+        graph = self.read()
+        self.set_stat('n', graph.vcount())
+        self.set_stat('m', graph.ecount())
         return graph
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + ["n", "m"]
 defined_actions.append(ReadGR)
 
 
-class ReadEL(Action):
-    """Read edge list"""
-    def __init__(self, context, parents, params):
-        super().__init__(context, parents, params)
-        self._path = self._params['path']
+class ReadEL(ReadFile):
+    """Read edge list (optionally gzip-compressed)"""
+    stat_keys = [
+        "n",
+        "m",
+        "graph"
+    ]
 
     @staticmethod
     def default_params():
         return {
-            'path': 'graph'
+            'path': 'graph',
+            # binary CSR copy next to the file (created on first use)
+            'cache': False,
+            # only the giant component
+            'giant': False,
         }
 
+    @staticmethod
+    def reader(path, giant=False):
+        return read_edge_list(path, giant)
+
     def run(self, _in):
-        with open(self._path) as handle:
-            lines: "list[str]" = [l.strip() for l in handle.readlines()]
-        edges = []
-        for line in lines[1:]:
-            v, w = [int(i) for i in line.split(" ")]
-            edge = (v, w)
-            edges.append(edge)
-        graph = igraph.Graph(edges)
+        graph = self.read()
         self.set_stat('n', graph.vcount())
         self.set_stat('m', graph.ecount())
         self.set_stat('graph', basename(self._path))
         return graph
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + [
-            "n",
-            "m",
-            "graph"
-        ]
 defined_actions.append(ReadEL)
 
 
+class ReadELBatch(ReadEL):
+    """Read all edge lists in a directory or matching a glob pattern, one
+    variant per file, ordered by file size (smallest first).
+
+    Running many graphs as variants of one `run-all` avoids starting a process
+    per graph. For `run`, the smallest graph is used.
+    """
+
+    @staticmethod
+    def default_params():
+        return dict(ReadEL.default_params(), path='input_data/edge_lists_real')
+
+    @staticmethod
+    def list_files(path) -> 'list[str]':
+        if os.path.isdir(path):
+            names = [os.path.join(path, name) for name in os.listdir(path)
+                     if not name.startswith(".")]
+        else:
+            names = glob(path)
+        files = [name for name in names if os.path.isfile(name)]
+        files.sort(key=lambda name: (os.path.getsize(name), name))
+        return files
+
+    @classmethod
+    def construct(cls, context, parents):
+        return next(cls.construct_all(context, parents))
+
+    @classmethod
+    def construct_all(cls, context, parents):
+        for params in context.resolve_parameters(parents, cls.name()):
+            params = dict(cls.default_params(), **(params or {}))
+            files = cls.list_files(params['path'])
+            if not files:
+                raise FileNotFoundError(f"no edge lists in {params['path']}")
+            for name in files:
+                yield cls(context, parents, dict(params, path=name))
+defined_actions.append(ReadELBatch)
+
+
 class GraphInput(ChoiceAction):
     options = {
         "girg": GirgGen,
+        "girg_numpy": NumpyGirgGen,
         "hrg": HRGGen,
+        "hrg_numpy": NumpyHRGGen,
         "read": ReadGR,
-        "readel": ReadEL
+        "readel": ReadEL,
+        "readel_batch": ReadELBatch,
     }
 
     @staticmethod
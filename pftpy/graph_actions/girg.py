@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Geometric inhomogeneous random graphs sampled in this process with numpy.
+
+Same model and parameters as `gengirg` of the girgs library: n vertices with
+power-law weights w in [1, n/2] (exponent ple) and uniform positions on the
+torus [0, 1)^d. Two vertices are adjacent with probability
+min(1, (c * w_u * w_v / W / dist^d)^alpha) for the L-infinity distance on the
+torus, the total weight W and the constant c with expected average degree
+`deg`; for alpha = inf, exactly if dist^d <= c * w_u * w_v / W.
+
+Edges are sampled in expected linear time like in the girgs library: the
+vertices are split into weight layers [2^i, 2^(i+1)) and sorted by the Morton
+order of their grid cells, so that every cell of every level (side 2^-level)
+is a range. For a pair of layers, all vertex pairs are partitioned into pairs
+of cells: touching cells at the level whose cell volume is the largest
+threshold c * w_u * w_v / W of the two layers, whose vertex pairs are all
+tested, and cells at coarser levels that do not touch but whose parents do.
+In the latter, the distance is at least the side of the cells, so pairs are
+drawn from the touching parents with this bound of their probability (the
+ones in touching cells are dropped) and accepted by rejection.
+
+    python graph_actions/girg.py -n 50000 --ple 2.5 --alpha inf
+compares the running time with `gengirg` (if its build directory exists).
+"""
+
+import itertools
+
+import numpy as np
+
+# candidate pairs handled at once
+_BATCH = 1 << 22
+# deepest level of the grid, the positions have 53 bits
+_MAX_BITS = 52
+
+
+def _weights(n, ple, rng) -> np.ndarray:
+    # power law on [1, n/2] (inverse transform), as in the girgs library
+    exponent = 1 - ple
+    return (((0.5 * n) ** exponent - 1) * rng.random(n) + 1) ** (1 / exponent)
+
+
+def _degree_function(weights, d, alpha):
+    """Expected average degree as function of the constant c: the
+    probability of a pair averaged over the positions only depends on
+    v = 2^d * c * w_u * w_v / W (the volume of the ball with probability 1),
+    it is 1 for v >= 1 and (alpha*v - v^alpha) / (alpha - 1) otherwise, so
+    the sum over all pairs needs prefix sums of the sorted weights"""
+    w = np.sort(weights)
+    n = len(w)
+    sums = np.concatenate(([0], np.cumsum(w)))
+    if not np.isinf(alpha):
+        # log of the prefix sums of w^alpha (which may overflow)
+        log_powers = np.concatenate(([-np.inf], np.logaddexp.accumulate(alpha * np.log(w))))
+
+    def degree(c):
+        k = 2**d * c * w / sums[-1]
+        partners = np.searchsorted(w, 1 / k)  # with v < 1
+        linear = k * sums[partners]
+        own = np.minimum(k * w, 1)
+        if np.isinf(alpha):
+            total = linear
+        else:
+            powers = np.exp(alpha * np.log(k) + log_powers[partners])
+            total = (alpha * linear - powers) / (alpha - 1)
+            own = (alpha * own - own**alpha) / (alpha - 1)
+        return float((total + (n - partners) - own).sum() / n)
+    return degree
+
+
+def expected_degree(weights, d, alpha, c) -> float:
+    """Expected average degree of the GIRG with the constant c"""
+    return _degree_function(weights, d, alpha)(c)
+
+
+def scale_constant(weights, d, alpha, deg) -> float:
+    """Constant c with expected average degree `deg` (bisection on log c, the
+    expected degree grows with c)"""
+    n = len(weights)
+    assert 0 < deg < n - 1, f"average degree {deg} impossible with {n} vertices"
+    degree = _degree_function(weights, d, alpha)
+    lo = hi = 1.0
+    while degree(lo) > deg:
+        lo /= 2
+    while degree(hi) < deg:
+        hi *= 2
+    while hi - lo > 1e-9 * hi:
+        mid = np.sqrt(lo * hi)
+        if degree(mid) < deg:
+            lo = mid
+        else:
+            hi = mid
+    return np.sqrt(lo * hi)
+
+
+def _morton(cells, bits) -> np.ndarray:
+    # interleaves the bits of the integer coordinates (shape (n, d))
+    d = cells.shape[1]
+    code = np.zeros(len(cells), dtype=np.int64)
+    for bit in range(bits):
+        for k in range(d):
+            code |= ((cells[:, k] >> bit) & 1) << (bit * d + k)
+    return code
+
+
+class _Layer:
+    """Vertices of a weight layer sorted in Morton order of their cells"""
+    def __init__(self, ids, weights, positions, bits):
+        cells = (positions * 2**bits).astype(np.int64)
+        order = np.argsort(_morton(cells, bits), kind='stable')
+        self.ids = ids[order]
+        self.weights = weights[order]
+        self.positions = positions[order]
+        self.cells = cells[order]
+        self.bits = bits
+        self._levels = {}
+
+    def level(self, level):
+        """Non-empty cells of a level (side 2^-level) sorted by their
+        row-major keys: keys, coordinates, first vertex and vertex count"""
+        if level not in self._levels:
+            coords = self.cells >> (self.bits - level)
+            starts = np.flatnonzero(np.concatenate(
+                ([True], (coords[1:] != coords[:-1]).any(axis=1))))
+            counts = np.diff(np.append(starts, len(coords)))
+            coords = coords[starts]
+            keys = (coords << (level * np.arange(coords.shape[1]))).sum(axis=1)
+            order = np.argsort(keys)
+            self._levels[level] = (keys[order], coords[order], starts[order], counts[order])
+        return self._levels[level]
+
+
+def _cell_pairs(a: _Layer, b: _Layer, level):
+    """Pairs of touching non-empty cells of a level (one of a, one of b),
+    each unordered pair once if a is b. Returns first vertex and vertex count
+    of the cells in a and b and whether the two cells are the same."""
+    keys_a, coords_a, starts_a, counts_a = a.level(level)
+    keys_b, _, starts_b, counts_b = b.level(level)
+    if len(keys_b) < len(keys_a):
+        # the relation is symmetric, start from the layer with fewer cells
+        starts_b, counts_b, starts_a, counts_a, same = _cell_pairs(b, a, level)
+        return starts_a, counts_a, starts_b, counts_b, same
+    side = 1 << level
+    d = coords_a.shape[1]
+    offsets = np.array(list(itertools.product(range(-1, 2), repeat=d)), dtype=np.int64)
+    index = np.repeat(np.arange(len(coords_a)), len(offsets))
+    coords = (coords_a[index] + np.tile(offsets, (len(coords_a), 1))) % side
+    keys = (coords << (level * np.arange(d))).sum(axis=1)
+    if side < 3:
+        # offsets wrap around the torus onto the same cells
+        _, unique = np.unique(index * side**d + keys, return_index=True)
+        index, keys = index[unique], keys[unique]
+
+    pos = np.minimum(np.searchsorted(keys_b, keys), len(keys_b) - 1)
+    keep = keys_b[pos] == keys
+    if a is b:
+        keep &= keys_a[index] <= keys
+    index, pos = index[keep], pos[keep]
+    same = (keys_a[index] == keys_b[pos]) & (a is b)
+    return starts_a[index], counts_a[index], starts_b[pos], counts_b[pos], same
+
+
+def _touching(a: _Layer, b: _Layer, u, v, level) -> np.ndarray:
+    # whether the cells of a level of the vertices u[i] and v[i] touch
+    shift = a.bits - level
+    delta = ((a.cells[u] >> shift) - (b.cells[v] >> shift)) % (1 << level)
+    return np.minimum(delta, (1 << level) - delta).max(axis=1) <= 1
+
+
+def _decode(offsets, pairs, chunk):
+    # vertices (positions in the layers) of the candidates with the given
+    # indices in the concatenation of the products of the cell pairs
+    starts_a, _, starts_b, counts_b, same = pairs
+    k = np.searchsorted(offsets, chunk, 'right') - 1
+    rest = chunk - offsets[k]
+    u, v = starts_a[k] + rest // counts_b[k], starts_b[k] + rest % counts_b[k]
+    keep = ~same[k] | (u < v)
+    return u[keep], v[keep]
+
+
+def _accept(a: _Layer, b: _Layer, u, v, scale, alpha, bound, rng):
+    """Adjacent pairs among the candidates (u[i], v[i]) (positions in the
+    layers) drawn with probability `bound`, as array of vertex ids"""
+    diff = np.abs(a.positions[u] - b.positions[v])
+    volume = np.minimum(diff, 1 - diff).max(axis=1) ** a.positions.shape[1]
+    threshold = scale * a.weights[u] * b.weights[v]
+    if np.isinf(alpha):
+        keep = volume <= threshold
+    else:
+        with np.errstate(divide='ignore', over='ignore'):
+            p = np.minimum(1, (threshold / volume) ** alpha)
+        keep = rng.random(len(p)) * bound < p
+    return np.stack((a.ids[u[keep]], b.ids[v[keep]]), axis=1)
+
+
+def _sample(a: _Layer, b: _Layer, pairs, scale, alpha, bound, rng, distant=None):
+    """Adjacent pairs of the vertices of the cell pairs, every candidate
+    is drawn with probability bound (all of them if bound is 1); with
+    `distant`, only those whose cells of this level do not touch"""
+    sizes = pairs[1] * pairs[3]
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    total = int(offsets[-1])
+    if total == 0 or bound <= 0:
+        return []
+    if bound >= 1:
+        drawn = None
+        count = total
+    else:
+        # a Bernoulli(bound) subset: binomial size, uniform elements
+        count = int(rng.binomial(total, bound))
+        drawn = rng.choice(total, count, replace=False)
+    found = []
+    for start in range(0, count, _BATCH):
+        chunk = np.arange(start, min(start + _BATCH, count)) if drawn is None \
+            else drawn[start:start + _BATCH]
+        u, v = _decode(offsets, pairs, chunk)
+        if distant is not None:
+            apart = ~_touching(a, b, u, v, distant)
+            u, v = u[apart], v[apart]
+        found.append(_accept(a, b, u, v, scale, alpha, bound, rng))
+    return found
+
+
+def _finest_level(kappa, d, bits) -> int:
+    # deepest level whose cells have a volume of at least kappa
+    if kappa >= 1:
+        return 0
+    return int(min(np.floor(-np.log2(kappa) / d), bits))
+
+
+def girg(n, d=1, ple=2.5, alpha=np.inf, deg=10, wseed=None, pseed=None, sseed=None):
+    """Samples a GIRG, returns the weights and positions (shape (n, d)) of
+    the vertices and the edges as array of shape (m, 2) (sorted, smaller
+    vertex first). The seeds are those of the weights, the positions and the
+    edges (for alpha < inf)."""
+    n, d, ple, alpha, deg = int(n), int(d), float(ple), float(alpha), float(deg)
+    assert d >= 1, "dimension has to be positive"
+    assert ple > 2, "power-law exponent has to be larger than 2"
+    assert alpha > 1, "alpha has to be larger than 1"
+    weights = _weights(n, ple, np.random.default_rng(wseed))
+    positions = np.random.default_rng(pseed).random((n, d))
+    rng = np.random.default_rng(sseed)
+    scale = scale_constant(weights, d, alpha, deg) / weights.sum()
+
+    layer_of = np.floor(np.log2(weights)).astype(np.int64)
+    bits = _finest_level(4 * scale, d, min(_MAX_BITS, 62 // d))
+    ids = np.arange(n)
+    layers = [_Layer(ids[layer_of == i], weights[layer_of == i], positions[layer_of == i], bits)
+              for i in range(layer_of.max() + 1)]
+    layers = [(i, layer) for i, layer in enumerate(layers) if len(layer.ids) > 0]
+
+    found = []
+    for x, (i, a) in enumerate(layers):
+        for j, b in layers[x:]:
+            kappa = scale * 2.0**(i + 1) * 2.0**(j + 1)
+            finest = _finest_level(kappa, d, bits)
+            for level in range(2, finest + 1):
+                with np.errstate(over='ignore'):
+                    bound = min(1.0, (kappa * 2.0**(level * d)) ** alpha)
+                if bound > 0:
+                    pairs = _cell_pairs(a, b, level - 1)
+                    found += _sample(a, b, pairs, scale, alpha, bound, rng, level)
+            pairs = _cell_pairs(a, b, finest)
+            found += _sample(a, b, pairs, scale, alpha, 1.0, rng)
+    edges = np.concatenate(found) if found else np.empty((0, 2), dtype=np.int64)
+    edges.sort(axis=1)
+    keys = np.sort(edges[:, 0] * n + edges[:, 1])
+    return weights, positions, np.stack((keys // n, keys % n), axis=1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+    import time
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import girgs_generator
+
+    parser = argparse.ArgumentParser(description="numpy GIRGs vs. gengirg")
+    parser.add_argument("-n", type=int, default=10000)
+    parser.add_argument("-d", type=int, default=1)
+    parser.add_argument("--deg", type=float, default=10)
+    parser.add_argument("--ple", type=float, default=2.5)
+    parser.add_argument("--alpha", type=float, default=np.inf)
+    parser.add_argument("--exec-dir", default="./girgs/build")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    _, _, edges = girg(args.n, args.d, args.ple, args.alpha, args.deg, 1, 2, 3)
+    print(f"numpy:   {time.perf_counter() - start:.3f}s, "
+          f"average degree {2 * len(edges) / args.n:.2f}")
+    if os.path.isdir(args.exec_dir):
+        gen = girgs_generator.generator(args.exec_dir)
+        start = time.perf_counter()
+        graph = gen.create_girg(args.n, seed=1, d=args.d, deg=args.deg,
+                                ple=args.ple, alpha=args.alpha)
+        print(f"gengirg: {time.perf_counter() - start:.3f}s, "
+              f"average degree {2 * graph.ecount() / args.n:.2f}")
+    else:
+        print(f"gengirg: {args.exec_dir} not found")
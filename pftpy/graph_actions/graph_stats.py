@@ -6,6 +6,17 @@ import igraph
 defined_actions = []
 
 class GraphStats(Action):
+    stat_keys = [
+        "num_cliques",
+        "sum_clique_sizes",
+        "largest_clique",
+        "avg_deg",
+        "deg_cov",
+        "clustering"
+#        "diameter",
+#        "avg_dist"
+    ]
+
     def run(self, graph: igraph.Graph):
         max_cliques = self.retrieve_action(MaximalCliques.name())
         cliques = max_cliques(graph)
@@ -38,21 +49,11 @@ class GraphStats(Action):
 #        self.set_stat("avg_dist", avg_dist)
 
         return graph
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + [
-            "num_cliques",
-            "sum_clique_sizes",
-            "largest_clique",
-            "avg_deg",
-            "deg_cov",
-            "clustering"
-#            "diameter",
-#            "avg_dist"
-        ]
 defined_actions.append(GraphStats)
 
 class GraphStats2(Action):
+    stat_keys = ["largest_bag_cc"]
+
     def run(self, graph: igraph.Graph):
         htd_action = self.retrieve_action("HTD")
         g,treedec = htd_action(graph)
@@ -66,9 +67,4 @@ class GraphStats2(Action):
         self.set_stat("largest_bag_cc", largest_cc)
 
         return graph
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + [
-            "largest_bag_cc"
-        ]
 defined_actions.append(GraphStats2)
@@ -1,21 +1,23 @@
 import random
 import igraph
+import numpy as np
 from actions import Action, ChoiceAction
+from graph_actions.csr import CSRGraph
 
 defined_actions = []
 
 class GreedyIS(Action):
 
     def run(self, g: igraph.Graph) -> igraph.Graph:
-        g.vs['candidate'] = True
-        g.vs['in_is'] = False
-        while g.vs.select(candidate=True):
-            v = g.vs.find(candidate=True)
-            v['in_is'] = True
-            v['candidate'] = False
-            for v_n in v.neighbors():
-                v_n['candidate'] = False
-        del g.vs['candidate']
+        # take the first remaining candidate (in order of the vertices)
+        csr = CSRGraph.from_igraph(g, attributes=())
+        candidate = np.ones(g.vcount(), dtype=bool)
+        in_is = [False] * g.vcount()
+        for v in range(g.vcount()):
+            if candidate[v]:
+                in_is[v] = True
+                candidate[csr.neighbors_of(v)] = False
+        g.vs['in_is'] = in_is
         return g
 
 
@@ -36,12 +38,11 @@ class MaximalIS(ChoiceAction):
         #min degree greedy
     }
 
+    stat_keys = ["size"]
+
     def compute_stats(self, input, output) -> "dict[str,str]":
         self._stats["size"] = len(output.vs.select(in_is=True))
 
-    def get_stat_keys(self) -> "list[str]":
-        return super().get_stat_keys() + ["size"]
-
 
 
 defined_actions.append(MaximalIS)
@@ -51,13 +52,18 @@ defined_actions.append(MaximalIS)
 class AssignGreedy(Action):
 
     def run(self, g: igraph.Graph):
-        for i, v in enumerate(g.vs.select(in_is=True)):
-            v['partition'] = i
-        for v in g.vs.select(in_is=False):
-            for v_n in v.neighbors():
-                if v_n['in_is']:
-                    v['partition'] = v_n['partition']
-                    break
+        csr = CSRGraph.from_igraph(g, attributes=['in_is'])
+        in_is = csr.vs['in_is'].astype(bool)
+        labels = np.full(g.vcount(), -1, dtype=np.int64)
+        labels[in_is] = np.arange(np.count_nonzero(in_is))
+
+        # other vertices join their first (smallest) neighbor in the IS
+        sources = csr.sources()
+        joins = in_is[csr.neighbors] & ~in_is[sources]
+        vertices, first = np.unique(sources[joins], return_index=True)
+        labels[vertices] = labels[csr.neighbors[joins][first]]
+
+        g.vs['partition'] = [None if l < 0 else l for l in labels.tolist()]
         del g.vs['in_is']
         return g
 
@@ -69,14 +75,20 @@ defined_actions.append(AssignGreedy)
 class AssignLargerNeighborhood(Action):
 
     def run(self, g: igraph.Graph):
-        for i, v in enumerate(g.vs.select(in_is=True)):
-            v['partition'] = i
-        for v in g.vs.select(in_is=False):
+        csr = CSRGraph.from_igraph(g, attributes=['in_is'])
+        in_is = csr.vs['in_is'].astype(bool).tolist()
+        labels = [None] * g.vcount()
+        for i, v in enumerate(v for v in range(g.vcount()) if in_is[v]):
+            labels[v] = i
+        for v in range(g.vcount()):
+            if in_is[v]:
+                continue
             partitions = []
-            for v_n in v.neighbors():
-                if not v_n['partition'] is None:
-                    partitions.append(v_n['partition'])
-            v['partition'] = random.choice(partitions)
+            for v_n in csr.neighbors_of(v).tolist():
+                if not labels[v_n] is None:
+                    partitions.append(labels[v_n])
+            labels[v] = random.choice(partitions)
+        g.vs['partition'] = labels
         del g.vs['in_is']
         return g
 
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Hyperbolic random graphs sampled in this process with numpy.
+
+Same model and parameters as `genhrg` of the girgs library: n vertices with
+radius r in [0, R] (density ~ sinh(alpha*r)) and uniform angle on the disk of
+radius R, chosen such that the expected average degree is `deg`. With
+temperature T = 0, two vertices are adjacent if their hyperbolic distance is
+at most R, otherwise with probability 1/(1 + exp((d-R)/(2T))).
+
+Neighbors are searched in radial bands of vertices sorted by angle: the
+vertices of a band that can be within distance R of a vertex lie in an angle
+window around it, whose width only depends on the radius of the vertex and
+the inner radius of the band. For T > 0, the pairs outside of these windows
+are sampled by geometric jumps in windows of doubling width (with an upper
+bound of the probability in each window and rejection).
+
+    python graph_actions/hrg.py -n 100000 --deg 10
+compares the running time with `genhrg` (if its build directory exists).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+# points of the quadratures for the expected degree, angles are integrated
+# on a log scale (the probabilities drop at angles of about exp(-R/2))
+_RADIUS_POINTS = 64
+_ANGLE_POINTS = 128
+_MIN_ANGLE = 1e-15
+# candidate pairs handled at once
+_BATCH = 1 << 22
+
+
+def _radii(u, alpha, R) -> np.ndarray:
+    # inverse of the distribution function of the radii
+    return np.arccosh(1 + u * (np.cosh(alpha * R) - 1)) / alpha
+
+
+def _cosh_distance(r1, r2, angle) -> np.ndarray:
+    return np.cosh(r1) * np.cosh(r2) - np.sinh(r1) * np.sinh(r2) * np.cos(angle)
+
+
+def _probability(cosh_d, R, T) -> np.ndarray:
+    if T == 0:
+        return (cosh_d <= np.cosh(R)).astype(np.float64)
+    d = np.arccosh(np.maximum(cosh_d, 1))
+    # 1/(1 + exp(x)) without overflow
+    return 0.5 * (1 - np.tanh((d - R) / (4 * T)))
+
+
+def _max_angle(r, c, R) -> np.ndarray:
+    # largest angle between vertices with radius r and radius >= c (c > 0)
+    # at distance at most R (the window shrinks with the radius)
+    cos_angle = (np.cosh(r) * np.cosh(c) - np.cosh(R)) / (np.sinh(r) * np.sinh(c))
+    return np.arccos(np.clip(cos_angle, -1, 1))
+
+
+def expected_degree(n, alpha, T, R) -> float:
+    """Expected average degree of the HRG with disk radius R"""
+    x, w = np.polynomial.legendre.leggauss(_RADIUS_POINTS)
+    r = R * (x + 1) / 2
+    w = w * R / 2 * alpha * np.sinh(alpha * r) / (np.cosh(alpha * R) - 1)
+    r1, r2 = r[:, None], r[None, :]
+    weights = np.outer(w, w)
+    if T == 0:
+        angle = np.arccos(np.clip((np.cosh(r1) * np.cosh(r2) - np.cosh(R))
+                                  / (np.sinh(r1) * np.sinh(r2)), -1, 1))
+        fraction = angle / np.pi
+    else:
+        # trapezoidal rule for the integral of p(angle) * angle over log(angle)
+        log_angles = np.linspace(np.log(_MIN_ANGLE), np.log(np.pi), _ANGLE_POINTS)
+        angles = np.exp(log_angles)
+        p = _probability(_cosh_distance(r1[..., None], r2[..., None], angles), R, T)
+        integral = np.trapezoid(p * angles, log_angles, axis=-1) + p[..., 0] * _MIN_ANGLE
+        fraction = integral / np.pi
+    return (n - 1) * float((weights * fraction).sum())
+
+
+@lru_cache(maxsize=64)
+def hyperbolic_radius(n, alpha, T, deg) -> float:
+    """Disk radius R with expected average degree `deg` (bisection, the
+    expected degree decreases with R; memoized, as sweeps over seeds need the
+    same radius again and again)"""
+    assert 0 < deg < n - 1, f"average degree {deg} impossible with {n} vertices"
+    lo, hi = 1e-3, 2 * np.log(n) + 8
+    while expected_degree(n, alpha, T, hi) > deg:
+        lo, hi = hi, 2 * hi
+    while hi - lo > 1e-7 * hi:
+        mid = (lo + hi) / 2
+        if expected_degree(n, alpha, T, mid) > deg:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+class _Band:
+    """Vertices with radius in [inner, outer], sorted by angle"""
+    def __init__(self, ids, r, theta, inner, outer):
+        order = np.argsort(theta, kind='stable')
+        self.ids = ids[order]
+        self.r = r[order]
+        self.theta = theta[order]
+        self.inner = inner
+        self.outer = outer
+        # angles of three turns, so that windows need no wrap around
+        self.extended = np.concatenate((self.theta - 2*np.pi, self.theta,
+                                        self.theta + 2*np.pi))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def window(self, start, stop, lo_side='left', hi_side='right'):
+        """First and last (exclusive) positions (in `extended`) of the angles
+        in [start, stop], at most one turn"""
+        lo = np.searchsorted(self.extended, start, lo_side)
+        hi = np.searchsorted(self.extended, stop, hi_side)
+        return lo, np.minimum(hi, lo + len(self))
+
+
+def _expand(lo, hi):
+    # (query index, position) of every position in the ranges [lo[i], hi[i])
+    counts = hi - lo
+    queries = np.repeat(np.arange(len(lo)), counts)
+    starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+    return queries, starts + np.arange(len(queries))
+
+
+def _batches(counts):
+    # slices of queries with about _BATCH candidates
+    ends = np.cumsum(counts)
+    start = 0
+    while start < len(counts):
+        done = ends[start - 1] if start > 0 else 0
+        stop = max(start + 1, int(np.searchsorted(ends, done + _BATCH, 'right')))
+        yield slice(start, stop)
+        start = stop
+
+
+def _window_pairs(queries: _Band, band: _Band, lo, hi, R, T, rng):
+    """Adjacent pairs among the candidates band[lo[i]:hi[i]] of query i,
+    each candidate is tested"""
+    found = []
+    for part in _batches(hi - lo):
+        index, pos = _expand(lo[part], hi[part])
+        index += part.start
+        pos %= len(band)
+        cosh_d = _cosh_distance(queries.r[index], band.r[pos],
+                                queries.theta[index] - band.theta[pos])
+        if T == 0:
+            keep = cosh_d <= np.cosh(R)
+        else:
+            keep = rng.random(len(cosh_d)) < _probability(cosh_d, R, T)
+        found.append(np.stack((queries.ids[index[keep]], band.ids[pos[keep]]), axis=1))
+    return found
+
+
+def _jump_pairs(queries: _Band, band: _Band, lo, hi, bound, R, T, rng):
+    """Adjacent pairs among the candidates band[lo[i]:hi[i]] of query i,
+    whose probability is at most bound[i]: candidates are skipped with
+    geometric jumps and the ones hit are accepted with probability p/bound"""
+    found = []
+    active = np.flatnonzero((hi > lo) & (bound > 0))
+    pos = lo[active] - 1
+    while len(active) > 0:
+        pos += rng.geometric(bound[active])
+        inside = pos < hi[active]
+        active, pos = active[inside], pos[inside]
+        candidates = pos % len(band)
+        cosh_d = _cosh_distance(queries.r[active], band.r[candidates],
+                                queries.theta[active] - band.theta[candidates])
+        keep = rng.random(len(active)) * bound[active] < _probability(cosh_d, R, T)
+        found.append(np.stack((queries.ids[active[keep]], band.ids[candidates[keep]]), axis=1))
+    return found
+
+
+def _band_pairs(queries: _Band, band: _Band, R, T, rng):
+    """Adjacent pairs of a vertex of `queries` and one of `band` (an outer
+    band, or the same band: then only counterclockwise neighbors at an
+    angle of less than pi)"""
+    same = queries is band
+    angle = _max_angle(queries.r, band.inner, R) if band.inner > 0 \
+        else np.full(len(queries), np.pi)
+    theta = queries.theta
+    if same:
+        lo, hi = band.window(theta, theta + angle, 'right')
+        hi = np.minimum(hi, lo + len(band) - 1)
+    else:
+        lo, hi = band.window(theta - angle, theta + angle)
+    found = _window_pairs(queries, band, lo, hi, R, T, rng)
+    if T == 0:
+        return found
+
+    # windows of doubling width (up to pi) beyond the first one
+    start = np.maximum(angle, np.pi / 2**40)
+    while (start < np.pi).any():
+        stop = np.minimum(2 * start, np.pi)
+        # smallest distance in the window: at its inner angle and the radius
+        # in the band closest to r * cos(angle) (in terms of tanh)
+        closest = np.arctanh(np.clip(np.tanh(queries.r) * np.cos(start), 0, 1 - 1e-16))
+        closest = np.clip(closest, band.inner, band.outer)
+        bound = _probability(_cosh_distance(queries.r, closest, start), R, T)
+        bound[start >= np.pi] = 0
+        ranges = [band.window(theta + start, theta + stop, 'right', 'right')]
+        if not same:
+            ranges.append(band.window(theta - stop, theta - start, 'left', 'left'))
+        for lo, hi in ranges:
+            found += _jump_pairs(queries, band, lo, hi, bound, R, T, rng)
+        start = stop
+    return found
+
+
+def hrg(n, deg=10, alpha=0.75, t=0, rseed=None, aseed=None, sseed=None):
+    """Samples an HRG, returns the radii and angles of the vertices and the
+    edges as array of shape (m, 2) (sorted, smaller vertex first). The seeds
+    are those of the radii, the angles and the edges (for t > 0)."""
+    n, deg, alpha, T = int(n), float(deg), float(alpha), float(t)
+    assert 0 <= T < 1, "temperature has to be in [0, 1)"
+    R = hyperbolic_radius(n, alpha, T, deg)
+    r = _radii(np.random.default_rng(rseed).random(n), alpha, R)
+    theta = 2 * np.pi * np.random.default_rng(aseed).random(n)
+    rng = np.random.default_rng(sseed)
+
+    # bands of width 1 from the boundary inwards, the innermost one from 0
+    bounds = np.concatenate(([0.0], np.arange(R - 1, 0, -1.0)[::-1], [R]))
+    band_of = np.clip(np.searchsorted(bounds, r, 'right') - 1, 0, len(bounds) - 2)
+    ids = np.arange(n)
+    bands = [_Band(ids[band_of == i], r[band_of == i], theta[band_of == i],
+                   bounds[i], bounds[i+1]) for i in range(len(bounds) - 1)]
+    bands = [band for band in bands if len(band) > 0]
+
+    found = []
+    for i, queries in enumerate(bands):
+        for band in bands[i:]:
+            found += _band_pairs(queries, band, R, T, rng)
+    edges = np.concatenate(found) if found else np.empty((0, 2), dtype=np.int64)
+    edges.sort(axis=1)
+    keys = np.sort(edges[:, 0] * n + edges[:, 1])
+    return r, theta, np.stack((keys // n, keys % n), axis=1)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+    import time
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import girgs_generator
+
+    parser = argparse.ArgumentParser(description="numpy HRGs vs. genhrg")
+    parser.add_argument("-n", type=int, default=10000)
+    parser.add_argument("--deg", type=float, default=10)
+    parser.add_argument("--alpha", type=float, default=0.75)
+    parser.add_argument("-t", type=float, default=0)
+    parser.add_argument("--exec-dir", default="./girgs/build")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    r, theta, edges = hrg(args.n, args.deg, args.alpha, args.t, 1, 2, 3)
+    print(f"numpy:  {time.perf_counter() - start:.3f}s, "
+          f"average degree {2 * len(edges) / args.n:.2f}")
+    if os.path.isdir(args.exec_dir):
+        gen = girgs_generator.generator(args.exec_dir)
+        start = time.perf_counter()
+        graph = gen.create_hrg(args.n, seed=1, coords=True, deg=args.deg,
+                               alpha=args.alpha, t=args.t)
+        print(f"genhrg: {time.perf_counter() - start:.3f}s, "
+              f"average degree {2 * graph.ecount() / args.n:.2f}")
+    else:
+        print(f"genhrg: {args.exec_dir} not found")
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 from actions import Action, ChoiceAction
+from actions.util import ProcessAction, shm_file
+from graph_actions.solver_io import edge_array, metis
 import subprocess
-from tempfile import NamedTemporaryFile
+from itertools import islice
 import igraph
 
 defined_actions = []
@@ -11,13 +13,14 @@ class MaxCliquesIGraph(Action):
         return graph.maximal_cliques()
 defined_actions.append(MaxCliquesIGraph)
 
-class QuickCliques(Action):
+class QuickCliques(ProcessAction):
+    stat_keys = ["status"]
+
     def __init__(self, context, parents, parameters):
         super().__init__(context, parents, parameters)
 
         self.dir = self._params['dir']
         self.algo = self._params['algo']
-        self.timeout = float(self._params['timeout'])
 
     @staticmethod
     def default_params():
@@ -27,33 +30,23 @@ class QuickCliques(Action):
             'timeout': -1.0
         }
 
-    def write_metis(self, file_handle, graph):
-        file_handle.write(f"{graph.vcount()} {graph.ecount()} 1\n")
-        for i in range(graph.vcount()):
-            neighs = graph.neighbors(i)
-            inc = [str(n+1) for n in neighs]
-            file_handle.write(" ".join(inc) + "\n")
-        file_handle.flush()
-
-    def parse_output(self, stdout: str):
-        lines = stdout.splitlines()
-        lines = lines[2:]
-        cliques = [[int(c) for c in line.split(" ")] for line in lines]
-        return cliques
+    def parse_output(self, lines):
+        """Cliques in the output of qc (any iterable of lines, e.g. the
+        stdout of the running program)"""
+        return [[int(c) for c in line.split()] for line in islice(lines, 2, None)]
 
     def run(self, graph: igraph.Graph):
-        tmp = NamedTemporaryFile(mode='w', suffix='.graph')
-        self.write_metis(tmp, graph)
-        command = ['./qc', f'--input-file={tmp.name}',  f'--algorithm={self.algo}']
-        if self.timeout != -1.0:
-            timeout_cmd = ['timeout', '-s', 'QUIT', f'{self.timeout}s']
-            command = timeout_cmd + command
-        proc = subprocess.run(command, cwd=self.dir, capture_output=True, text=True)
-        if proc.returncode == 124:
-            # timeout
-            return []
-        proc.check_returncode()
-        res = self.parse_output(proc.stdout)
+        with shm_file(metis(graph.vcount(), edge_array(graph)), suffix='.graph') as path:
+            command = ['./qc', f'--input-file={path}',  f'--algorithm={self.algo}']
+            try:
+                proc = self.stream_process(command, self.parse_output,
+                                           cwd=self.dir, text=True, check=True)
+            except subprocess.TimeoutExpired:
+                # no cliques, the status tells that they are missing
+                self.set_stat('status', 'timeout')
+                return []
+        res = proc.stdout
+        self.set_stat('status', 'success')
         return res
 defined_actions.append(QuickCliques)
 
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Bulk parsers of the graph files (edge lists, PACE .gr, girgs output).
+
+Files are read in large chunks (gzip-compressed files transparently), comment
+and header lines are cut out and the numbers are parsed by numpy in C instead
+of splitting and converting every line in Python. Graphs are built from int32
+edge arrays (see `graph_from_edges`); with `giant=True`, only the giant
+component is built (see graph_actions.components).
+"""
+
+import gzip
+import re
+
+import igraph
+import numpy as np
+
+from graph_actions.components import giant_edges
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# bytes of text parsed at once
+CHUNK_BYTES = 1 << 24
+
+
+def open_binary(path):
+    """File object of path (opened for reading bytes), which decompresses
+    gzip-compressed files"""
+    with open(path, "rb") as handle:
+        magic = handle.read(2)
+    return gzip.open(path, "rb") if magic == _GZIP_MAGIC else open(path, "rb")
+
+
+def read_bytes(path) -> bytes:
+    """Content of a file, decompressed if it is gzip-compressed"""
+    with open_binary(path) as handle:
+        return handle.read()
+
+
+def strip_comments(data: bytes, comments=b"%#") -> bytes:
+    """data without the lines starting with one of the `comments` characters"""
+    markers = [bytes([c]) for c in comments]
+    if not any(data.startswith(c) or b"\n" + c in data for c in markers):
+        return data
+    pattern = rb"^[" + re.escape(comments) + rb"][^\n]*(?:\n|$)"
+    return re.sub(pattern, b"", data, flags=re.MULTILINE)
+
+
+def _fields_per_line(data: bytes) -> np.ndarray:
+    # number of whitespace separated fields of every non-empty line
+    chars = np.frombuffer(data, dtype=np.uint8)
+    space = chars <= ord(" ")
+    starts = np.empty(len(chars), dtype=np.uint8)
+    starts[:1] = ~space[:1]
+    starts[1:] = space[:-1] & ~space[1:]
+    line_starts = np.flatnonzero(chars == ord("\n")) + 1
+    line_starts = np.concatenate(([0], line_starts[line_starts < len(chars)]))
+    counts = np.add.reduceat(starts, line_starts, dtype=np.int64)
+    return counts[counts > 0]
+
+
+def parse_table(data: bytes, dtype=np.int64, columns=None) -> np.ndarray:
+    """Whitespace separated numbers (without comments) as array of shape
+    (rows, columns), by default with as many columns as the first line has
+    numbers; every line needs that many. With dtype None, the numbers are
+    parsed as int64 or, if some are not integers, as float64."""
+    if dtype is None:
+        try:
+            return parse_table(data, np.int64, columns)
+        except ValueError:
+            return parse_table(data, np.float64, columns)
+    counts = _fields_per_line(data) if data else np.empty(0, dtype=np.int64)
+    if len(counts) == 0:
+        return np.empty((0, columns or 0), dtype=dtype)
+    if columns is None:
+        columns = int(counts[0])
+    if (counts != columns).any():
+        raise ValueError(f"lines with other than {columns} values")
+    values = np.fromstring(data, dtype=dtype, sep=" ")
+    if len(values) != len(counts) * columns:
+        raise ValueError("values that are not numbers")
+    return values.reshape(-1, columns)
+
+
+def iter_tables(handle, comments=b"%#", dtype=np.int64, columns=None):
+    """Tables (see parse_table) of the remaining lines of a binary file
+    object, parsed in chunks of about CHUNK_BYTES"""
+    rest = b""
+    while True:
+        block = handle.read(CHUNK_BYTES)
+        data = rest + block
+        if not block:
+            rest = b""
+        else:
+            end = data.rfind(b"\n") + 1
+            data, rest = data[:end], data[end:]
+        table = parse_table(strip_comments(data, comments), dtype, columns)
+        if len(table) > 0:
+            columns = table.shape[1]
+            yield table
+        if not block:
+            return
+
+
+def _edges(table, offset=0) -> np.ndarray:
+    # edges in the first two columns of a table (further columns, e.g. weights
+    # or timestamps, are ignored) as int32 array, with `offset` subtracted
+    if table.shape[1] < 2 and len(table) > 0:
+        raise ValueError("edge lines need two vertex ids")
+    edges = table[:, :2] - offset
+    if edges.dtype.kind == 'f' and not (edges == np.floor(edges)).all():
+        raise ValueError("vertex ids have to be integers")
+    if len(edges) > 0 and (edges.min() < 0 or edges.max() > np.iinfo(np.int32).max):
+        raise ValueError("vertex ids out of range")
+    return edges.astype(np.int32)
+
+
+def _pairs(edges, chunk=1 << 16):
+    # igraph converts pairs of python ints much faster than numpy rows; only
+    # a chunk of them exists at a time
+    for start in range(0, len(edges), chunk):
+        values = iter(edges[start:start + chunk].ravel().tolist())
+        yield from zip(values, values)
+
+
+def graph_from_edges(n, edges) -> igraph.Graph:
+    """Undirected igraph.Graph with n vertices and the edges of an array of
+    shape (m, 2)"""
+    return igraph.Graph(n, _pairs(np.asarray(edges).reshape(-1, 2)))
+
+
+def giant_component(chunks, n=None, **vertex_arrays) -> igraph.Graph:
+    """Giant component of the graph with the edge chunks yielded by
+    `chunks()` (see components.giant_edges), its vertices keep their values
+    of `vertex_arrays` (one value per vertex of the graph) as attributes"""
+    vertices, edges = giant_edges(chunks, n)
+    graph = graph_from_edges(len(vertices), edges)
+    for name, values in vertex_arrays.items():
+        graph.vs[name] = np.asarray(values)[vertices].tolist()
+    return graph
+
+
+def _read(chunks, n=None, giant=False, **vertex_arrays) -> igraph.Graph:
+    if giant:
+        return giant_component(chunks, n, **vertex_arrays)
+    parts = list(chunks())
+    edges = np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int32)
+    del parts
+    if n is None:
+        n = int(edges.max()) + 1 if len(edges) > 0 else 0
+    graph = graph_from_edges(n, edges)
+    for name, values in vertex_arrays.items():
+        graph.vs[name] = np.asarray(values).tolist()
+    return graph
+
+
+def read_edges(n, edges, giant=False, **vertex_arrays) -> igraph.Graph:
+    """Graph (or its giant component) with n vertices and the edges of an
+    array of shape (m, 2), e.g. of a generator"""
+    return _read(lambda: [edges], n, giant, **vertex_arrays)
+
+
+def edge_list_chunks(path):
+    """Edge chunks of an edge list with a header line and comment lines
+    (% or #)"""
+    with open_binary(path) as handle:
+        handle.readline()
+        for table in iter_tables(handle, dtype=None):
+            yield _edges(table)
+
+
+def read_edge_list(path, giant=False) -> igraph.Graph:
+    """Edge list (see edge_list_chunks); the graph has the vertices 0..max id"""
+    return _read(lambda: edge_list_chunks(path), giant=giant)
+
+
+def _pace_header(handle) -> 'tuple[int, int]':
+    for line in handle:
+        if line.startswith(b"p"):
+            n, m = [int(i) for i in line.split()[2:4]]
+            return n, m
+    raise ValueError("no line `p tw n m`")
+
+
+def pace_gr_chunks(path):
+    """Edge chunks (0-based) of a PACE .gr file: comment lines (c), the line
+    `p tw n m`, 1-based edges"""
+    with open_binary(path) as handle:
+        _pace_header(handle)
+        for table in iter_tables(handle, b"c", dtype=None):
+            yield _edges(table, offset=1)
+
+
+def read_pace_gr(path, giant=False) -> igraph.Graph:
+    """PACE .gr file (see pace_gr_chunks)"""
+    with open_binary(path) as handle:
+        n, m = _pace_header(handle)
+    graph = _read(lambda: pace_gr_chunks(path), n, giant)
+    assert giant or graph.ecount() == m, f"{graph.ecount()} edges, header says {m}"
+    return graph
+
+
+def girgs_chunks(path):
+    """Edge chunks of the files written by the girgs generators: the line
+    `n m`, one more header line and 0-based edges"""
+    with open_binary(path) as handle:
+        handle.readline()
+        handle.readline()
+        for table in iter_tables(handle, dtype=None):
+            yield _edges(table)
+
+
+def read_girgs_graph(path, giant=False, **vertex_arrays) -> igraph.Graph:
+    """Graph of a girgs generator (see girgs_chunks) with the given vertex
+    attributes"""
+    with open_binary(path) as handle:
+        n = int(handle.readline().split()[0])
+    return _read(lambda: girgs_chunks(path), n, giant, **vertex_arrays)
+
+
+def read_coordinates(path) -> np.ndarray:
+    """Float array of shape (n, 2) of the lines `r theta` of a .hyp file"""
+    return parse_table(read_bytes(path), dtype=np.float64, columns=2)
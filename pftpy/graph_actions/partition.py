@@ -1,7 +1,9 @@
-from datetime import datetime
 from actions import Action, SequenceAction, ChoiceAction
 from graph_actions.greedy_partition import MaximalIS, AssignVertices
-import igraph, operator, collections, statistics
+from graph_actions.csr import CSRGraph
+from graph_actions.partition_result import PartitionResult
+from graph_actions.solver_io import ragged
+import igraph, statistics
 import numpy as np
 from math import log2
 from bisect import bisect
@@ -31,15 +33,13 @@ class LargestCliqueRepeat(Action):
         copy = g.copy()
         copy.vs['idx'] = [i for i in range(g.vcount())]
 
-        part = 0
+        classes = []
         while copy.vcount() > 0:
             cliques = copy.maximal_cliques()
             largest = max(cliques, key=lambda c: len(c))
-            largest_idx = copy.vs[largest]['idx']
-            g.vs[largest_idx]['partition'] = part
-            part += 1
+            classes.append(copy.vs[largest]['idx'])
             copy.delete_vertices(largest)
-        return g
+        return PartitionResult.from_classes(g, classes)
 
 
 defined_actions.append(LargestCliqueRepeat)
@@ -51,6 +51,7 @@ class FastLargestCliqueBad(Action):
         n = g.vcount()
         cliques = g.maximal_cliques()
         deleted = [False] * n
+        labels = np.zeros(n, dtype=np.int32)
         sizes = [len(c) for c in cliques]
 
         c_of_v = [list() for v in g.vs()]
@@ -80,7 +81,7 @@ class FastLargestCliqueBad(Action):
                     continue
                 deleted[v] = True
 
-                g.vs[v]['partition'] = i
+                labels[v] = i
                 for c in c_of_v[v]:
                     sizes[c] -= 1
                     changed_cliques += [c]
@@ -92,7 +93,7 @@ class FastLargestCliqueBad(Action):
                     heapq.heappush(pq, (n - size, c))
 
             i += 1
-        return g
+        return PartitionResult(g, labels)
 
 
 defined_actions.append(FastLargestCliqueBad)
@@ -152,8 +153,8 @@ class CliquePriorityQueue():
 class FastLargestClique(Action):
 
     def run(self, graph: igraph.Graph):
-        g = graph.copy()
-        cpq = CliquePriorityQueue(g)
+        cpq = CliquePriorityQueue(graph)
+        labels = np.zeros(cpq.n, dtype=np.int32)
 
         num_assigned = 0
         i = 0
@@ -163,10 +164,10 @@ class FastLargestClique(Action):
             clique = cpq.remaining_vertices(clq_i)
 
             num_assigned += len(clique)
-            g.vs[clique]['partition'] = i
+            labels[clique] = i
             i += 1
             cpq.update_assigned_vertices(clique)
-        return g
+        return PartitionResult(graph, labels)
 
 
 defined_actions.append(FastLargestClique)
@@ -178,19 +179,22 @@ class MaxRadiusFullNeighborhood(Action):
 
     def run(self, g: igraph.Graph):
 
-        #operator.itemgetter('r') returns a function equivalent to ['r']
-        vertices = sorted(g.vs, key=operator.itemgetter('r'), reverse=True)
+        # vertices by descending radius (stable, like sorted(reverse=True))
+        csr = CSRGraph.from_igraph(g, attributes=['r'])
+        vertices = np.argsort(-csr.vs['r'], kind='stable')
 
-        g.vs['partition'] = None
+        labels = np.full(g.vcount(), -1, dtype=np.int32)
         i = 0
 
-        for v in vertices:
-            if v['partition'] is not None:
+        for v in vertices.tolist():
+            if labels[v] != -1:
                 continue
-            v['partition'] = i
-            g.vs.select( g.neighbors(v) ).select(partition=None)['partition'] = i
+            labels[v] = i
+            neighs = csr.neighbors_of(v)
+            neighs = neighs[labels[neighs] == -1]
+            labels[neighs] = i
             i = i + 1
-        return g
+        return PartitionResult(g, labels)
 
 
 defined_actions.append(MaxRadiusFullNeighborhood)
@@ -210,10 +214,12 @@ class CliqueAndRadius(Action):
         }
 
     def run(self, graph: igraph.Graph):
-        g = graph.copy()
+        g = graph
         cpq = CliquePriorityQueue(g)
+        labels = np.zeros(cpq.n, dtype=np.int32)
+        csr = CSRGraph.from_igraph(g, attributes=())
 
-        radius_pq = [(-v['r'], v.index) for v in g.vs]
+        radius_pq = [(-r, i) for i, r in enumerate(g.vs['r'])]
         heapq.heapify(radius_pq)
 
         num_assigned = 0
@@ -231,14 +237,14 @@ class CliqueAndRadius(Action):
                     if not cpq.deleted[v_ind]:
                         vertex = v_ind
                         break
-                neighs = g.neighborhood(vertex)
+                neighs = [vertex] + csr.neighbors_of(vertex).tolist()
                 partition = [neigh for neigh in neighs if not cpq.deleted[neigh]]
 
             num_assigned += len(partition)
-            g.vs[partition]['partition'] = next_partition
+            labels[partition] = next_partition
             next_partition += 1
             cpq.update_assigned_vertices(partition)
-        return g
+        return PartitionResult(g, labels)
 defined_actions.append(CliqueAndRadius)
 
 
@@ -246,6 +252,7 @@ class MinHSPartition(Action):
     """
     Minimum Hitting Set partition
     """
+    stat_keys = ["hs_size", "status"]
 
     def __init__(self, context, parents=None, params=None):
         super().__init__(context, parents, params)
@@ -254,18 +261,14 @@ class MinHSPartition(Action):
 
     @staticmethod
     def make_hyp(graph, cliques):
+        # one edge per vertex (that is in a clique): the cliques containing it
         n = len(cliques)
-        cliques = [set(c) for c in cliques]
-        edges = []
-
-        for graph_i in range(graph.vcount()):
-            edge = []
-            for clq_i, clq in enumerate(cliques):
-                if graph_i in clq:
-                    edge.append(clq_i)
-            if len(edge) > 0:
-                edges.append(edge)
-        return n, edges
+        offsets, vertices = ragged(cliques)
+        clique_of = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        keys = np.unique(vertices * n + clique_of)
+        vertices, members = keys // n, (keys % n).tolist()
+        bounds = np.flatnonzero(np.diff(vertices, prepend=-1, append=-1)).tolist()
+        return n, [members[a:b] for a, b in zip(bounds, bounds[1:])]
 
     @staticmethod
     def assign_partitions(graph, cliques, solution):
@@ -284,12 +287,11 @@ class MinHSPartition(Action):
             best_partition = max(parts, key=lambda p: len(cliques[p]))
             chosen_partition.append(best_partition)
 
-        mapper = {p: i for (i, p) in enumerate(set(chosen_partition))}
-        graph.vs['partition'] = [mapper[p] for p in chosen_partition]
-        return graph
+        _, labels = np.unique(chosen_partition, return_inverse=True)
+        return PartitionResult(graph, labels)
 
     def run(self, input: igraph.Graph):
-        graph = input.copy()
+        graph = input
         cliques = graph.maximal_cliques()
         hyp = self.make_hyp(graph, cliques)
 
@@ -298,13 +300,13 @@ class MinHSPartition(Action):
         self.set_stat('hs_size', len(solution))
         self.set_stat('status', self.HS.get_stat('status'))
         if self.get_stat('status') != 'success':
-            return []
+            return None
 
         res = self.assign_partitions(graph, cliques, solution)
         return res
 
-    def get_stat_keys(self):
-        return super().get_stat_keys() + ["hs_size", "status"]
+    def signature(self) -> tuple:
+        return super().signature() + (self.HS.signature(),)
 
     def __str__(self):
         res = super().__str__() + "(" + self.HS.__str__() + ")"
@@ -316,13 +318,14 @@ class WeightedHSPartition(Action):
     """
     Weighted Hitting Set partition
     """
+    stat_keys = ["hs_size", "status"]
 
     @staticmethod
     def calc_weights(cliques):
         return [log2(len(c)+1) for c in cliques]
 
     def run(self, input: igraph.Graph):
-        graph = input.copy()
+        graph = input
         cliques = graph.maximal_cliques()
         _, edges = MinHSPartition.make_hyp(graph, cliques)
         weights = self.calc_weights(cliques)
@@ -334,13 +337,10 @@ class WeightedHSPartition(Action):
         self.set_stat('hs_size', len(solution))
         self.set_stat('status', HS.get_stat('status'))
         if self.get_stat('status') != 'success':
-            return []
+            return None
 
         res = MinHSPartition.assign_partitions(graph, cliques, solution)
         return res
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + ["hs_size", "status"]
 defined_actions.append(WeightedHSPartition)
 
 
@@ -396,15 +396,28 @@ class BFPartition(Action):
         graph.vs['idx'] = [i for i in range(graph.vcount())]
         solution, weight = self.solve_rec(graph)
         assert len(solution) > 0
-        for i, clq in enumerate(solution):
-            graph.vs[clq]['partition'] = i
-        return graph
+        return PartitionResult.from_classes(input, solution)
 defined_actions.append(BFPartition)
 
 class BranchingPartition(Action):
     """
     Brute-Force Optimal Partition with Branching (v2)
     """
+    stat_keys = [
+        'product_weight',
+        'status',
+        'lower_bound',
+        'num_branching',
+        'num_leaves',
+        'num_long_paths',
+        'num_lb_reductions',
+        'num_lb2_reductions',
+        'num_sw_reductions',
+        'num_dead_end',
+        'input_cliques',
+        'remaining_budget',
+    ]
+
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
@@ -412,8 +425,6 @@ class BranchingPartition(Action):
         self.reduction_lb = self._params['lower_bound']
         self.reduction_lb2 = self._params['lower_bound2']
 
-        self.timeout = int(self._params['timeout'])
-        self.start_time = datetime.now()
         self.best_upper = -1
         self.best_lower = -1
         self.exit_status = "init"  # will have value 'success' or 'timeout' after being called
@@ -467,11 +478,7 @@ class BranchingPartition(Action):
 
 
     def timeout_exceeded(self):
-        if self.timeout == -1:
-            return False
-        now = datetime.now()
-        delta = now - self.start_time
-        if delta.total_seconds() > self.timeout:
+        if self.deadline.expired():
             self.exit_status = 'timeout'
             return True
         return False
@@ -625,13 +632,12 @@ class BranchingPartition(Action):
 
     def run(self, input: igraph.Graph):
         self.reset_counters()
-        self.start_time = datetime.now()
         if isinstance(input, list):
-            graph = input[0].copy()
-            hints = input[1]
+            original, hints = input
         else:
-            graph = input.copy()
-            hints = {}
+            original, hints = input, {}
+        # the copy gets the idx attribute
+        graph = original.copy()
 
         sufficient_weight = hints.get('sufficient_weight', -1)
 
@@ -649,15 +655,13 @@ class BranchingPartition(Action):
             self.set_stat('product_weight', lower)
             self.set_stat('lower_bound', upper)
             self.set_stat('status', 'timeout')
-            return graph
+            return None
         else:
             self.set_stat('product_weight', weight)
             self.set_stat('lower_bound', weight)
             self.set_stat('status', 'success')
             assert len(solution) > 0, f'solution, weight: {solution, weight}'
-            for i, clq in enumerate(solution):
-                graph.vs[clq]['partition'] = i
-            return graph
+            return PartitionResult.from_classes(original, solution)
 
     def compute_stats(self, input, output):
         self.set_stat('num_branching', self.num_branching)
@@ -669,29 +673,14 @@ class BranchingPartition(Action):
         self.set_stat('num_sw_reductions', self.num_sw_red)
         self.num_reductions = self.num_lb_red + self.num_lb2_red + self.num_sw_red
         self.set_stat('input_cliques', self.input_cliques)
-
-    def get_stat_keys(self) -> 'list[str]':
-        res = super().get_stat_keys()
-        return res + [
-            'product_weight',
-            'status',
-            'lower_bound',
-            'num_branching',
-            'num_leaves',
-            'num_long_paths',
-            'num_lb_reductions',
-            'num_lb2_reductions',
-            'num_sw_reductions',
-            'num_dead_end',
-            'input_cliques'
-        ]
 defined_actions.append(BranchingPartition)
 
 
 class Partition(ChoiceAction):
-    """Partition actions take a graph (igraph.Graph) and return a copy(?) of
-    the graph with an added vs['partition'] attribute to the vertices.
-    The partitions should be numbers in 0,...,num_partitions-1.
+    """Partition actions take a graph (igraph.Graph) and return a
+    PartitionResult (labels 0,...,num_partitions-1 of the vertices) or None
+    if they failed. Options that set a vs['partition'] attribute instead
+    (Greedy) are converted.
     """
 
     options = {
@@ -707,10 +696,24 @@ class Partition(ChoiceAction):
         'branch': BranchingPartition,
     }
 
+    stat_keys = [
+        'status',
+        'amount',
+        'largest',
+        'smallest',
+        'median',
+        'average']
+
     @staticmethod
     def default_action():
         return "flc"
 
+    def run(self, input):
+        res = super().run(input)
+        if isinstance(res, igraph.Graph):
+            res = PartitionResult.from_attribute(res)
+        return res
+
     def compute_stats(self, input, output) -> 'dict[str,str]':
         if 'status' in self.option._stats:
             self.set_stat('status', self.option.get_stat('status'))
@@ -718,26 +721,16 @@ class Partition(ChoiceAction):
             self.set_stat('status', 'success')
 
         if self.get_stat('status') == 'success' and output is not None:
-            counter = collections.Counter(output.vs['partition'])
+            sizes = output.sizes
         else:
-            counter = collections.Counter([-1])
+            sizes = np.array([1])
 
-        sizes = [v for _, v in counter.most_common()]
         self.set_stat('amount', len(sizes))
-        self.set_stat('largest', sizes[0])
-        self.set_stat('smallest', sizes[-1])
-        self.set_stat('median', statistics.median(sizes))
-        self.set_stat('average', statistics.mean(sizes))
-
-    def get_stat_keys(self) -> 'list[str]':
-        res = super().get_stat_keys()
-        return res + [
-            'status',
-            'amount',
-            'largest',
-            'smallest',
-            'median',
-            'average']
+        self.set_stat('largest', sizes.max().item())
+        self.set_stat('smallest', sizes.min().item())
+        self.set_stat('median', statistics.median(sizes.tolist()))
+        self.set_stat('average', statistics.mean(sizes.tolist()))
+
 
 
 defined_actions.append(Partition)
@@ -1,14 +1,31 @@
 #!/usr/bin/env python3
-from datetime import datetime
 import numpy as np
 from math import log2
 from actions import Action, ActionContext
+from actions.util import run_concurrently
 from graph_actions.partition import BranchingPartition
+from graph_actions.partition_result import PartitionResult
 import igraph
 
 defined_actions = []
 
 class PartitionBags(Action):
+    # statistics of BranchingPartition that are aggregated over all bags
+    other_stats = ["num_branching", "num_leaves", "num_lb_reductions",
+                   "num_lb2_reductions", "num_sw_reductions", "input_cliques"]
+
+    stat_keys = [
+        "status",
+        "max_weight",
+        "mean_partition_num",
+        "median_partition_num",
+        "max_partition_num",
+        "num_clq_red",
+        "partition_option",
+        "remaining_budget",
+    ] + [f'{key}_{agg}' for key in other_stats
+         for agg in ('sum', 'max', 'mean', 'median')]
+
     def __init__(self, context, parents, parameters):
         super().__init__(context, parents, parameters)
         self.partition: Action = None  # has to be set using set_partition
@@ -18,14 +35,12 @@ class PartitionBags(Action):
         self._num_partitions = []
         self._num_clq_red = 0
 
-        self.other_stats = ["num_branching", "num_leaves", "num_lb_reductions",
-                            "num_lb2_reductions", "num_sw_reductions", "input_cliques"]
         self._stat_dict = {var: [] for var in self.other_stats}
 
         self.verbose = self._params['verbose']
         self.sufficient_weight = self._params['sufficient_weight']
-        self.timeout = int(self._params['timeout'])
-        self.start_time = datetime.now()
+        self.split_budget = str(self._params['split_budget']).lower() != 'false'
+        self.max_processes = int(self._params['max_processes'])
 
 
     @staticmethod
@@ -33,57 +48,93 @@ class PartitionBags(Action):
         return {
             'verbose': False,
             'sufficient_weight': True,
-            'timeout': -1
+            'timeout': -1,
+            # give every bag an equal share of the remaining time budget
+            'split_budget': False,
+            # number of bags that are partitioned concurrently
+            'max_processes': 1,
         }
 
     def set_partition(self, partition):
         self.partition = partition
 
     def timeout_exceeded(self):
-        if self.timeout == -1:
-            return False
-        t1 = datetime.now()
-        delta = t1 - self.start_time
-        return delta.total_seconds() > self.timeout
+        return self.deadline.expired()
 
-    def weight(self, graph, bag):
-        contraction = self.retrieve_action("Contraction")
+    @staticmethod
+    def is_clique(graph) -> bool:
+        n, m = graph.vcount(), graph.ecount()
+        return m == n*(n-1) // 2
+
+    def clique_weight(self, clique):
+        self._num_partitions.append(1)
+        self._num_clq_red += 1
+        return log2(clique.vcount()+1)
 
+    def weight(self, graph, bag):
         subgraph: igraph.Graph = graph.induced_subgraph(bag)
-        n, m = subgraph.vcount(), subgraph.ecount()
-        if m == n*(n-1) // 2:
-            self._num_partitions.append(1)
-            self._num_clq_red += 1
-            res = log2(n+1)
-        else:
-            partitioned = None
-            if self.sufficient_weight is True:
-                if self.product_weight != 0 and isinstance(self.partition.option, BranchingPartition):
-                    partitioned = self.partition([subgraph, {
-                        'sufficient_weight': self.product_weight
-                    }])
-            if partitioned is None:
-                partitioned = self.partition(subgraph)
-
-            if self.timeout_exceeded() or self.partition.get_stat('status') == 'timeout':
-                self.set_stat('status', 'timeout')
-                return -1
-
-            if isinstance(self.partition.option, BranchingPartition):
-                curr_prod_weight = self.partition.get_stat('product_weight')
-                self.product_weight = max(self.product_weight, curr_prod_weight)
-
-            contracted = contraction(partitioned)
-
-            self._num_partitions.append(contracted.vcount())
-            if isinstance(self.partition.option, BranchingPartition):
-                for key in self.other_stats:
-                    self._stat_dict[key].append(self.partition.option.stats[key])
-            res = sum(contracted.vs['weight'])
-        return res
+        if self.is_clique(subgraph):
+            return self.clique_weight(subgraph)
+
+        partitioned = None
+        if self.sufficient_weight is True:
+            if self.product_weight != 0 and isinstance(self.partition.option, BranchingPartition):
+                partitioned = self.partition([subgraph, {
+                    'sufficient_weight': self.product_weight
+                }])
+        if partitioned is None:
+            partitioned = self.partition(subgraph)
+        return self.partition_weight(self.partition, partitioned)
+
+    def partition_weight(self, partition, partitioned: 'PartitionResult | None'):
+        """Weight of a bag that was partitioned by `partition` (-1 on timeout
+        or if the partition failed)"""
+        if self.timeout_exceeded() or partition.get_stat('status') == 'timeout':
+            self.set_stat('status', 'timeout')
+            return -1
+        if partitioned is None:
+            self.set_stat('status', 'failed')
+            return -1
+
+        if isinstance(partition.option, BranchingPartition):
+            curr_prod_weight = partition.get_stat('product_weight')
+            self.product_weight = max(self.product_weight, curr_prod_weight)
+
+        # the weight of the contracted bag, without contracting it
+        self._num_partitions.append(partitioned.num_classes)
+        if isinstance(partition.option, BranchingPartition):
+            for key in self.other_stats:
+                self._stat_dict[key].append(partition.option.stats[key])
+        return partitioned.weight()
+
+    def weights(self, graph, bags):
+        """Yields the weights of the bags, partitioning one bag after another"""
+        for k, bag in enumerate(bags):
+            if self.split_budget:
+                with self.nested_deadline(self.deadline.split(len(bags) - k)):
+                    w = self.weight(graph, bag)
+            else:
+                w = self.weight(graph, bag)
+            yield w
+
+    def concurrent_weights(self, graph, bags):
+        """Yields the weights of the bags like `weights`, but partitions all
+        bags at once (at most `max_processes` at a time), which pays off for
+        partitions that run external programs (e.g. MinHSPartition). Every bag
+        gets the whole remaining time budget, bags that would be partitioned
+        after it ran out are skipped (status 'timeout')."""
+        subgraphs = [graph.induced_subgraph(bag) for bag in bags]
+        calls = [(self.partition.clone(), subgraph) for subgraph in subgraphs
+                 if not self.is_clique(subgraph)]
+        outputs = iter(run_concurrently(calls, self.max_processes))
+        partitions = iter(partition for partition, _ in calls)
+        for subgraph in subgraphs:
+            if self.is_clique(subgraph):
+                yield self.clique_weight(subgraph)
+            else:
+                yield self.partition_weight(next(partitions), next(outputs))
 
     def run(self, in_args):
-        self.start_time = datetime.now()
         self.set_stat('status', 'init')
 
         graph, tree = in_args
@@ -95,16 +146,21 @@ class PartitionBags(Action):
         # sort bags descending by size
         bags.sort(key=lambda pair: len(pair[1]), reverse=True)
 
+        # bags of BranchingPartition depend on each other (sufficient_weight)
+        if self.max_processes > 1 and not isinstance(self.partition.option, BranchingPartition):
+            bag_weights = self.concurrent_weights(graph, [bag for _, bag in bags])
+        else:
+            bag_weights = self.weights(graph, [bag for _, bag in bags])
+
         max_weight = 0
         max_idx = -1
         weights = []
-        for i, bag in bags:
-            w = self.weight(graph, bag)
+        for (i, bag), w in zip(bags, bag_weights):
             weights.append(w)
             if w > max_weight:
                 max_weight = w
                 max_idx = i
-            if self.get_stat('status') == "timeout":
+            if self.get_stat('status') in ("timeout", "failed"):
                 self.set_stat('max_weight', -1)
                 return graph, tree
         self.set_stat('status', "success")
@@ -123,9 +179,9 @@ class PartitionBags(Action):
     def compute_stats(self, input, output) -> 'dict[str,str]':
         graph, tree = output
         partition_nums = np.array(self._num_partitions)
-        mean_partition_num = str(partition_nums.mean())
-        max_partition_num = str(np.max(partition_nums, initial=-1))
-        median_partition_num = str(np.median(partition_nums))
+        mean_partition_num = partition_nums.mean().item()
+        max_partition_num = np.max(partition_nums, initial=-1).item()
+        median_partition_num = np.median(partition_nums).item()
         self.set_stat('mean_partition_num', mean_partition_num)
         self.set_stat('median_partition_num', median_partition_num)
         self.set_stat('max_partition_num', max_partition_num)
@@ -139,32 +195,18 @@ class PartitionBags(Action):
                 max_val = np.max(array)
                 mean_val = array.mean()
                 median_val = np.median(array)
-                self.set_stat(f'{key}_sum', str(total_sum))
-                self.set_stat(f'{key}_max', str(max_val))
-                self.set_stat(f'{key}_mean', str(mean_val))
-                self.set_stat(f'{key}_median', str(median_val))
+                self.set_stat(f'{key}_sum', total_sum.item())
+                self.set_stat(f'{key}_max', max_val.item())
+                self.set_stat(f'{key}_mean', mean_val.item())
+                self.set_stat(f'{key}_median', median_val.item())
             else:
                 self.set_stat(f'{key}_sum', -1)
                 self.set_stat(f'{key}_max', -1)
                 self.set_stat(f'{key}_mean', -1)
                 self.set_stat(f'{key}_median', -1)
 
-    def get_stat_keys(self) -> "list[str]":
-        res = super().get_stat_keys() + [
-            "status",
-            "max_weight",
-            "mean_partition_num",
-            "median_partition_num",
-            "max_partition_num",
-            "num_clq_red",
-            "partition_option",
-        ]
-        for key in self.other_stats:
-            res.append(f'{key}_sum')
-            res.append(f'{key}_max')
-            res.append(f'{key}_mean')
-            res.append(f'{key}_median')
-        return res
+    def signature(self) -> tuple:
+        return super().signature() + (self.partition.signature(),)
 
     @classmethod
     def construct(cls, context: ActionContext, parents):
@@ -175,13 +217,11 @@ class PartitionBags(Action):
 
     @classmethod
     def construct_all(cls, context: ActionContext, parents):
-        partition_choices = context.construct_variants("Partition", parents + [cls.name()])
-        res = []
+        partition_choices = context.iter_variants("Partition", parents + [cls.name()])
         for part in partition_choices:
             for inst in super().construct_all(context, parents):
                 inst.set_partition(part)
-                res.append(inst)
-        return res
+                yield inst
 defined_actions.append(PartitionBags)
 
 class PartLargestBag(PartitionBags):
@@ -200,9 +240,9 @@ class PartLargestBag(PartitionBags):
     def compute_stats(self, input, output) -> 'dict[str,str]':
         graph, tree = output
         partition_nums = np.array(self._num_partitions)
-        mean_partition_num = str(partition_nums.mean())
-        max_partition_num = str(partition_nums.max())
-        median_partition_num = str(np.median(partition_nums))
+        mean_partition_num = partition_nums.mean().item()
+        max_partition_num = partition_nums.max().item()
+        median_partition_num = np.median(partition_nums).item()
 
         self.set_stat('mean_partition_num', mean_partition_num)
         self.set_stat('median_partition_num', median_partition_num)
@@ -211,14 +251,4 @@ class PartLargestBag(PartitionBags):
 
         for key, val in self.partition.option.stats.items():
             self.set_stat(f'partition:{key}', val)
-
-    def get_stat_keys(self) -> "list[str]":
-        return super().get_stat_keys() + [
-            "status",
-            "max_weight",
-            "mean_partition_num",
-            "median_partition_num",
-            "max_partition_num",
-            "partition_option",
-        ]
 defined_actions.append(PartLargestBag)
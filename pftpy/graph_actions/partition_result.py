@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import igraph
+import numpy as np
+
+
+class PartitionResult:
+    """Result of a Partition action: the partitioned graph (not copied) and
+    the class of each vertex as label 0..num_classes-1, with the size and
+    weight log2(size+1) of every class."""
+    __slots__ = ['graph', 'labels', 'sizes', 'log_weights']
+
+    def __init__(self, graph: igraph.Graph, labels):
+        self.graph = graph
+        self.labels = np.asarray(labels, dtype=np.int32)
+        """np.ndarray: int32 label of each vertex"""
+        self.sizes = np.bincount(self.labels)
+        """np.ndarray: number of vertices with each label"""
+        self.log_weights = np.log2(self.sizes + 1)
+        """np.ndarray: log2(size+1) of each class"""
+
+    @classmethod
+    def from_classes(cls, graph, classes) -> 'PartitionResult':
+        """Partition given as list of the vertex lists of its classes"""
+        labels = np.full(graph.vcount(), -1, dtype=np.int32)
+        for i, vertices in enumerate(classes):
+            labels[vertices] = i
+        assert (labels >= 0).all(), "every vertex has to be in a class"
+        return cls(graph, labels)
+
+    @classmethod
+    def from_attribute(cls, graph, attribute='partition') -> 'PartitionResult':
+        """Partition given as vertex attribute (arbitrary hashable values)"""
+        _, labels = np.unique(np.asarray(graph.vs[attribute]), return_inverse=True)
+        return cls(graph, labels)
+
+    @property
+    def num_classes(self) -> int:
+        return len(self.sizes)
+
+    def vcount(self) -> int:
+        return len(self.labels)
+
+    def weight(self) -> float:
+        """log2 of the product of (size+1) over all classes"""
+        return float(self.log_weights.sum())
+
+    def contract(self) -> igraph.Graph:
+        """Graph with a vertex per class (vertex attribute `weight`), two of
+        which are adjacent if there is an edge between the classes. Keeps the
+        graph attributes."""
+        k = self.num_classes
+        edges = np.array(self.graph.get_edgelist(), dtype=np.int64).reshape(-1, 2)
+        ends = self.labels[edges]
+        ends.sort(axis=1)
+        ends = ends[ends[:, 0] != ends[:, 1]]
+        keys = np.unique(ends[:, 0].astype(np.int64) * k + ends[:, 1])
+
+        contracted = igraph.Graph(k, np.stack((keys // k, keys % k), axis=1).tolist())
+        contracted.vs['weight'] = self.log_weights.tolist()
+        for attr in self.graph.attributes():
+            contracted[attr] = self.graph[attr]
+        return contracted
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Input formats of the external solvers.
+
+The payloads are built in bulk from edge arrays (instead of writing one line
+per vertex or edge) and returned as bytes, which are passed to the solvers
+through a pipe or a file in memory (see `actions.util.shm_file`).
+"""
+
+from itertools import chain
+
+import numpy as np
+
+
+def edge_array(graph) -> np.ndarray:
+    """Edges of an igraph.Graph as array of shape (m, 2)"""
+    edges = graph.get_edgelist()
+    return np.fromiter(chain.from_iterable(edges), dtype=np.int64,
+                       count=2*len(edges)).reshape(-1, 2)
+
+
+def ragged(rows) -> 'tuple[np.ndarray, np.ndarray]':
+    """CSR structure (offsets, values) of a list of lists of integers, row i
+    is values[offsets[i]:offsets[i+1]]"""
+    lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    values = np.fromiter(chain.from_iterable(rows), dtype=np.int64,
+                         count=offsets[-1])
+    return offsets, values
+
+
+def format_rows(lengths, values, word="%d", sep=" ", start="", end="\n") -> str:
+    """Formats rows of integers (row i consists of the next lengths[i] values,
+    each formatted by `word`) with a single %-operation. If `start` contains a
+    conversion, every row is preceded by an additional value for it.
+
+    Example: format_rows([2, 0, 1], [1, 2, 3]) == "1 2\\n\\n3\\n"
+    """
+    templates = {}
+    def template(length):
+        if length not in templates:
+            templates[length] = start + sep.join([word] * length) + end
+        return templates[length]
+    rows = "".join([template(length) for length in np.asarray(lengths).tolist()])
+    return rows % tuple(np.asarray(values).tolist())
+
+
+def _with_row_values(offsets, values, row_values) -> np.ndarray:
+    # values with row_values[i] in front of row i
+    return np.insert(values, offsets[:-1], row_values)
+
+
+def pace_gr(n, edges) -> bytes:
+    """PACE .gr format (1-based), e.g. for htd:
+    ```text
+        p tw 3 2
+        1 2
+        2 3
+    ```
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    m = len(edges)
+    body = ("%d %d\n" * m) % tuple((edges.ravel() + 1).tolist())
+    return f"p tw {n} {m}\n{body}".encode()
+
+
+def metis(n, edges) -> bytes:
+    """METIS graph format (1-based neighbors of every vertex in ascending
+    order), e.g. for quick-cliques:
+    ```text
+        3 2 1
+        2
+        1 3
+        2
+    ```
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    sources = np.concatenate((edges[:, 0], edges[:, 1]))
+    targets = np.concatenate((edges[:, 1], edges[:, 0]))
+    # sorting source*n + target orders by source, then target
+    neighbors = np.sort(sources * n + targets) % n
+    body = format_rows(np.bincount(sources, minlength=n), neighbors + 1)
+    return f"{n} {len(edges)} 1\n{body}".encode()
+
+
+def hypergraph(n, edges) -> bytes:
+    """Hypergraph format of findminhs, e.g.
+    ```text
+        4 2
+        3 0 1 2
+        2 2 3
+    ```
+    4 vertices, 2 edges;
+    first edge has 3 vertices (0, 1, 2)
+    second edge has 2 vertices (2, 3)
+    """
+    offsets, values = ragged(edges)
+    lengths = np.diff(offsets)
+    body = format_rows(lengths, _with_row_values(offsets, values, lengths),
+                       start="%d ")
+    return f"{n} {len(edges)}\n{body}".encode()
+
+
+def lp(n_or_weights, edges) -> bytes:
+    """Hitting set as binary program in LP format (for gurobi_cl): minimize
+    the (weighted, if a list of vertex weights is given) number of chosen
+    vertices, such that every edge contains a chosen vertex"""
+    if isinstance(n_or_weights, int):
+        n = n_or_weights
+        objective = " + ".join(f"x{i}" for i in range(n))
+    else:
+        n = len(n_or_weights)
+        objective = " + ".join(f"{float(w)} x{i}" for i, w in enumerate(n_or_weights))
+
+    offsets, values = ragged(edges)
+    values = _with_row_values(offsets, values, np.arange(len(edges)))
+    constraints = format_rows(np.diff(offsets), values, word="x%d", sep=" + ",
+                              start="  c%d: ", end=" >= 1\n")
+    binary = " ".join(f"x{i}" for i in range(n))
+    return (f"Minimize\n  obj: {objective}\nSubject To\n{constraints}"
+            f"Binary  {binary}\nEnd\n").encode()
@@ -1,14 +1,17 @@
 import heapq
 from abc import ABC, abstractmethod
 from math import ceil
-from tempfile import NamedTemporaryFile
 import datetime
 import random
 
 import igraph, subprocess
 
 from actions import Action, ChoiceAction
+from actions.util import ProcessAction
 from graph_actions.blowup import Blowup
+from graph_actions.csr import CSRGraph
+from graph_actions.solver_io import edge_array, pace_gr
+from artifact_store import ArtifactStore, digest, graph_fingerprint
 
 
 defined_actions = []
@@ -55,11 +58,6 @@ def annotate_bags(graph, treedec):
     graph['treewidth'] = treedec['width']
 
 
-def write_graph(graph, in_stream):
-    in_stream.write(f'p tw {graph.vcount()} {graph.ecount()}\n')
-    for v, w in graph.get_edgelist():
-        in_stream.write(f'{v+1} {w+1}\n')
-
 def failed_treewidth(graph):
     tree = igraph.Graph()
     tree.add_vertex()
@@ -79,19 +77,20 @@ def mock_decomposition(graph, width):
     return graph, tree
 
 
-def fill(graph, nodes):
-    new_edges = []
+def fill(adjacency: 'list[set[int]]', nodes):
+    """Adds the missing edges between `nodes` to the neighbor sets of a graph
+    (see CSRGraph.adjacency_sets)"""
     for n1 in nodes:
         for n2 in nodes:
             if n1 >= n2:
                 continue
-            if not n1 in graph.neighbors(n2):
-                new_edges.append((n1, n2))
-    graph.add_edges(new_edges)
+            if not n1 in adjacency[n2]:
+                adjacency[n1].add(n2)
+                adjacency[n2].add(n1)
 
 def elimination_game(graph, order):
-    g: igraph.Graph = graph.copy()
-    n = g.vcount()
+    adjacency = CSRGraph.from_igraph(graph, attributes=()).adjacency_sets()
+    n = graph.vcount()
     assert len(order) >= n-1, f"len(order) = {len(order)}, n = {n}"
 
     rank = [0] * n
@@ -100,24 +99,26 @@ def elimination_game(graph, order):
 
     # fill edges
     for i, v in enumerate(order):
-        neighs = [n for n in g.neighbors(v) if rank[n] > i]
-        fill(g, neighs)
+        neighs = [n for n in adjacency[v] if rank[n] > i]
+        fill(adjacency, neighs)
 
     v_to_bags = [list() for _ in range(n)]
-    tree: igraph.Graph = igraph.Graph()
+    bags = []
+    tree_edges = []
     for v in reversed(order):
         # create new bag for last node
-        if tree.vcount() == 0:
-            tree.add_vertex(vertices=[v])
+        if len(bags) == 0:
+            bags.append([v])
             v_to_bags[v].append(0)
             continue
-        # find smallest parent bag
-        neighs = {n for n in g.neighbors(v) if rank[n] > rank[v]}
+        # find smallest parent bag (neighbors in ascending order, so that
+        # ties are broken as before)
+        neighs = {n for n in sorted(adjacency[v]) if rank[n] > rank[v]}
         chosen_bag = 0
         min_num_other = n
         for neigh in neighs:
             for bag_idx in v_to_bags[neigh]:
-                bag_nodes = set(tree.vs[bag_idx]['vertices'])
+                bag_nodes = set(bags[bag_idx])
                 if neighs.issubset(bag_nodes):
                     num_other = len(bag_nodes - neighs)
                     if num_other < min_num_other:
@@ -125,38 +126,54 @@ def elimination_game(graph, order):
                         chosen_bag = bag_idx
         # either add node to parent bag or append new bag with node and neighs
         if min_num_other == 0:
-            tree.vs[chosen_bag]['vertices'].append(v)
+            bags[chosen_bag].append(v)
             v_to_bags[v].append(chosen_bag)
         else:
             bag_nodes = [v] + list(neighs)
-            new_bag = tree.add_vertex(vertices=bag_nodes).index
-            tree.add_edge(chosen_bag, new_bag)
+            new_bag = len(bags)
+            bags.append(bag_nodes)
+            tree_edges.append((chosen_bag, new_bag))
             v_to_bags[v].append(new_bag)
 
-    width = max(len(bag) for bag in tree.vs['vertices']) - 1
+    tree: igraph.Graph = igraph.Graph(len(bags), tree_edges)
+    tree.vs['vertices'] = bags
+    width = max(len(bag) for bag in bags) - 1
     tree['width'] = width
     graph['treewidth'] = width
     return (graph, tree)
 
 
-class HTD(Action):
+class HTD(ProcessAction):
+    stat_keys = [
+        "status",
+        "td_cache",
+    ]
+
     def __init__(self, context, parents, parameters):
         super().__init__(context, parents, parameters)
 
         self.dir = self._params['dir']
         self.seed = self._params['seed']
-        self.timeout = int(self._params['timeout'])
         self.variant = self._params['variant']
         self.clique_lb = self._params['clique_lb']
+        # the default seed is drawn anew for every action, so decompositions
+        # are only reproducible (and stored) with an explicit seed
+        self.cache = str(self._params['cache']).lower() != 'false' \
+            and 'seed' in (parameters or {})
+        self.store = ArtifactStore(self._params['cache_dir'], suffix=".td")
 
     @staticmethod
     def default_params():
         return {
             'dir': './htd/build/bin',
-            'seed': random.randint(1, 1e8),
+            'seed': random.randint(1, 10**8),
             'timeout': -1,
             'variant': 'default',
             'clique_lb': False,
+            # decompositions (PACE .td format) with an explicit seed are
+            # stored in cache_dir, keyed by graph fingerprint, seed and options
+            'cache': True,
+            'cache_dir': './cache/td',
         }
 
     def run(self, g: igraph.Graph):
@@ -171,24 +188,32 @@ class HTD(Action):
             raise KeyError(f"value {self.variant} for parameter variant illegal")
         command = ['./htd_main', "-s",
                    str(self.seed)] + options
-        if self.timeout != -1:
-            timeout_cmd = ['timeout', '-s', 'QUIT', f'{self.timeout}s']
-            command = timeout_cmd + command
+
+        key = None
+        self.set_stat('td_cache', 'off')
+        if self.cache:
+            key = digest(graph_fingerprint(g), self.seed, self.variant, options)
+            stored = self.store.get(key)
+            if stored is not None:
+                self.set_stat('td_cache', 'hit')
+                t = parse_tree_dec([l.strip() for l in stored.decode().splitlines()])
+                annotate_bags(g, t)
+                self.set_stat('status', 'success')
+                return (g, t)
+            self.set_stat('td_cache', 'miss')
 
         try:
-            with subprocess.Popen(command,
-                                cwd=self.dir, text=True, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
-                                stderr=subprocess.DEVNULL) as p:
-                write_graph(g, p.stdin)
-                out, err = p.communicate()
-        except:
+            p = self.run_process(command, input=pace_gr(g.vcount(), edge_array(g)),
+                                 cwd=self.dir, stdout=subprocess.PIPE,
+                                 stderr=subprocess.DEVNULL)
+            out = p.stdout.decode()
+        except subprocess.TimeoutExpired:
             self.set_stat('status', 'timeout')
             return failed_treewidth(g)
-        if p.returncode == 124:
-            # timeout
-            self.set_stat('status', 'timeout')
+        except OSError:
+            self.set_stat('status', 'error')
             return failed_treewidth(g)
-        elif p.returncode != 0:
+        if p.returncode != 0:
             self.set_stat('status', 'error')
             return failed_treewidth(g)
 
@@ -200,32 +225,33 @@ class HTD(Action):
         t = parse_tree_dec(lines)
         annotate_bags(g, t)
         self.set_stat('status', 'success')
+        if key is not None:
+            self.store.put(key, out.encode())
 
         return (g, t)
-
-    def get_stat_keys(self) -> "list[str]":
-        return super().get_stat_keys() + [
-            "status"
-        ]
 defined_actions.append(HTD)
 
 
 class WeightedMindeg(Action):
+    stat_keys = [
+        'time_elimination_game',
+        'elimination_width'
+    ]
 
     def run(self, graph: igraph.Graph):
-        #v['weight']
         n = graph.vcount()
-        g = graph.copy()
+        csr = CSRGraph.from_igraph(graph, attributes=())
+        weights = graph.vs['weight']
 
-        degs = []
-        for v in g.vs():
-            neighs = g.neighbors(v)
-            weights = g.vs[neighs]['weight']
-            degs.append(sum(weights))
+        bounds = csr.offsets.tolist()
+        neighbor_list = csr.neighbors.tolist()
+        degs = [sum([weights[w] for w in neighbor_list[a:b]])
+                for a, b in zip(bounds, bounds[1:])]
 
         orig_degs = degs.copy()
         deleted = [False for _ in range(n)]
         num_deleted = 0
+        adjacency = csr.adjacency_sets()
 
         # init pq
         pq = [(degs[i], orig_degs[i], i) for i in range(n)]
@@ -234,28 +260,30 @@ class WeightedMindeg(Action):
         tw = 1
         order = []
 
-        while g.vcount() - num_deleted > 1:
+        while n - num_deleted > 1:
             # get min deg vertex
             (deg, old_deg, vertex) = heapq.heappop(pq)
-            if deg != degs[vertex]:
+            if deleted[vertex] or deg != degs[vertex]:
                 continue  # lazy decrease key: degree no longer valid
             order.append(vertex)
 
             tw = max(tw, deg)
 
             # fill in neighbourhood, delete v
-            neighbors = [w for w in g.neighbors(vertex) if not deleted[w]]
-            degree_change = [- g.vs['weight'][vertex]] * len(neighbors)
+            neighbors = [w for w in sorted(adjacency[vertex]) if not deleted[w]]
+            degree_change = [- weights[vertex]] * len(neighbors)
             edges_add = []
             for i1, n1 in enumerate(neighbors):
                 for i2, n2 in enumerate(neighbors):
                     if not n1 < n2:
                         continue
-                    if not n1 in g.neighbors(n2):
-                        edges_add.append([n1, n2])
-                        degree_change[i1] += g.vs['weight'][i2]
-                        degree_change[i2] += g.vs['weight'][i1]
-            g.add_edges(edges_add)
+                    if not n1 in adjacency[n2]:
+                        edges_add.append((n1, n2))
+                        degree_change[i1] += weights[n2]
+                        degree_change[i2] += weights[n1]
+            for n1, n2 in edges_add:
+                adjacency[n1].add(n2)
+                adjacency[n2].add(n1)
             for i, neigh in enumerate(neighbors):
                 degs[neigh] += degree_change[i]
                 heapq.heappush(pq, (degs[neigh], orig_degs[neigh], neigh))
@@ -271,12 +299,6 @@ class WeightedMindeg(Action):
         tree['width'] = tw
         graph['treewidth'] = tw
         return graph, tree
-
-    def get_stat_keys(self):
-        return super().get_stat_keys() + [
-            'time_elimination_game',
-            'elimination_width'
-        ]
 defined_actions.append(WeightedMindeg)
 
 
@@ -286,8 +308,11 @@ class CliqueGreedy(Action):
         n = graph.vcount()
         partition = self.retrieve_action("Partition")
 
-        g = partition(graph)
-        g.vs['deleted'] = [False for _ in range(n)]
+        partitioned = partition(graph)
+        if partitioned is None:
+            return failed_treewidth(graph)
+        labels = partitioned.labels.tolist()
+        adjacency = CSRGraph.from_igraph(graph, attributes=()).adjacency_sets()
 
         order = []
         deleted = [False for _ in range(n)]
@@ -297,18 +322,20 @@ class CliqueGreedy(Action):
             min_vert = -1
             min_neighs = []
             num_parts = n
-            for v in g.vs.select(deleted=False):
-                neighs = [n for n in g.neighbors(v.index) if not g.vs[n]['deleted']]
-                partitions = {g.vs[n]['partition'] for n in neighs}
+            for v in range(n):
+                if deleted[v]:
+                    continue
+                neighs = [n for n in adjacency[v] if not deleted[n]]
+                partitions = {labels[n] for n in neighs}
                 if len(partitions) < num_parts:
                     num_parts = len(partitions)
-                    min_vert = v.index
+                    min_vert = v
                     min_neighs = neighs
 
             order.append(min_vert)
-            g.vs[min_vert]['deleted'] = True
+            deleted[min_vert] = True
             num_deleted += 1
-            fill(g, min_neighs)
+            fill(adjacency, min_neighs)
 
         graph, tree = elimination_game(graph, order)
         return graph, tree
@@ -321,33 +348,45 @@ class IterativeCliqueGreedy(Action):
         n = graph.vcount()
         partition = self.retrieve_action("Partition")
 
-        g: igraph.Graph = partition(graph)
-        g.vs['deleted'] = [False for _ in range(n)]
+        csr = CSRGraph.from_igraph(graph)
+        adjacency = csr.adjacency_sets()
 
         order = []
+        deleted = [False for _ in range(n)]
         num_deleted = 0
 
         while n - num_deleted > 1:
             min_vert = -1
             min_neighs = []
             num_parts = n
-            for v in g.vs.select(deleted=False):
-                neighs = [n for n in g.neighbors(v.index) if not g.vs[n]['deleted']]
-                induced = g.induced_subgraph(neighs + [v])
-                ind_n, ind_m = induced.vcount(), induced.ecount()
+            for v in range(n):
+                if deleted[v]:
+                    continue
+                neighs = [n for n in adjacency[v] if not deleted[n]]
+                # neighborhood of v (with fill edges) in ascending order
+                nodes = sorted(neighs + [v])
+                index = {u: i for i, u in enumerate(nodes)}
+                edges = [(index[u], index[w]) for u in nodes for w in adjacency[u]
+                         if u < w and w in index]
+                ind_n, ind_m = len(nodes), len(edges)
                 if ind_m == ind_n*(ind_n-1) // 2:
                     partitions = 1
                 else:
-                    partitioned: igraph.Graph = partition(induced)
-                    partitions = len(set(partitioned.vs['partition']))
+                    induced = igraph.Graph(ind_n, edges)
+                    for name, column in csr.vs.items():
+                        induced.vs[name] = column[nodes].tolist()
+                    partitioned = partition(induced)
+                    if partitioned is None:
+                        return failed_treewidth(graph)
+                    partitions = partitioned.num_classes
                 if partitions < num_parts:
                     num_parts = partitions
-                    min_vert = v.index
+                    min_vert = v
                     min_neighs = neighs
             order.append(min_vert)
-            g.vs[min_vert]['deleted'] = True
+            deleted[min_vert] = True
             num_deleted += 1
-            fill(g, min_neighs)
+            fill(adjacency, min_neighs)
 
 
         graph, tree = elimination_game(graph, order)
@@ -363,6 +402,11 @@ class Treewidth(ChoiceAction):
         'iter_clique_greedy': IterativeCliqueGreedy,
     }
 
+    stat_keys = [
+        "treewidth",
+        "num_bags"
+    ]
+
     @classmethod
     def default_action(cls):
         return 'htd'
@@ -371,12 +415,6 @@ class Treewidth(ChoiceAction):
         graph, tree = output
         self.set_stat('treewidth', graph['treewidth'])
         self.set_stat('num_bags', tree.vcount())
-
-    def get_stat_keys(self) -> "list[str]":
-        return super().get_stat_keys() + [
-            "treewidth",
-            "num_bags"
-        ]
 defined_actions.append(Treewidth)
 
 
@@ -403,6 +441,8 @@ class WeightedTreewidth(ChoiceAction):
 #        'weighted_minfill': WeightedMinfill,
     }
 
+    stat_keys = ["treewidth"]
+
     @staticmethod
     def default_action():
         return 'blowup_tw'
@@ -410,7 +450,4 @@ class WeightedTreewidth(ChoiceAction):
     def compute_stats(self, input, output):
         graph, tree = output
         self.set_stat('width', graph['treewidth'])
-
-    def get_stat_keys(self) -> "list[str]":
-        return super().get_stat_keys() + ["treewidth"]
 defined_actions.append(WeightedTreewidth)
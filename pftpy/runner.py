@@ -4,21 +4,77 @@
 
 """
 
+import csv
+import functools
+import hashlib
+import io
 import json
+import os
+import tempfile
 import argh
 from actions import ActionContext, Action
+from actions.base import PrefixCache
+from actions.parallel import run_sequential, ProcessPool
+from actions.trace import Tracer
 
 
-class JSON(Action):
+def parse_shard(shard: str):
+    """Parses "i/N" into (i, N)"""
+    try:
+        index, num_shards = (int(x) for x in shard.split("/"))
+    except ValueError:
+        raise Exception(f"{shard} is not a valid shard, use i/N")
+    if not 0 <= index < num_shards:
+        raise Exception(f"shard index {index} is not in 0..{num_shards - 1}")
+    return index, num_shards
+
+
+def shard_of(action: Action, num_shards: int) -> int:
+    """Shard of a variant, stable across runs and machines"""
+    return int(action.signature_digest(), 16) % num_shards
+
+
+class Printer(Action):
+    """Base class of printers. Printers run the actions given to them using
+    their executor (see `actions.parallel`) and format their stats."""
+    def __init__(self, context, parents=None, params=None):
+        super().__init__(context, parents, params)
+        self._executor = run_sequential
+
+    def set_executor(self, executor):
+        self._executor = executor
+
+    def execute(self, actions):
+        return self._executor(actions)
+
+
+def json_value(value):
+    """Converts numpy scalars (and other values json cannot encode) for
+    `json.dumps`"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class JSON(Printer):
     def run(self, actions):
         info = []
-        for action in actions:
-            action(None)
+        for action in self.execute(actions):
             info.append(action.stats)
-        return [json.dumps(info, indent=4)]
+        return [json.dumps(info, indent=4, default=json_value)]
+
 
+class JSONL(Printer):
+    """Prints one compact json object (JSON Lines) per variant as soon as it
+    is done. Stat values keep their types."""
+    def run(self, actions):
+        for action in self.execute(actions):
+            stats = dict(action.stats)
+            stats['signature'] = action.signature_digest()
+            yield json.dumps(stats, separators=(',', ':'), default=json_value)
 
-class CSV(Action):
+
+class CSV(Printer):
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
@@ -27,24 +83,59 @@ class CSV(Action):
         self._repeatheader = self._params['repeatheader']
 
         self._csvkeys = []
+        # signatures of the variants that are skipped (see `resume`)
+        self._completed = frozenset()
 
-    def init_keys(self, actions):
+    def init_keys(self, keys):
+        # the signature column identifies the variant of a row
+        self._csvkeys = sorted(set(keys) | {'signature'})
 
-        # find csv keys
-        keys = set()
-        for a in actions:
-            keys |= set(a.get_stat_keys())
-        self._csvkeys = sorted(keys)
+    @staticmethod
+    def format_row(values):
+        """Formats the values as a csv row, quoting values with commas"""
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="").writerow(values)
+        return buffer.getvalue()
 
     def header(self):
-        return ",".join(self._csvkeys)
+        return self.format_row(self._csvkeys)
 
     def csvline(self, action: Action):
         values = []
         for key in self._csvkeys:
-            val = action.get_stat(key, "")
+            if key == 'signature':
+                val = action.signature_digest()
+            else:
+                val = action.get_stat(key, "")
             values.append(str(val))
-        return ",".join(values)
+        return self.format_row(values)
+
+    def resume(self, path):
+        """Skip the variants that already have a successful row in the csv
+        file `path` (written with the same keys) and do not print the header
+        again. A partially written last row is removed from the file."""
+        with open(path, "rb+") as handle:
+            data = handle.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                handle.truncate(end)
+
+        completed = set()
+        for row in self.parse_rows(data[:end].decode().splitlines()):
+            if row['error_status'] == "none":
+                completed.add(row['signature'])
+        self._completed = frozenset(completed)
+        self._printheader = False
+
+    def parse_rows(self, lines):
+        """Yields the rows (dicts with the csv keys and the `line`) of lines
+        printed by this printer, skipping headers and rows with other keys."""
+        for values in csv.reader(lines):
+            if values == self._csvkeys or len(values) != len(self._csvkeys):
+                continue
+            row = dict(zip(self._csvkeys, values))
+            row['line'] = self.format_row(values)
+            yield row
 
     def run(self, actions):
         if self._printheader:
@@ -52,8 +143,9 @@ class CSV(Action):
             if not self._repeatheader:
                 self._printheader = False
         if not self._onlyheader:
-            for action in actions:
-                action(None)
+            pending = (action for action in actions
+                       if action.signature_digest() not in self._completed)
+            for action in self.execute(pending):
                 yield self.csvline(action)
 
     @staticmethod
@@ -69,18 +161,20 @@ class Output(Action):
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
-        # how to print (options: 'csv', 'json')
+        # how to print (options: 'csv', 'json', 'jsonl')
         self._printer = self._params['printer']
-        if self._printer not in ['csv', 'json']:
+        if self._printer not in ['csv', 'json', 'jsonl']:
             raise Exception(f"{self._printer} is not a valid option for 'printer'")
 
-    def run(self, actions):
+    def run(self, keys):
 
         if self._printer == 'json':
             printer = self.retrieve_action("JSON")
+        elif self._printer == 'jsonl':
+            printer = self.retrieve_action("JSONL")
         else:  # self._printer == 'csv':
             printer = self.retrieve_action("CSV")
-            printer.init_keys(actions)
+            printer.init_keys(keys)
         return printer
 
     @staticmethod
@@ -95,27 +189,61 @@ class Runner:
 
     """
 
-    def __init__(self, action_name, *actions):
+    def __init__(self, action_name, *actions, schema_cache=None):
         self._action_name = action_name
         self._actions = actions
+        # directory to keep the stat schema of the action in, so that printing
+        # the csv header does not have to import all (lazy) actions
+        self._schema_cache = schema_cache
 
     def _get_context(self, filters):
         context = ActionContext()
         context.register_actions(*self._actions)
         context.register_actions(Output)
         context.register_actions(JSON)
+        context.register_actions(JSONL)
         context.register_actions(CSV)
         context.register_filters(*filters)
         return context
 
     def _get_printer(self, context: ActionContext):
         output_action = context.construct_action(Output.name())
-
-        ctx_no_filter = ActionContext(use_defaults=False)
-        ctx_no_filter.register_actions(*self._actions)
-        actions = ctx_no_filter.construct_variants(self._action_name)
-
-        return output_action(actions)
+        # the stat schema covers all variants of the action
+        keys = self._stat_schema(context)
+        return output_action(keys)
+
+    def _source_digest(self):
+        """Digest of the name, modification time and size of the python files
+        of this package"""
+        h = hashlib.sha256(self._action_name.encode())
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for root, dirs, files in os.walk(package_dir):
+            dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+            for name in sorted(files):
+                if name.endswith(".py"):
+                    st = os.stat(os.path.join(root, name))
+                    rel = os.path.relpath(os.path.join(root, name), package_dir)
+                    h.update(f"{rel}:{st.st_mtime_ns}:{st.st_size};".encode())
+        return h.hexdigest()
+
+    def _stat_schema(self, context: ActionContext):
+        if self._schema_cache is None:
+            return context.stat_schema(self._action_name)
+
+        path = os.path.join(self._schema_cache, self._source_digest() + ".json")
+        try:
+            with open(path) as handle:
+                return frozenset(json.load(handle))
+        except (FileNotFoundError, ValueError):
+            pass
+
+        keys = context.stat_schema(self._action_name)
+        os.makedirs(self._schema_cache, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self._schema_cache, prefix=".tmp-")
+        with os.fdopen(fd, "w") as handle:
+            json.dump(sorted(keys), handle)
+        os.replace(tmp_path, path)
+        return keys
 
 
     @argh.arg('-f', '--filters', nargs='+', action='extend')
@@ -129,17 +257,117 @@ class Runner:
         return output
 
     @argh.arg('-f', '--filters', nargs='+', action='extend')
-    def run_all(self, filters=[], all_variants=False):
+    @argh.arg('-j', '--jobs', help="number of variants run in parallel worker processes")
+    @argh.arg('--timeout', help="timeout in seconds per variant (-1 for none), enforced in a worker process")
+    @argh.arg('--share-prefix', help="run leading steps that consecutive variants have in common only once")
+    @argh.arg('--trace', help="directory to write a Chrome trace (json) of every variant to")
+    @argh.arg('-o', '--output', help="file to write the output to, every csv row is flushed to disk once its variant is done")
+    @argh.arg('--resume', help="only run the variants without a successful row in the (csv) output file")
+    @argh.arg('--shard', help="i/N: only run the variants in shard i (0 <= i < N) of N disjoint shards")
+    def run_all(self, filters=[], all_variants=False, jobs=1, timeout=-1.0, share_prefix=False,
+                trace=None, output=None, resume=False, shard=None):
         use_defaults = not all_variants
         context = self._get_context(filters)
         context.use_defaults = use_defaults
+        context.variant_timeout = timeout
 
-        printer = self._get_printer(context)
+        group_key = None
+        if share_prefix:
+            context.prefix_cache = PrefixCache()
+            group_key = lambda action: action.prefix_signature()
 
-        actions = context.construct_variants(self._action_name)
-        for line in printer(actions):
-            yield line
+        tracer = None
+        if trace is not None:
+            os.makedirs(trace, exist_ok=True)
+            tracer = Tracer(trace)
+            context.tracer = tracer
 
+        printer = self._get_printer(context)
+        if jobs > 1 or timeout != -1:
+            printer.set_executor(ProcessPool(jobs, timeout, group_key, tracer))
+        elif tracer is not None:
+            printer.set_executor(functools.partial(run_sequential, tracer=tracer))
+
+        mode = "w"
+        if resume:
+            if output is None or not isinstance(printer, CSV):
+                raise Exception("--resume requires --output and the csv printer")
+            if os.path.exists(output):
+                printer.resume(output)
+                mode = "a"
+
+        # variants are constructed one at a time while the printer consumes
+        # them (not at all for the csv header), and released after their row
+        variants = context.iter_variants(self._action_name)
+        if shard is not None:
+            index, num_shards = parse_shard(shard)
+            variants = (action for action in variants
+                        if shard_of(action, num_shards) == index)
+        lines = printer(variants)
+        if output is None:
+            yield from lines
+            return
+
+        with open(output, mode) as handle:
+            for line in lines:
+                handle.write(line + "\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+
+
+    @argh.arg('shards', nargs='+', help="csv files written by run-all --shard (with the same filters)")
+    @argh.arg('-f', '--filters', nargs='+', action='extend')
+    @argh.arg('-o', '--output', help="file to write the merged csv to")
+    def merge(self, shards, filters=[], all_variants=False, output=None):
+        """Merge the csv output of the shards of a sweep into the order of an
+        unsharded run, verifying that every variant has exactly one row"""
+        use_defaults = not all_variants
+        context = self._get_context(filters)
+        context.use_defaults = use_defaults
+        printer = self._get_printer(context)
+        if not isinstance(printer, CSV):
+            raise Exception("merge requires the csv printer")
+
+        rows = {}
+        duplicates = set()
+        for path in shards:
+            with open(path) as handle:
+                for row in printer.parse_rows(handle.read().splitlines()):
+                    signature = row['signature']
+                    if signature in rows:
+                        # a resumed shard may contain failed rows that were
+                        # rerun later, keep the successful one
+                        if rows[signature]['error_status'] == "none":
+                            if row['error_status'] == "none":
+                                duplicates.add(signature)
+                            continue
+                    rows[signature] = row
+
+        lines = [printer.header()]
+        missing = []
+        for action in context.iter_variants(self._action_name):
+            row = rows.pop(action.signature_digest(), None)
+            if row is None:
+                missing.append(str(action))
+            else:
+                lines.append(row['line'])
+
+        errors = []
+        if len(missing) > 0:
+            errors.append(f"{len(missing)} variants have no row, e.g. {missing[0]}")
+        if len(rows) > 0:
+            errors.append(f"{len(rows)} rows do not belong to a variant")
+        if len(duplicates) > 0:
+            errors.append(f"{len(duplicates)} variants have more than one successful row")
+        if len(errors) > 0:
+            raise Exception("incomplete sweep: " + "; ".join(errors))
+
+        if output is None:
+            yield from lines
+            return
+        with open(output, "w") as handle:
+            for line in lines:
+                handle.write(line + "\n")
 
     @argh.arg('-f', '--filters', nargs='+', action='extend')
     def print(self, filters=[]):
@@ -154,6 +382,5 @@ class Runner:
         context = self._get_context(filters)
         context.use_defaults = use_defaults
 
-        actions = context.construct_variants(self._action_name)
-        for action in actions:
+        for action in context.iter_variants(self._action_name):
             print(action)
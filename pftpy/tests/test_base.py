@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 from pftpy.actions import ActionContext, Action, ChoiceAction, SequenceAction
+from pftpy.actions.base import PrefixCache
+
+import gc
+import weakref
 
 import pytest
 
@@ -19,6 +23,23 @@ def test_context_match_specificity(filterstr, call_stack, res):
     assert ActionContext._match_specificity(filterstr, call_stack) == res
 
 
+def test_context_resolution_cached():
+    ctx = ActionContext()
+    ctx.register_filters("a:b:c(p=1)", "c(p=2)", "b:c(p=3)", "x:c", "b:d")
+    assert ctx.most_specific_filters(["a", "b"], "c") == ["a:b:c(p=1)"]
+    assert ctx.most_specific_filters(["e", "b"], "c") == ["b:c(p=3)"]
+    assert ctx.most_specific_filters(["e"], "c") == ["c(p=2)"]
+    assert ctx.most_specific_choice(["a"], "b") == ["a:b:c(p=1)"]
+    assert ctx.most_specific_choice(["e"], "b") == ["b:c(p=3)", "b:d"]
+    assert ctx.most_specific_choice(["a"], "x") == ["x:c"]
+    assert ctx.resolve_parameters(["e"], "c") == [{'p': '2'}]
+    assert ctx.resolve_parameters(["e"], "c") is ctx.resolve_parameters(["e"], "c")
+
+    # new filters invalidate memoized resolutions
+    ctx.register_filters("e:c(p=4)")
+    assert ctx.resolve_parameters(["e"], "c") == [{'p': '4'}]
+
+
 def test_action_parse_parameters():
     f = [
         "a:b:c:d(p1=3)",
@@ -131,3 +152,138 @@ def test_construct_all_no_defaults_filtered(context_no_default):
     actions = ctx.construct_variants("ExampleSeq")
 
     assert len(actions) == 2
+
+
+def test_iter_variants_order(context_no_default):
+    ctx: ActionContext = context_no_default
+    variants = [str(a) for a in ctx.iter_variants("ExampleSeq")]
+
+    assert variants == [
+        "ExampleSeq[GetNum(Get1),Adder(Add2)]",
+        "ExampleSeq[GetNum(Get1),Adder(Add5)]",
+        "ExampleSeq[GetNum(Get2),Adder(Add2)]",
+        "ExampleSeq[GetNum(Get2),Adder(Add5)]",
+    ]
+
+
+def test_iter_variants_lazy(context_no_default):
+    ctx: ActionContext = context_no_default
+    variants = ctx.iter_variants("ExampleSeq")
+
+    first = next(variants)
+    ref = weakref.ref(first)
+    del first
+    next(variants)
+    gc.collect()
+
+    # consumed variants are not referenced by the generator
+    assert ref() is None
+
+
+class CountedInput(Action):
+    calls = 0
+
+    def run(self, _):
+        CountedInput.calls += 1
+        return [int(self._params['n'])]
+
+    @staticmethod
+    def default_params():
+        return {'n': 1}
+
+
+class Append(Action):
+    def run(self, lst):
+        lst.append(int(self._params['num']))
+        return lst
+
+    @staticmethod
+    def default_params():
+        return {'num': 0}
+
+
+class SharedSeq(SequenceAction):
+    steps = [CountedInput, Append]
+
+
+def test_shared_prefix():
+    ctx = ActionContext()
+    ctx.register_actions(SharedSeq, CountedInput, Append)
+    ctx.register_filters("Append(num=1)", "Append(num=2)", "Append(num=3)")
+    ctx.prefix_cache = PrefixCache()
+    CountedInput.calls = 0
+
+    results = [action(None) for action in ctx.construct_variants("SharedSeq")]
+
+    assert CountedInput.calls == 1
+    # outputs of shared steps are copied, so mutations do not leak
+    assert results == [[1, 1], [1, 2], [1, 3]]
+    assert ctx.prefix_cache.hits == 2
+
+
+def test_shared_prefix_different_params():
+    ctx = ActionContext()
+    ctx.register_actions(SharedSeq, CountedInput, Append)
+    ctx.register_filters("CountedInput(n=1)", "CountedInput(n=2)")
+    ctx.prefix_cache = PrefixCache()
+    CountedInput.calls = 0
+
+    results = [action(None) for action in ctx.construct_variants("SharedSeq")]
+
+    assert CountedInput.calls == 2
+    assert results == [[1, 0], [2, 0]]
+
+
+class Double(Action):
+    stat_keys = ['factor']
+
+    def run(self, num):
+        self.set_stat('factor', 2)
+        return 2 * num
+
+
+class Negate(Action):
+    stat_keys = ['sign']
+
+    def run(self, num):
+        self.set_stat('sign', -1)
+        return -num
+
+
+class Transform(ChoiceAction):
+    options = {
+        'double': Double,
+        'negate': Negate,
+    }
+
+    @staticmethod
+    def default_action():
+        return 'double'
+
+
+class TransformSeq(SequenceAction):
+    steps = [Get1, Transform]
+
+
+def test_stat_schema():
+    ctx = ActionContext(use_defaults=False)
+    ctx.register_actions(TransformSeq, Transform, Double, Negate, Get1)
+
+    keys = set()
+    for action in ctx.construct_variants("TransformSeq"):
+        keys |= set(action.get_stat_keys())
+
+    assert ctx.stat_schema("TransformSeq") == keys
+    assert "Transform.sign" in keys
+    assert Transform.stat_schema() == {'time', 'error_status', 'option',
+                                       'factor', 'sign'}
+
+
+def test_set_stat_undeclared_key():
+    ctx = ActionContext()
+    ctx.register_actions(Double)
+    action = ctx.construct_action("Double")
+
+    action.set_stat('factor', 3)
+    with pytest.raises(LookupError):
+        action.set_stat('sign', 1)
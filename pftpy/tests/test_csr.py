@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import random
+import igraph
+import numpy as np
+from pftpy.graph_actions.csr import CSRGraph, csr_from_edges
+from pftpy.graph_actions.treewidth import elimination_game, fill
+
+
+def test_csr_graph():
+    graph = igraph.Graph.Erdos_Renyi(40, 0.15)
+    graph.vs['r'] = [float(i) for i in range(40)]
+    graph.vs['bag'] = [[i] for i in range(40)]
+    csr = CSRGraph.from_igraph(graph)
+
+    assert csr.vcount() == 40 and csr.ecount() == graph.ecount()
+    assert csr.degrees().tolist() == graph.degree()
+    for v in range(40):
+        assert csr.neighbors_of(v).tolist() == graph.neighbors(v)
+    assert csr.vs['r'].dtype == np.float64 and csr.vs['bag'][3] == [3]
+
+    pairs = [(random.randrange(40), random.randrange(40)) for _ in range(200)]
+    expected = [graph.are_adjacent(u, v) for u, v in pairs]
+    assert [csr.has_edge(u, v) for u, v in pairs] == expected
+    us, vs = zip(*pairs)
+    assert csr.has_edges(us, vs).tolist() == expected
+
+    copy = csr.to_igraph()
+    assert sorted(copy.get_edgelist()) == sorted(graph.get_edgelist())
+    assert copy.vs['r'] == graph.vs['r']
+
+
+def test_induced_subgraph():
+    graph = igraph.Graph.Erdos_Renyi(30, 0.3)
+    graph.vs['r'] = [float(i) for i in range(30)]
+    vertices = [17, 3, 8, 25, 11, 4]
+    induced = CSRGraph.from_igraph(graph).induced_subgraph(vertices)
+    expected = graph.induced_subgraph(vertices)
+
+    assert induced.vertex_ids.tolist() == sorted(vertices)
+    assert induced.vs['r'].tolist() == expected.vs['r']
+    assert sorted(map(tuple, induced.edge_array().tolist())) == sorted(expected.get_edgelist())
+    assert induced.induced_subgraph([0, 1]).vertex_ids.tolist() == [3, 4]
+
+    clique = CSRGraph.from_igraph(igraph.Graph.Full(5)).induced_subgraph([0, 2, 4])
+    assert clique.is_clique() and clique.ecount() == 3
+
+
+def test_csr_from_edges():
+    offsets, neighbors = csr_from_edges(4, [(2, 0), (0, 1), (1, 2)])
+    assert offsets.tolist() == [0, 2, 4, 6, 6]
+    assert neighbors.tolist() == [1, 2, 0, 2, 0, 1]
+    assert neighbors.dtype == np.int32
+
+
+def test_fill_and_elimination_game():
+    adjacency = CSRGraph.from_igraph(igraph.Graph.Star(5)).adjacency_sets()
+    fill(adjacency, [1, 2, 3])
+    assert adjacency[1] == {0, 2, 3} and adjacency[4] == {0}
+
+    # eliminating the center of a star first creates a clique of the leaves
+    graph, tree = elimination_game(igraph.Graph.Star(5), [0, 1, 2, 3])
+    assert graph['treewidth'] == 3
+    assert tree.vcount() == 1
+    assert sorted(tree.vs[0]['vertices']) == [0, 1, 2, 3]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import math
+import subprocess
+import time
+import pytest
+from pftpy.actions import Action, ActionContext
+from pftpy.actions.deadline import Deadline
+from pftpy.actions.util import ProcessAction
+
+
+def test_deadline():
+    assert not Deadline.after(-1).limited()
+    assert Deadline.after(None).remaining() == math.inf
+    assert Deadline.after(-1).timeout() is None
+
+    deadline = Deadline.after(10)
+    assert 9 < deadline.remaining() <= 10
+    assert not deadline.expired()
+    assert deadline.child(100).expires == deadline.expires
+    assert deadline.child(1).remaining() <= 1
+    assert deadline.child(-1).expires == deadline.expires
+    assert deadline.split(4).remaining() <= 2.5
+    assert Deadline.after(0).expired()
+
+
+class Inner(Action):
+    def run(self, input):
+        return self.deadline.remaining()
+
+    @staticmethod
+    def default_params():
+        return {'timeout': -1}
+
+
+class Outer(Action):
+    stat_keys = ['remaining_budget']
+
+    def run(self, input):
+        inner = self.retrieve_action("Inner")
+        res = [inner(None)]
+        with self.nested_deadline(self.deadline.split(10)):
+            res.append(inner(None))
+        return res
+
+    @staticmethod
+    def default_params():
+        return {'timeout': 5}
+
+
+@pytest.fixture
+def ctx():
+    ctx = ActionContext()
+    ctx.register_actions(Outer, Inner)
+    return ctx
+
+
+def test_deadline_propagation(ctx):
+    ctx.register_filters("Inner(timeout=100)")
+    outer = ctx.construct_action("Outer")
+    remaining, split = outer(None)
+
+    # the budget of a child never exceeds the one of its caller
+    assert remaining <= 5
+    assert split <= 0.5
+    assert 4 < outer.get_stat('remaining_budget') <= 5
+    assert ctx.deadline is None
+
+
+def test_variant_timeout(ctx):
+    ctx.variant_timeout = 1
+    inner = ctx.construct_action("Inner")
+    assert inner(None) <= 1
+
+
+class Spawner(ProcessAction):
+    def run(self, input):
+        # the shell starts a grandchild that would outlive the shell
+        try:
+            self.run_process(["sh", "-c", "sleep 30 & echo $!; wait"],
+                             capture_output=True, text=True)
+        except subprocess.TimeoutExpired as exc:
+            return int(exc.stdout.split()[0])
+
+    @staticmethod
+    def default_params():
+        return {'timeout': 0.5}
+
+
+def _running(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            return handle.read().split(") ")[1][0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_deadline_kills_process_group():
+    ctx = ActionContext()
+    ctx.register_actions(Spawner)
+    spawner = ctx.construct_action("Spawner")
+
+    start = time.monotonic()
+    pid = spawner(None)
+    assert time.monotonic() - start < 5
+    assert spawner.get_stat('remaining_budget') == 0
+
+    for _ in range(50):
+        if not _running(pid):
+            break
+        time.sleep(0.05)
+    assert not _running(pid)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+import hashlib
+import os
+import re
+import pytest
+import igraph
+from pftpy.actions import ActionContext
+from pftpy.graph_actions import csr_cache, generate_graph
+from pftpy.graph_actions.generate_graph import ReadELBatch
+from pftpy.artifact_store import graph_from_bytes, graph_to_bytes
+
+
+@pytest.fixture
+def gen_ctx(tmp_path):
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters(
+        "GraphInput:hrg",
+        f"HRGGen(n=100,deg=5,seed=3,cache_dir={tmp_path})",
+    )
+    return ctx
+
+
+def test_graph_bytes_roundtrip():
+    graph = igraph.Graph.Ring(5)
+    graph.vs['r'] = [0.5 * i for i in range(5)]
+    graph.vs['theta'] = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    res = graph_from_bytes(graph_to_bytes(graph))
+    assert res.vcount() == 5
+    assert res.get_edgelist() == graph.get_edgelist()
+    assert res.vs['r'] == graph.vs['r']
+    assert res.vs['theta'] == graph.vs['theta']
+
+
+def test_generated_graph_cache(gen_ctx):
+    calls = []
+
+    def generate():
+        calls.append(1)
+        graph = igraph.Graph.Ring(7)
+        graph.vs['r'] = [float(i) for i in range(7)]
+        return graph
+
+    for expected in ['miss', 'hit']:
+        gen = gen_ctx.construct_action("HRGGen")
+        gen.generate = generate
+        graph = gen(None)
+        assert gen.get_stat('graph_cache') == expected
+        assert graph.vcount() == 7
+        assert graph.vs['r'] == [float(i) for i in range(7)]
+    assert len(calls) == 1
+
+
+def test_generated_graph_no_seed(gen_ctx):
+    gen_ctx.register_filters("GirgGen(n=100)")
+    gen = gen_ctx.construct_action("GirgGen")
+    assert gen.cache_key() is None
+
+
+@pytest.mark.parametrize("params,reproducible", [
+    ("wseed=1,pseed=2,sseed=3", True),
+    ("seed=auto,wseed=1,pseed=2,sseed=3", True),
+    ("wseed=1,pseed=2", False),
+    ("rseed=1,aseed=2,sseed=3", False),
+])
+def test_generated_graph_explicit_seeds(gen_ctx, params, reproducible):
+    gen_ctx.register_filters(f"GirgGen(n=100,{params})")
+    gen = gen_ctx.construct_action("GirgGen")
+    assert (gen.cache_key() is not None) == reproducible
+
+
+def test_read_el_batch(tmp_path):
+    for name, edges in [("b", [(0, 1), (1, 2)]), ("a", [(0, 1), (1, 2), (2, 0)]),
+                        ("c", [(0, 1)])]:
+        lines = ["% header"] + [f"{v} {w}" for v, w in edges]
+        (tmp_path / name).write_text("\n".join(lines) + "\n")
+
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters("GraphInput:readel_batch", f"ReadELBatch(path={tmp_path})")
+
+    variants = list(ctx.iter_variants("GraphInput"))
+    graphs = [action(None) for action in variants]
+    # one variant per file, smallest first
+    assert [action.get_stat('graph') for action in variants] == ["c", "b", "a"]
+    assert [graph.ecount() for graph in graphs] == [1, 2, 3]
+    assert ctx.construct_action("GraphInput")(None).ecount() == 1
+
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters("GraphInput:readel_batch", f"ReadELBatch(path={tmp_path}/[ab])")
+    assert len(list(ctx.iter_variants("GraphInput"))) == 2
+
+    for path in [tmp_path / "missing", tmp_path / "x*"]:
+        ctx = ActionContext()
+        ctx.register_actions(*generate_graph.defined_actions)
+        ctx.register_filters("GraphInput:readel_batch", f"ReadELBatch(path={path})")
+        with pytest.raises(FileNotFoundError, match=re.escape(str(path))):
+            list(ctx.iter_variants("GraphInput"))
+        with pytest.raises(FileNotFoundError, match=re.escape(str(path))):
+            ctx.construct_action("GraphInput")
+
+
+def test_read_el_csr_cache(tmp_path):
+    path = tmp_path / "graph"
+    path.write_text("% header\n0 1\n3 1\n2 2\n0 1\n")
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters(f"ReadEL(path={path},cache=true)")
+
+    for expected in ['miss', 'hit']:
+        reader = ctx.construct_action("ReadEL")
+        graph = reader(None)
+        assert reader.get_stat('graph_cache') == expected
+        assert graph.vcount() == 4
+        # edges in CSR order, self-loops and multi-edges are kept
+        assert graph.get_edgelist() == [(0, 1), (0, 1), (1, 3), (2, 2)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".graph.csr", "graph"]
+    assert ReadELBatch.list_files(str(tmp_path)) == [str(path)]
+
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters(f"ReadEL(path={path},cache=true,giant=true)")
+    assert ctx.construct_action("ReadEL")(None).get_edgelist() == [(0, 1), (0, 1), (1, 2)]
+
+    # a changed source invalidates the copy
+    path.write_text("% header\n0 1\n")
+    csr, hit = csr_cache.convert(path)
+    assert not hit and (csr.vcount(), csr.ecount()) == (2, 1)
+    assert csr_cache.load(path).digest == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    # same size, other mtime: the digest decides
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert csr_cache.convert(path)[1]
+    path.write_text("% header\n1 0\n")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    csr, hit = csr_cache.convert(path)
+    assert not hit and csr.edge_array().tolist() == [[0, 1]]
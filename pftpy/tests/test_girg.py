@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import numpy as np
+import pytest
+from pftpy.actions import ActionContext
+from pftpy.graph_actions import generate_graph
+from pftpy.graph_actions.girg import expected_degree, girg, scale_constant
+
+
+def connection(weights, positions, scale):
+    i, j = np.triu_indices(len(weights), 1)
+    diff = np.abs(positions[i] - positions[j])
+    volume = np.minimum(diff, 1 - diff).max(axis=1) ** positions.shape[1]
+    return i, j, volume, scale * weights[i] * weights[j]
+
+
+@pytest.mark.parametrize("d", [1, 2, 3])
+@pytest.mark.parametrize("ple", [2.1, 2.9])
+def test_threshold_girg(d, ple):
+    weights, positions, edges = girg(1500, d, ple, np.inf, 10, 1, 2, 3)
+    assert weights.min() >= 1 and weights.max() <= 750
+    scale = scale_constant(weights, d, np.inf, 10) / weights.sum()
+    i, j, volume, threshold = connection(weights, positions, scale)
+    keep = volume <= threshold
+    assert edges.tolist() == np.stack((i[keep], j[keep]), axis=1).tolist()
+
+
+@pytest.mark.parametrize("d,alpha", [(1, 1.3), (2, 5.0)])
+def test_girg_probabilities(d, alpha):
+    weights, positions, edges = girg(1500, d, 2.5, alpha, 10, 1, 2, 3)
+    scale = scale_constant(weights, d, alpha, 10) / weights.sum()
+    _, _, volume, threshold = connection(weights, positions, scale)
+    with np.errstate(divide='ignore'):
+        p = np.minimum(1, (threshold / volume) ** alpha)
+    # 4 standard deviations
+    assert abs(len(edges) - p.sum()) < 4 * np.sqrt(p.sum())
+
+
+def test_scale_constant():
+    weights = np.random.default_rng(1).pareto(1.5, 5000) + 1
+    for alpha in [np.inf, 2.5]:
+        c = scale_constant(weights, 2, alpha, 10)
+        assert expected_degree(weights, 2, alpha, c) == pytest.approx(10, rel=1e-6)
+
+    degrees = [2 * len(girg(3000, 1, 2.5, 2.5, 10, s, s + 1, s + 2)[2]) / 3000
+               for s in range(10)]
+    assert np.mean(degrees) == pytest.approx(10, rel=0.05)
+
+
+def test_girg_seeds():
+    first = girg(1000, 2, 2.5, 2.0, 10, 1, 2, 3)
+    second = girg(1000, 2, 2.5, 2.0, 10, 1, 2, 3)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+    other = girg(1000, 2, 2.5, 2.0, 10, 1, 2, 4)
+    assert np.array_equal(first[1], other[1])
+    assert not np.array_equal(first[2], other[2])
+
+
+def test_numpy_girg_action(tmp_path):
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters(
+        "GraphInput:girg_numpy",
+        f"NumpyGirgGen(n=500,d=2,deg=6,seed=3,ple=2.3,alpha=inf,cache_dir={tmp_path})",
+    )
+    gen = ctx.construct_action("GraphInput")
+    graph = gen(None)
+    assert graph.is_connected()
+    assert 0 < graph.vcount() <= 500
+    assert gen.get_stat('girg_options').endswith("type=girg-numpy")
+
+    again = ctx.construct_action("GraphInput")(None)
+    assert again.get_edgelist() == graph.get_edgelist()
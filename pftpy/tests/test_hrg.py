@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import numpy as np
+import pytest
+from pftpy.actions import ActionContext
+from pftpy.graph_actions import generate_graph
+from pftpy.graph_actions.hrg import expected_degree, hrg, hyperbolic_radius
+
+
+def brute_force_edges(r, theta, R):
+    i, j = np.triu_indices(len(r), 1)
+    cosh_d = np.cosh(r[i]) * np.cosh(r[j]) \
+        - np.sinh(r[i]) * np.sinh(r[j]) * np.cos(theta[i] - theta[j])
+    keep = cosh_d <= np.cosh(R)
+    return np.stack((i[keep], j[keep]), axis=1)
+
+
+@pytest.mark.parametrize("alpha", [0.55, 0.75, 1.5])
+def test_threshold_hrg(alpha):
+    r, theta, edges = hrg(2000, 8, alpha, 0, 1, 2, 3)
+    R = hyperbolic_radius(2000, alpha, 0, 8)
+    assert r.max() <= R
+    assert edges.tolist() == brute_force_edges(r, theta, R).tolist()
+
+
+def test_hyperbolic_radius():
+    R = hyperbolic_radius(10000, 0.75, 0.5, 10)
+    assert expected_degree(10000, 0.75, 0.5, R) == pytest.approx(10, rel=1e-5)
+    assert expected_degree(10000, 0.75, 0.5, R + 1) < 10
+
+    degrees = [2 * len(hrg(3000, 10, 1.5, 0.5, s, s + 1, s + 2)[2]) / 3000
+               for s in range(10)]
+    assert np.mean(degrees) == pytest.approx(10, rel=0.05)
+
+
+def test_hrg_seeds():
+    first = hrg(1000, 10, 0.75, 0.3, 1, 2, 3)
+    second = hrg(1000, 10, 0.75, 0.3, 1, 2, 3)
+    for a, b in zip(first, second):
+        assert np.array_equal(a, b)
+    assert not np.array_equal(first[2], hrg(1000, 10, 0.75, 0.3, 1, 2, 4)[2])
+
+
+def test_numpy_hrg_action(tmp_path):
+    ctx = ActionContext()
+    ctx.register_actions(*generate_graph.defined_actions)
+    ctx.register_filters(
+        "GraphInput:hrg_numpy",
+        f"NumpyHRGGen(n=500,deg=6,seed=3,coords=True,cache_dir={tmp_path})",
+    )
+    gen = ctx.construct_action("GraphInput")
+    graph = gen(None)
+    assert graph.is_connected()
+    assert 0 < graph.vcount() <= 500
+    assert set(graph.vertex_attributes()) == {'r', 'theta', 'x', 'y'}
+    assert gen.get_stat('girg_options').endswith("type=HRG-numpy")
+
+    again = ctx.construct_action("GraphInput")(None)
+    assert again.get_edgelist() == graph.get_edgelist()
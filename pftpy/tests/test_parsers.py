@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+import gzip
+import igraph
+import numpy as np
+import pytest
+from pftpy.graph_actions import parsers
+from pftpy.graph_actions.components import UnionFind, giant_edges
+from pftpy.graph_actions.parsers import (giant_component, parse_table,
+    read_coordinates, read_edge_list, read_girgs_graph, read_pace_gr,
+    strip_comments)
+
+
+def test_parse_table():
+    assert parse_table(b"1 2\n3  4\r\n\n5 6").tolist() == [[1, 2], [3, 4], [5, 6]]
+    assert parse_table(b"\n  \n").shape == (0, 0)
+    assert parse_table(b"1 2 7\n3 4 8\n").shape == (2, 3)
+    with pytest.raises(ValueError):
+        parse_table(b"1 2\n3\n")
+    with pytest.raises(ValueError):
+        parse_table(b"1 2\nx y\n")
+    # uneven lines, even if the number of values is a multiple of the columns
+    for data in [b"0 1\n1 2 3\n2 3\n4 5 6\n", b"1 2\n3 4 5\n6\n"]:
+        with pytest.raises(ValueError):
+            parse_table(data)
+    assert parse_table(b"0 1 0.5\n2 3 1e3\n", dtype=None).tolist() == [[0, 1, 0.5], [2, 3, 1000]]
+    assert parse_table(b"0 1\n2 3\n", dtype=None).dtype == np.int64
+
+    assert strip_comments(b"% a\n1 2\n# b\n3 4\n%") == b"1 2\n3 4\n"
+    assert strip_comments(b"c x\np tw 2 1\n1 2\n", b"c") == b"p tw 2 1\n1 2\n"
+
+
+def test_read_edge_list(tmp_path):
+    text = "% sym unweighted\n% 3 4\n0 1 5\n1 2 7\n# comment\n2 4 1\n"
+    (tmp_path / "el").write_text(text)
+    (tmp_path / "el.gz").write_bytes(gzip.compress(text.encode()))
+
+    for name in ["el", "el.gz"]:
+        graph = read_edge_list(tmp_path / name)
+        assert graph.vcount() == 5
+        assert graph.get_edgelist() == [(0, 1), (1, 2), (2, 4)]
+
+
+def test_read_edge_list_columns(tmp_path):
+    (tmp_path / "weighted").write_text("% header\n0 1 0.5\n1 2 1.25\n")
+    assert read_edge_list(tmp_path / "weighted").get_edgelist() == [(0, 1), (1, 2)]
+
+    (tmp_path / "uneven").write_text("% header\n0 1\n1 2 3\n2 3\n4 5 6\n")
+    (tmp_path / "fraction").write_text("% header\n0 1.5\n")
+    for name in ["uneven", "fraction"]:
+        with pytest.raises(ValueError):
+            read_edge_list(tmp_path / name)
+
+
+def test_read_pace_gr(tmp_path):
+    (tmp_path / "g.gr").write_text("c comment\np tw 4 2\n1 2\nc more\n2 4\n")
+    graph = read_pace_gr(tmp_path / "g.gr")
+    assert graph.vcount() == 4
+    assert graph.get_edgelist() == [(0, 1), (1, 3)]
+
+    (tmp_path / "bad.gr").write_text("p tw 4 3\n1 2\n")
+    with pytest.raises(AssertionError):
+        read_pace_gr(tmp_path / "bad.gr")
+
+
+def test_read_girgs_output(tmp_path):
+    (tmp_path / "g.txt").write_text("6 2\n\n0 5\n3 2\n")
+    graph = read_girgs_graph(tmp_path / "g.txt")
+    assert graph.vcount() == 6
+    assert graph.get_edgelist() == [(0, 5), (2, 3)]
+
+    (tmp_path / "g.hyp").write_text("1.5 0.25\n2e-1 3.0\n")
+    coords = read_coordinates(tmp_path / "g.hyp")
+    assert coords.dtype == np.float64
+    assert coords.tolist() == [[1.5, 0.25], [0.2, 3.0]]
+
+
+def test_union_find():
+    union_find = UnionFind(3)
+    union_find.grow(10)
+    union_find.union([9, 8, 7, 2], [8, 7, 6, 1])
+    assert union_find.roots().tolist() == [0, 1, 1, 3, 4, 5, 6, 6, 6, 6]
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_union_find_long_path(shuffle):
+    n = 200000
+    path = np.random.default_rng(1).permutation(n) if shuffle else np.arange(n)
+    union_find = UnionFind(n)
+    union_find.union(path[:-1], path[1:])
+    # chains of roots are jumped over: the trees have logarithmic depth
+    # instead of the length of the path
+    vertices, depth = np.arange(n), 0
+    while (union_find.parent[vertices] != vertices).any():
+        vertices, depth = union_find.parent[vertices], depth + 1
+    assert (vertices == 0).all()
+    assert depth <= 2 * np.log2(n)
+
+    edges = np.stack((path[:-1], path[1:]), axis=1).astype(np.int32)
+    vertices, giant = giant_edges(lambda: [edges[i:i + 50000] for i in range(0, n, 50000)], n)
+    assert len(vertices) == n and len(giant) == n - 1
+
+
+def test_giant_component():
+    graph = igraph.Graph.Erdos_Renyi(200, m=150)
+    graph.vs['r'] = [float(i) for i in range(200)]
+    expected = graph.components().giant()
+
+    edges = np.array(graph.get_edgelist(), dtype=np.int32)
+    chunks = lambda: (edges[i:i + 16] for i in range(0, len(edges), 16))
+    giant = giant_component(chunks, 200, r=graph.vs['r'])
+    assert giant.vcount() == expected.vcount()
+    assert sorted(giant.get_edgelist()) == sorted(expected.get_edgelist())
+    assert giant.vs['r'] == expected.vs['r']
+
+
+def test_read_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(parsers, "CHUNK_BYTES", 5)
+    text = "% header\n10 11\n% comment\n11 12\n0 1\n1 2\n2 3\n"
+    (tmp_path / "el.gz").write_bytes(gzip.compress(text.encode()))
+
+    graph = read_edge_list(tmp_path / "el.gz")
+    assert graph.vcount() == 13 and graph.ecount() == 5
+    giant = read_edge_list(tmp_path / "el.gz", giant=True)
+    assert giant.vcount() == 4
+    assert giant.get_edgelist() == [(0, 1), (1, 2), (2, 3)]
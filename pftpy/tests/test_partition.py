@@ -3,6 +3,7 @@ import pytest
 from pftpy.actions import ActionContext
 from pftpy.graph_actions import partition
 import igraph
+from math import log2
 
 @pytest.fixture
 def ctx():
@@ -69,3 +70,35 @@ def test_branchingpartition_reductions(ctx):
         sol1, weight1 = bf.solve_rec(graph)
         sol2, weight2 = bf_no_lb.solve_rec(graph)
         assert weight1 == weight2
+
+
+def test_partition_result():
+    from pftpy.graph_actions.partition_result import PartitionResult
+    graph = igraph.Graph.Ring(6)
+    graph['treewidth'] = 2
+    res = PartitionResult.from_classes(graph, [[0, 1], [2, 3, 4], [5]])
+    assert res.labels.dtype.name == 'int32'
+    assert res.sizes.tolist() == [2, 3, 1]
+    assert res.weight() == pytest.approx(log2(3 * 4 * 2))
+
+    contracted = res.contract()
+    assert sorted(contracted.get_edgelist()) == [(0, 1), (0, 2), (1, 2)]
+    assert contracted.vs['weight'] == res.log_weights.tolist()
+    assert contracted['treewidth'] == 2
+
+    graph.vs['partition'] = ['a', 'a', 'b', 'b', 'b', 'c']
+    assert PartitionResult.from_attribute(graph).sizes.tolist() == [2, 3, 1]
+
+
+def test_partition_stats(ctx):
+    graph = igraph.Graph.Full(4)
+    graph.add_vertices(2)
+    graph.add_edges([(3, 4), (4, 5)])
+    part = ctx.construct_action("Partition")
+    res = part(graph)
+    assert res.graph is graph
+    # the K4, then the remaining clique {4, 5}
+    assert sorted(res.sizes.tolist()) == [2, 4]
+    assert part.get_stat('amount') == 2
+    assert part.get_stat('largest') == 4
+    assert part.get_stat('smallest') == 2
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import time
+import pytest
+import igraph
+from pftpy.actions import ActionContext
+from pftpy.graph_actions import contraction, greedy_partition, partition, partition_bags
+
+
+@pytest.fixture
+def ctx():
+    ctx = ActionContext()
+    ctx.register_actions(*partition.defined_actions, *partition_bags.defined_actions,
+                         *contraction.defined_actions, *greedy_partition.defined_actions)
+    return ctx
+
+
+def test_partition_bags_stat_types(ctx):
+    graph = igraph.Graph.Full(4)
+    graph.add_vertices(2)
+    graph.add_edges([(3, 4), (4, 5), (3, 5)])
+    graph['treewidth'] = 3
+    tree = igraph.Graph(2, [(0, 1)])
+    tree.vs['vertices'] = [[0, 1, 2, 3], [3, 4, 5]]
+
+    bags = ctx.construct_action("PartitionBags")
+    bags((graph, tree))
+
+    assert bags.get_stat('status') == 'success'
+    # numbers are not converted to strings
+    assert bags.get_stat('mean_partition_num') == 1.0
+    assert type(bags.get_stat('max_partition_num')) is int
+    assert type(bags.get_stat('median_partition_num')) is float
+
+
+def test_partition_bags_concurrent(ctx):
+    graph = igraph.Graph.Lattice([4, 4], circular=False)
+    graph['treewidth'] = 4
+    tree = igraph.Graph(3, [(0, 1), (1, 2)])
+    tree.vs['vertices'] = [list(range(0, 8)), list(range(4, 12)), [12, 13]]
+
+    sequential = ctx.construct_action("PartitionBags")
+    _, seq_tree = sequential((graph, tree.copy()))
+
+    ctx.register_filters("PartitionBags(max_processes=3)")
+    concurrent = ctx.construct_action("PartitionBags")
+    _, con_tree = concurrent((graph, tree.copy()))
+
+    assert concurrent.get_stat('status') == 'success'
+    assert con_tree.vs['weights'] == seq_tree.vs['weights']
+    assert concurrent.get_stat('num_clq_red') == sequential.get_stat('num_clq_red') == 1
+
+
+@pytest.fixture
+def failing_partition(monkeypatch):
+    def run(self, graph):
+        raise RuntimeError("no partition")
+    monkeypatch.setattr(partition.FastLargestClique, "run", run)
+
+
+@pytest.mark.parametrize("max_processes", [1, 2])
+def test_partition_bags_failed_partition(ctx, failing_partition, max_processes):
+    graph = igraph.Graph.Lattice([4, 4], circular=False)
+    graph['treewidth'] = 4
+    tree = igraph.Graph(2, [(0, 1)])
+    tree.vs['vertices'] = [list(range(0, 8)), list(range(8, 16))]
+
+    ctx.register_filters(f"PartitionBags(max_processes={max_processes})")
+    bags = ctx.construct_action("PartitionBags")
+    bags((graph, tree))
+
+    assert bags.get_stat('status') == 'failed'
+    assert bags.get_stat('max_weight') == -1
+
+
+def test_partition_bags_concurrent_deadline(ctx, monkeypatch):
+    calls = []
+    run = partition.FastLargestClique.run
+    def slow_run(self, graph):
+        calls.append(graph.vcount())
+        time.sleep(0.3)
+        return run(self, graph)
+    monkeypatch.setattr(partition.FastLargestClique, "run", slow_run)
+
+    graph = igraph.Graph.Lattice([4, 6], circular=False)
+    graph['treewidth'] = 4
+    tree = igraph.Graph(6, [(i, i + 1) for i in range(5)])
+    tree.vs['vertices'] = [list(range(4 * i, 4 * i + 4)) for i in range(6)]
+
+    # the budget runs out while the second pair of bags is partitioned
+    ctx.register_filters("PartitionBags(max_processes=2,timeout=0.45)")
+    bags = ctx.construct_action("PartitionBags")
+    start = time.monotonic()
+    bags((graph, tree))
+
+    assert len(calls) == 4
+    assert time.monotonic() - start < 0.9
+    assert bags.get_stat('status') == 'timeout'
+    assert bags.get_stat('max_weight') == -1
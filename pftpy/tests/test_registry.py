@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+from pftpy.actions import ActionContext
+from pftpy.actions.registry import LazyAction, lazy_actions
+from pftpy.graph_actions import action_modules
+
+import pytest
+
+PFTPY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEADER_ARGS = ["run-all", "-f", "CSV(onlyheader,printheader)"]
+
+
+def test_action_modules_match_defined_actions():
+    for module, names in action_modules.items():
+        defined = importlib.import_module("pftpy." + module).defined_actions
+        assert [action.name() for action in defined] == names
+
+
+def test_lazy_action():
+    action = LazyAction("pftpy.graph_actions.blowup", "Blowup")
+    assert action.name() == "Blowup"
+    assert not action.is_loaded()
+
+    ctx = ActionContext()
+    ctx.register_actions(action)
+    blowup = ctx.construct_action("Blowup")
+
+    assert action.is_loaded()
+    assert blowup.name() == "Blowup"
+    assert action.stat_schema() == action.load().stat_schema()
+
+
+def test_lazy_actions():
+    actions = lazy_actions({"a.b": ["X", "Y"], "c": ["Z"]})
+    assert [a.name() for a in actions] == ["X", "Y", "Z"]
+
+
+def _run_algo(cwd, schema_cache, *args):
+    # print which heavy modules were imported after the command ran
+    code = ("import runpy, sys;"
+            f"sys.argv = {['algo.py'] + list(args)!r};"
+            f"sys.path.insert(0, {PFTPY_DIR!r});"
+            f"runpy.run_path({os.path.join(PFTPY_DIR, 'algo.py')!r});"
+            "print(sorted(m for m in ('igraph', 'numpy') if m in sys.modules))")
+    env = dict(os.environ, PFTPY_SCHEMA_CACHE=str(schema_cache))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, check=True)
+    return proc.stdout.splitlines()
+
+
+def test_header_startup(tmp_path):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    schema_cache = tmp_path / "schema"
+    first = _run_algo(cwd, schema_cache, *HEADER_ARGS)
+    assert "GraphInput.n" in first[0].split(",")
+    # nothing is written to the working directory
+    assert os.listdir(cwd) == []
+
+    # afterwards the header is read from the cache without importing the
+    # actions: a key only present in the cached schema shows up
+    cached, = schema_cache.glob("*.json")
+    keys = json.loads(cached.read_text())
+    cached.write_text(json.dumps(keys + ["Cached.key"]))
+    second = _run_algo(cwd, schema_cache, *HEADER_ARGS)
+    assert second[0].split(",") == sorted(first[0].split(",") + ["Cached.key"])
+    assert second[1] == "[]"
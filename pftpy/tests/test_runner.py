@@ -2,9 +2,16 @@
 from pftpy.actions import Action, SequenceAction, ActionContext
 from pftpy.runner import Runner
 
+import argh
+import csv
+import json
+import os
+import time
 import pytest
 
 class NumberGen(Action):
+    stat_keys = ['sum']
+
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
@@ -26,10 +33,9 @@ class NumberGen(Action):
     def stats(self) -> 'dict[str,str]':
         return self._stats
 
-    def get_stat_keys(self) -> 'list[str]':
-        return super().get_stat_keys() + ['sum']
-
 class Adder(Action):
+    stat_keys = ['avg']
+
     def __init__(self, context, parents, params):
         super().__init__(context, parents, params)
 
@@ -43,9 +49,6 @@ class Adder(Action):
         self.set_stat('avg', avg)
         return res
 
-    def get_stat_keys(self):
-        return super().get_stat_keys() + ['avg']
-
     @staticmethod
     def name() -> 'str':
         return "Adder"
@@ -62,6 +65,38 @@ class ListAdd(SequenceAction):
     def name() -> 'str':
         return "ListAdd"
 
+class Crasher(Action):
+    stat_keys = ['len']
+
+    def run(self, input):
+        code = int(self._params['code'])
+        if code != 0:
+            os._exit(code)
+        time.sleep(float(self._params['sleep']))
+        self.set_stat('len', len(input))
+        return input
+
+    @staticmethod
+    def default_params():
+        return {'code': 0, 'sleep': 0}
+
+
+class CrashSeq(SequenceAction):
+    steps = [NumberGen, Crasher]
+
+
+class Joiner(Action):
+    stat_keys = ['items']
+
+    def run(self, input):
+        self.set_stat('items', ",".join(str(n) for n in input))
+        return input
+
+
+class JoinSeq(SequenceAction):
+    steps = [NumberGen, Joiner]
+
+
 @pytest.fixture
 def example_runner():
     action_name = "ListAdd"
@@ -92,3 +127,156 @@ def test_output_json(example_runner):
     res = list(example_runner.run(["Output(printer=json)",]))
 
     assert '"NumberGen.sum": 6' in res[0]
+
+def test_runner_run_all_jobs(example_runner):
+    filters = [f"Adder(num={i})" for i in range(6)]
+    sequential = list(example_runner.run_all(filters))
+    parallel = list(example_runner.run_all(filters, jobs=3))
+    assert len(parallel) == 6
+    # all columns except for the time columns agree
+    strip = lambda line: line.split(",")[:2] + line.split(",")[3:5]
+    assert [strip(l) for l in parallel] == [strip(l) for l in sequential]
+
+def test_runner_run_all_crash_and_timeout():
+    runner = Runner("CrashSeq", CrashSeq, NumberGen, Crasher)
+    filters = [
+        "Crasher(code=0)",
+        "Crasher(code=3)",
+        "Crasher(sleep=10)",
+        "Crasher(code=0,sleep=0.1)",
+    ]
+    res = list(runner.run_all(filters, jobs=2, timeout=2))
+    assert len(res) == 4
+    assert ",none," in res[0]
+    assert "crashed(3)" in res[1]
+    assert "timeout" in res[2]
+    assert ",none," in res[3]
+
+def test_runner_run_all_fractional_timeout(example_runner):
+    parser = argh.ArghParser()
+    parser.add_commands([example_runner.run_all])
+    assert parser.parse_args(["run-all", "--timeout", "2.5"]).timeout == 2.5
+
+
+def test_runner_run_all_share_prefix(example_runner):
+    filters = [f"Adder(num={i})" for i in range(4)]
+    sequential = list(example_runner.run_all(filters))
+    for jobs in [1, 2]:
+        shared = list(example_runner.run_all(filters, jobs=jobs, share_prefix=True))
+        # the shared NumberGen step keeps its stats
+        assert [l.split(",")[4] for l in shared] == ["6"] * 4
+        assert [l.split(",")[0] for l in shared] == [l.split(",")[0] for l in sequential]
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_runner_run_all_trace(example_runner, tmp_path, jobs):
+    filters = ["Adder(num=1)", "Adder(num=2)"]
+    res = list(example_runner.run_all(filters + ["CSV(printheader)"], jobs=jobs,
+                                      trace=str(tmp_path)))
+    signatures = [row['signature'] for row in csv.DictReader(res)]
+    assert len(signatures) == 2
+    assert sorted(os.listdir(tmp_path)) == \
+        sorted(f"variant_{signature}.json" for signature in signatures)
+
+    with open(tmp_path / f"variant_{signatures[1]}.json") as handle:
+        events = json.load(handle)['traceEvents']
+    by_name = {e['name']: e for e in events}
+    assert set(by_name) == {"ListAdd", "NumberGen", "Adder"}
+    root = by_name["ListAdd"]
+    assert root['args']['parent'] is None
+    assert by_name["Adder"]['args']['parent'] == root['args']['id']
+    assert by_name["Adder"]['args']['stack'] == "ListAdd:Adder"
+    assert root['dur'] >= by_name["Adder"]['dur'] + by_name["NumberGen"]['dur']
+
+
+def test_runner_run_all_resume(example_runner, tmp_path):
+    filters = ["NumberGen(n=2)", "NumberGen(n=3)", "Adder(num=1)", "Adder(num=2)",
+               "CSV(printheader)"]
+    output = tmp_path / "out.csv"
+    assert list(example_runner.run_all(filters, output=str(output))) == []
+    lines = output.read_text().splitlines()
+    assert len(lines) == 5
+    signature_pos = lines[0].split(",").index("signature")
+    signatures = [l.split(",")[signature_pos] for l in lines[1:]]
+    assert len(set(signatures)) == 4
+
+    # the run died while writing the fourth row after the third failed
+    failed = lines[3].replace(",none,", ",exception(x),")
+    output.write_text("\n".join(lines[:3] + [failed, lines[4][:5]]))
+    list(example_runner.run_all(filters, output=str(output), resume=True))
+
+    resumed = output.read_text().splitlines()
+    assert resumed[:4] == lines[:3] + [failed]
+    assert [l.split(",")[signature_pos] for l in resumed[4:]] == signatures[2:]
+
+    # nothing is left to do
+    list(example_runner.run_all(filters, output=str(output), resume=True))
+    assert output.read_text().splitlines() == resumed
+
+
+def test_runner_run_all_resume_quoted(tmp_path):
+    runner = Runner("JoinSeq", JoinSeq, NumberGen, Joiner)
+    filters = ["NumberGen(n=2)", "NumberGen(n=3)", "CSV(printheader)"]
+    output = tmp_path / "out.csv"
+    list(runner.run_all(filters, output=str(output)))
+    lines = output.read_text().splitlines()
+    assert len(lines) == 3
+    assert '"0,1,2"' in lines[2]
+
+    # the successful rows with quoted commas are not run again
+    list(runner.run_all(filters, output=str(output), resume=True))
+    assert output.read_text().splitlines() == lines
+
+
+def test_runner_run_all_shards(example_runner, tmp_path):
+    filters = [f"Adder(num={i})" for i in range(8)]
+    full = list(example_runner.run_all(filters))
+    strip = lambda line: line.split(",")[:2] + line.split(",")[3:5]
+
+    shards = []
+    for i in range(3):
+        path = str(tmp_path / f"shard_{i}.csv")
+        list(example_runner.run_all(filters + ["CSV(printheader)"], output=path,
+                                    shard=f"{i}/3"))
+        shards.append(path)
+    rows = [open(path).read().splitlines()[1:] for path in shards]
+    assert [len(r) for r in rows] == [4, 2, 2]
+
+    merged = list(example_runner.merge(shards, filters))
+    assert [strip(l) for l in merged[1:]] == [strip(l) for l in full]
+
+    with pytest.raises(Exception, match="2 variants have no row"):
+        list(example_runner.merge(shards[:2], filters))
+
+
+def test_runner_merge_failed_steps(example_runner, tmp_path):
+    # both steps fail for n=x, the error status lists them separated by a comma
+    filters = ["NumberGen(n=2)", "NumberGen(n=x)", "Adder(num=1)", "Adder(num=2)"]
+    shards = []
+    for i in range(2):
+        path = str(tmp_path / f"shard_{i}.csv")
+        list(example_runner.run_all(filters + ["CSV(printheader)"], output=path,
+                                    shard=f"{i}/2"))
+        shards.append(path)
+
+    merged = list(example_runner.merge(shards, filters))
+    assert len(merged) == 5
+    rows = list(csv.DictReader(merged))
+    assert [row['error_status'] for row in rows] == \
+        ["none", "none", "failed(NumberGen,Adder)", "failed(NumberGen,Adder)"]
+
+
+@pytest.mark.parametrize("shard", ["3/3", "1", "a/2"])
+def test_runner_run_all_bad_shard(example_runner, shard):
+    with pytest.raises(Exception):
+        list(example_runner.run_all([], shard=shard))
+
+
+def test_output_jsonl(example_runner):
+    filters = ["Adder(num=1)", "Adder(num=2)", "Output(printer=jsonl)"]
+    res = list(example_runner.run_all(filters))
+
+    assert len(res) == 2
+    rows = [json.loads(line) for line in res]
+    assert rows[0]["Adder.avg"] == 2.5
+    assert rows[1]["NumberGen.sum"] == 6
+    assert rows[0]["signature"] != rows[1]["signature"]
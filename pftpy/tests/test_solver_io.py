@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import igraph
+from pftpy.graph_actions import solver_io
+
+
+def test_format_rows():
+    assert solver_io.format_rows([2, 0, 1], [1, 2, 3]) == "1 2\n\n3\n"
+    assert solver_io.format_rows([], []) == ""
+    assert solver_io.format_rows([1, 2], [0, 5, 1, 6, 7], word="x%d", sep=" + ",
+                                 start="c%d: ", end=";") == "c0: x5;c1: x6 + x7;"
+
+
+def test_ragged():
+    offsets, values = solver_io.ragged([[3], [], [1, 2]])
+    assert offsets.tolist() == [0, 1, 1, 3]
+    assert values.tolist() == [3, 1, 2]
+
+
+def test_pace_gr():
+    path = igraph.Graph(3, [(0, 1), (1, 2)])
+    assert solver_io.pace_gr(3, solver_io.edge_array(path)) == b"p tw 3 2\n1 2\n2 3\n"
+    assert solver_io.pace_gr(2, solver_io.edge_array(igraph.Graph(2))) == b"p tw 2 0\n"
+
+
+def test_metis():
+    graph = igraph.Graph(4, [(2, 0), (0, 1), (1, 2)])
+    # neighbors in ascending order, isolated vertex 3 gets an empty line
+    assert solver_io.metis(4, solver_io.edge_array(graph)) == b"4 3 1\n2 3\n1 3\n1 2\n\n"
+
+
+def test_hypergraph():
+    assert solver_io.hypergraph(4, [[0, 1, 2], [2, 3]]) == b"4 2\n3 0 1 2\n2 2 3\n"
+
+
+def test_lp():
+    expected = ("Minimize\n  obj: x0 + x1 + x2\nSubject To\n"
+                "  c0: x0 + x1 >= 1\n  c1: x2 >= 1\nBinary  x0 x1 x2\nEnd\n")
+    assert solver_io.lp(3, [[0, 1], [2]]).decode() == expected
+
+    weighted = solver_io.lp([1, 2.5], [[0, 1]]).decode()
+    assert weighted.startswith("Minimize\n  obj: 1.0 x0 + 2.5 x1\n")
@@ -3,7 +3,8 @@ import pytest
 from random import shuffle
 import igraph
 from pftpy.actions import ActionContext
-from pftpy.graph_actions import treewidth
+from pftpy.graph_actions import partition, treewidth
+from pftpy.artifact_store import digest, graph_fingerprint
 
 
 
@@ -11,7 +12,7 @@ from pftpy.graph_actions import treewidth
 @pytest.fixture
 def tw_ctx():
     ctx = ActionContext()
-    ctx.register_actions(treewidth.defined_actions)
+    ctx.register_actions(*treewidth.defined_actions)
     return ctx
 
 def test_elimination_game_path():
@@ -35,3 +36,81 @@ def test_elimination_game_cycle_random():
         shuffle(order)
         res, tree = treewidth.elimination_game(cycle, order)
         assert res['treewidth'] == 2
+
+
+def test_htd_cache_hit(tmp_path):
+    ctx = ActionContext()
+    ctx.register_actions(*treewidth.defined_actions)
+    ctx.register_filters(f"HTD(seed=1,variant=minfill,cache_dir={tmp_path},dir=/nonexistent)")
+    path = igraph.Graph(3, [(0, 1), (1, 2)])
+    htd = ctx.construct_action("HTD")
+
+    # without a stored decomposition, htd is called (and fails here)
+    htd(path.copy())
+    assert htd.get_stat('td_cache') == 'miss'
+
+    key = digest(graph_fingerprint(path), 1, 'minfill', ['--strategy', 'min-fill'])
+    htd.store.put(key, b"c stored\ns td 2 2 3\nb 1 1 2\nb 2 2 3\n1 2\n")
+    g, tree = htd(path.copy())
+    assert htd.get_stat('td_cache') == 'hit'
+    assert htd.get_stat('status') == 'success'
+    assert g['treewidth'] == 1
+    assert tree.vcount() == 2
+    assert g.vs['bags'] == [[0], [0, 1], [1]]
+
+
+def test_htd_cache_needs_seed(tmp_path):
+    ctx = ActionContext()
+    ctx.register_actions(*treewidth.defined_actions)
+    ctx.register_filters(f"HTD(variant=minfill,cache_dir={tmp_path},dir=/nonexistent)")
+    htd = ctx.construct_action("HTD")
+    htd(igraph.Graph(3, [(0, 1), (1, 2)]))
+    assert htd.get_stat('td_cache') == 'off'
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_graph_fingerprint_edge_order():
+    g1 = igraph.Graph(4, [(0, 1), (2, 3), (1, 2)])
+    g2 = igraph.Graph(4, [(3, 2), (1, 2), (1, 0)])
+    g3 = igraph.Graph(5, [(0, 1), (2, 3), (1, 2)])
+    assert graph_fingerprint(g1) == graph_fingerprint(g2)
+    assert graph_fingerprint(g1) != graph_fingerprint(g3)
+
+
+def weighted_mindeg_width(graph):
+    # min weighted degree elimination, recomputing the degrees every step
+    weights = graph.vs['weight']
+    adjacency = [set(graph.neighbors(v)) for v in range(graph.vcount())]
+    remaining = set(range(graph.vcount()))
+    degree = lambda v: sum(weights[w] for w in adjacency[v])
+    # ties are broken by the weighted degree in the input graph
+    original = [degree(v) for v in remaining]
+    width = 1
+    while len(remaining) > 1:
+        vertex = min(remaining, key=lambda v: (degree(v), original[v], v))
+        width = max(width, degree(vertex))
+        for w in adjacency[vertex]:
+            adjacency[w] |= adjacency[vertex] - {w}
+            adjacency[w].discard(vertex)
+        remaining.remove(vertex)
+    return width
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_weighted_mindeg(tw_ctx, seed):
+    graph = igraph.Graph.Erdos_Renyi(30, m=60)
+    graph.vs['weight'] = [1 + (7 * v + seed) % 5 for v in range(30)]
+    expected = weighted_mindeg_width(graph)
+    graph, tree = tw_ctx.construct_action("WeightedMindeg")(graph)
+    assert graph['treewidth'] == expected
+
+
+@pytest.mark.parametrize("name", ["CliqueGreedy", "IterativeCliqueGreedy"])
+def test_clique_greedy_failed_partition(tw_ctx, monkeypatch, name):
+    def run(self, graph):
+        raise RuntimeError("no partition")
+    monkeypatch.setattr(partition.FastLargestClique, "run", run)
+    tw_ctx.register_actions(*partition.defined_actions)
+
+    graph, tree = tw_ctx.construct_action(name)(igraph.Graph.Lattice([3, 3], circular=False))
+    assert graph['treewidth'] == -1
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+import sys
+import time
+import pytest
+from pftpy.actions import ActionContext
+from pftpy.actions.util import ProcessAction, run_concurrently, shm_file
+
+
+class Busy(ProcessAction):
+    def run(self, input):
+        code = "x = bytearray(64 * 2**20); sum(range(3 * 10**6))"
+        proc = self.run_process([sys.executable, "-c", code], capture_output=True)
+        return proc.returncode
+
+
+class Sleepy(ProcessAction):
+    def run(self, input):
+        self.run_process(["sleep", "10"], timeout=0.2)
+
+
+class Counter(ProcessAction):
+    def run(self, input):
+        code = f"sum(range({input}))"
+        self.run_process([sys.executable, "-c", code], check=True)
+        return input
+
+
+class Streamer(ProcessAction):
+    def run(self, input):
+        # sums the numbers written by the program while reading them
+        code = "import sys; [print(int(l) * 2, flush=True) for l in sys.stdin]"
+        proc = self.stream_process([sys.executable, "-c", code],
+                                   lambda lines: sum(int(l) for l in lines),
+                                   input=input, check=True)
+        return proc.stdout
+
+
+class SlowStreamer(ProcessAction):
+    def run(self, input):
+        code = "import time; print(1, flush=True); time.sleep(10)"
+        self.stream_process([sys.executable, "-c", code],
+                            lambda lines: [int(l) for l in lines], timeout=0.5)
+
+
+class Napper(ProcessAction):
+    def run(self, input):
+        self.run_process(["sleep", str(input)], check=True)
+
+
+@pytest.fixture
+def ctx():
+    ctx = ActionContext()
+    ctx.register_actions(Busy, Sleepy, Counter, Napper, Streamer, SlowStreamer)
+    return ctx
+
+
+def test_process_action_usage(ctx):
+    busy = ctx.construct_action("Busy")
+    assert busy(None) == 0
+    assert busy.get_stat('child_utime') > 0
+    assert busy.get_stat('child_maxrss_kb') > 64 * 1024
+
+    # stats are reset by every call
+    busy(None)
+    assert busy.get_stat('child_utime') < 2
+
+
+def test_process_action_timeout(ctx):
+    sleepy = ctx.construct_action("Sleepy")
+    sleepy(None)
+    assert sleepy.get_stat('error_status').startswith("exception(Command")
+    assert sleepy.get_stat('time') < 5
+    assert sleepy.get_stat('child_utime') >= 0
+
+
+def test_run_concurrently_stats(ctx):
+    counter = ctx.construct_action("Counter")
+    calls = [(counter.clone(), n) for n in (10**7, 1, 10**7, 1)]
+    assert run_concurrently(calls, max_processes=4) == [n for _, n in calls]
+
+    # every call keeps the usage of its own program
+    utimes = [action.get_stat('child_utime') for action, _ in calls]
+    assert min(utimes[0], utimes[2]) > max(utimes[1], utimes[3])
+    assert all(action.get_stat('error_status') == 'none' for action, _ in calls)
+
+
+def test_run_concurrently_bound(ctx):
+    napper = ctx.construct_action("Napper")
+
+    start = time.monotonic()
+    run_concurrently([(napper.clone(), 0.4) for _ in range(4)], max_processes=4)
+    assert time.monotonic() - start < 1.2
+
+    start = time.monotonic()
+    run_concurrently([(napper.clone(), 0.2) for _ in range(4)], max_processes=2)
+    assert time.monotonic() - start >= 0.4
+
+
+def test_stream_process(ctx):
+    streamer = ctx.construct_action("Streamer")
+    data = "".join(f"{i}\n" for i in range(10000)).encode()
+    assert streamer(data) == 2 * sum(range(10000))
+    assert streamer.get_stat('child_utime') > 0
+
+    slow = ctx.construct_action("SlowStreamer")
+    slow(None)
+    assert slow.get_stat('error_status').startswith("exception(Command")
+    assert slow.get_stat('time') < 5
+
+
+def test_shm_file():
+    with shm_file(b"1 2\n", suffix=".gr") as path:
+        assert path.endswith(".gr")
+        with open(path, "rb") as handle:
+            assert handle.read() == b"1 2\n"
+    assert not os.path.exists(path)